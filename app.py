@@ -1,8 +1,7 @@
 import os
-import random
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
 import uuid
 from flask import (
@@ -14,12 +13,56 @@ from flask import (
     redirect,
     url_for,
     session,
+    Response,
 )
 from flask_session import Session
-import redis
+from geo_server.cache import TTLCache
+from geo_server.display import puzzle_display
+from geo_server.http_caching import (
+    SESSION_STATE_MARKER,
+    cached_response,
+    conditional_page,
+    fill_session_state,
+    gzip_bytes,
+    precompressed_response,
+    run_page_key,
+    run_stats,
+    strong_etag,
+    version_etag,
+)
+from geo_server import redis_pool
+from geo_server.hyperloglog import HyperLogLog
+from geo_server.json_provider import FastJSONProvider, dumps_bytes
+from geo_server.piece_sprite import build_piece_sprite
+from geo_server.profiling import default_profile_dir, init_profiling
+from geo_server.query_log import QUERY_LOG, normalize_sql
+from geo_server.static_assets import BUILD_DIR_NAME, AssetManifest
+from geo_server.masking import mask_game_meta, run_mask_bitmap
 from geo_server.buiid_eco_json import get_eco_openings
+from geo_server import memory
+from geo_server.compression import init_compression
+from geo_server.metrics import (
+    collect_snapshots,
+    init_metrics,
+    publish as publish_metrics,
+    render_prometheus,
+)
+from geo_server.counters import BatchedCounters, RedisCounterStore, SQLiteCounterStore
 from geo_server.sqlite_wrapper import SQLiteWrapper
-from geo_server.manage_runs import create_run_and_add_to_database, RunSettings
+from geo_server.manage_runs import (
+    create_run_and_add_to_database,
+    run_settings_for_request,
+)
+from geo_server.run_pool import is_pooled_preset, preset_key
+from geo_server.daily_job import (
+    activate_due_daily_run,
+    make_owner_id,
+    run_daily_job_if_due,
+    seconds_until_next_midnight,
+    today_str,
+    warm_run,
+)
+from geo_server.job_queue import JOB_HANDLERS, enqueue_job, get_job
 from geo_server.constants import metadata_fields as SOURCE_METADATA_FIELDS
 import dotenv
 import secrets
@@ -29,10 +72,16 @@ import secrets as _secrets
 def create_app() -> Flask:
     base_dir = os.path.abspath(os.path.dirname(__file__))
     dotenv.load_dotenv()
+    # GEO_CHESS_DB points the app at another database (e.g. a scratch copy)
+    main_db_path = os.getenv("GEO_CHESS_DB") or os.path.join(
+        base_dir, "database", "geo_chess.db"
+    )
     app = Flask(
         __name__,
         template_folder=os.path.join(base_dir, "templates"),
     )
+    # orjson-backed when installed, stdlib otherwise
+    app.json = FastJSONProvider(app)
     # In dev mode, generate a new secret key each restart to invalidate all sessions
     # In production, use a persistent secret key from env var
     if os.getenv("FLASK_ENV") == "production":
@@ -48,14 +97,58 @@ def create_app() -> Flask:
     scripts_dir = os.path.join(base_dir, "scripts")
     assets_dir = os.path.join(base_dir, "assets")
 
+    # -------------------- Static assets --------------------
+    # Fingerprinted copies + gzip/br variants under static_build/, see static_assets.py
+    asset_manifest = AssetManifest(
+        {"styles": styles_dir, "scripts": scripts_dir, "assets": assets_dir},
+        os.path.join(base_dir, BUILD_DIR_NAME),
+        auto_reload=os.getenv("FLASK_ENV") != "production",
+    )
+    try:
+        asset_manifest.build()
+    except Exception as e:
+        # Without a build every asset is served from its source directory as before
+        print(f"Static asset build failed: {e}")
+    app.config["ASSET_MANIFEST"] = asset_manifest
+
+    def asset_url(endpoint: str, filename: str) -> str:
+        """url_for() for a static endpoint, pointing at the fingerprinted file."""
+        return url_for(
+            endpoint, filename=asset_manifest.hashed_filename(endpoint, filename)
+        )
+
+    def client_asset_urls() -> dict:
+        """Fingerprinted URLs of the assets main.js loads itself (sounds)."""
+        return {
+            key.split("/", 1)[1]: asset_url("assets", key.split("/", 1)[1])
+            for key in asset_manifest.files
+            if key.startswith("assets/sound/")
+        }
+
+    # One sprite sheet with every cburnett piece, built once per process
+    try:
+        sprite = build_piece_sprite(os.path.join(assets_dir, "cburnett"))
+        app.config["PIECE_SPRITE"] = (sprite, gzip_bytes(sprite), strong_etag(sprite))
+    except Exception as e:
+        print(f"Piece sprite build failed: {e}")
+        app.config["PIECE_SPRITE"] = None
+
+    def piece_sprite_url() -> str | None:
+        entry = app.config.get("PIECE_SPRITE")
+        if entry is None:
+            return None
+        # Content version in the query string keeps the immutable URL honest
+        return url_for("piece_sprite", v=entry[2].strip('"')[:12])
+
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.jinja_env.globals["client_asset_urls"] = client_asset_urls
+    app.jinja_env.globals["piece_sprite_url"] = piece_sprite_url
+
     # -------------------- Session backend selection --------------------
     if os.getenv("FLASK_ENV") == "production":
-        # Use Redis-backed server-side sessions in production
-        redis_password = os.getenv("REDIS_PASSWORD")
+        # Use Redis-backed server-side sessions in production (shared pool)
         app.config["SESSION_TYPE"] = "redis"
-        app.config["SESSION_REDIS"] = redis.Redis(
-            host="localhost", port=6379, db=0, password=redis_password
-        )
+        app.config["SESSION_REDIS"] = redis_pool.direct_client()
         app.config["SESSION_USE_SIGNER"] = True  # Sign session IDs
         app.config["SESSION_PERMANENT"] = True
         Session(app)
@@ -63,27 +156,37 @@ def create_app() -> Flask:
         # Dev: keep Flask default client-side signed cookie sessions; no Redis
         app.config.setdefault("SESSION_TYPE", "null")
 
+    # -------------------- Request metrics --------------------
+    # Registered before every other hook so latency covers them all (but not
+    # the session save, which Flask runs afterwards), see metrics.py
+    init_metrics(app)
+    # Off unless PROFILE_SAMPLE_RATE > 0 or an admin sends X-Profile: 1, see profiling.py
+    init_profiling(app, default_profile_dir(base_dir), lambda: _is_admin_request())
+
+    # -------------------- Response compression --------------------
+    # Off when a fronting proxy already compresses (COMPRESS_RESPONSES=false)
+    if os.getenv("COMPRESS_RESPONSES", "true") != "false":
+        init_compression(app)
+
     # -------------------- Session tracking for purge --------------------
     app.config.setdefault("SESSION_INDEX", {})  # sid -> last_access_ts (epoch seconds)
     app.config.setdefault("REVOKED_SIDS", set())
     # -------------------- Counters (Redis in prod, in-memory in dev) --------------------
     # Keys for Redis
-    COUNTER_KEY_PUZZLES = "geochessr:counters:puzzles_solved"
-    VISITOR_SET_KEY = "geochessr:counters:visitor_ip_hashes"
+    # Unique visitors are counted with a HyperLogLog sketch (fixed ~12 KiB in Redis)
+    VISITOR_HLL_KEY = "geochessr:counters:visitors_hll"
+    # Optional rolling windows: one sketch per day / per month, expiring on their own
+    VISITOR_WINDOWS_ENABLED = os.getenv("VISITOR_WINDOWS") == "true"
+    VISITOR_DAY_TTL = 3 * 24 * 3600
+    VISITOR_MONTH_TTL = 62 * 24 * 3600
 
     # In-memory fallbacks for development
-    app.config.setdefault("COUNTERS", {"puzzles_solved": 0})
-    app.config.setdefault("VISITOR_IP_HASHES", set())
+    app.config.setdefault("VISITOR_HLL", HyperLogLog())
+    app.config.setdefault("VISITOR_HLL_WINDOWS", {})  # window key -> HyperLogLog
 
-    def _redis_client():
-        try:
-            return (
-                app.config.get("SESSION_REDIS")
-                if os.getenv("FLASK_ENV") == "production"
-                else None
-            )
-        except Exception:
-            return None
+    def _redis_enabled() -> bool:
+        # Counters and visitor sketches live in Redis in production only
+        return os.getenv("FLASK_ENV") == "production"
 
     def _get_client_ip() -> str:
         try:
@@ -112,72 +215,111 @@ def create_app() -> Flask:
             # Always return a deterministic string even on failure
             return hashlib.sha256((ip or "").encode("utf-8")).hexdigest()
 
-    def _increment_puzzles_solved():
-        rc = _redis_client()
-        if rc is not None:
-            try:
-                rc.incr(COUNTER_KEY_PUZZLES)
-                return
-            except Exception:
-                pass
-        # Fallback to in-memory
+    # Solve counters are aggregated per worker and flushed in batches
+    # (Redis INCRBY pipeline in prod, `counters` table in dev)
+    if os.getenv("FLASK_ENV") == "production":
+        counter_store = RedisCounterStore()
+    else:
+        counter_store = SQLiteCounterStore(main_db_path)
+    counters = BatchedCounters(
+        counter_store,
+        flush_every=int(os.getenv("COUNTER_FLUSH_EVERY", "100")),
+        flush_interval=float(os.getenv("COUNTER_FLUSH_INTERVAL", "5")),
+    )
+    counters.start()
+    app.config["COUNTER_BUFFER"] = counters
+
+    def _increment_puzzles_solved(geo=None):
+        counters.incr("puzzles_solved")
+        # Breakdown by game source
         try:
-            counters = app.config.get("COUNTERS", {})
-            counters["puzzles_solved"] = int(counters.get("puzzles_solved", 0)) + 1
-            app.config["COUNTERS"] = counters
+            if geo is not None and geo.chess_game is not None:
+                counters.incr(f"solves:source:{geo.chess_game.source or 'unknown'}")
         except Exception:
             pass
 
+    def _visitor_window_keys() -> tuple[str, str]:
+        now_dt = datetime.now()
+        return (
+            f"{VISITOR_HLL_KEY}:day:{now_dt.strftime('%Y-%m-%d')}",
+            f"{VISITOR_HLL_KEY}:month:{now_dt.strftime('%Y-%m')}",
+        )
+
     def _get_counters() -> tuple[int, int]:
         """Return (puzzles_solved_total, unique_visitors_total)."""
-        rc = _redis_client()
-        if rc is not None:
-            try:
-                # Puzzles solved from counter key
-                p = rc.get(COUNTER_KEY_PUZZLES)
-                puzzles = int(p) if p is not None else 0
-            except Exception:
-                puzzles = 0
-            try:
-                # Unique visitors from set cardinality
-                visitors = int(rc.scard(VISITOR_SET_KEY))
-            except Exception:
-                visitors = 0
-            return puzzles, visitors
-        # Dev: in-memory
         try:
-            puzzles = int(app.config.get("COUNTERS", {}).get("puzzles_solved", 0))
+            puzzles = counters.get(["puzzles_solved"])["puzzles_solved"]
         except Exception:
             puzzles = 0
+        if _redis_enabled():
+            # Unique visitors estimated from the HyperLogLog sketch
+            visitors = int(
+                redis_pool.run(lambda rc: rc.pfcount(VISITOR_HLL_KEY), default=0)
+            )
+            return puzzles, visitors
+        # Dev: in-memory
         try:
-            visitors = len(app.config.get("VISITOR_IP_HASHES", set()))
+            visitors = app.config["VISITOR_HLL"].count()
         except Exception:
             visitors = 0
         return puzzles, visitors
 
+    def _get_visitor_windows() -> tuple[int, int] | None:
+        """Return (visitors_today, visitors_this_month), or None if windows are disabled."""
+        if not VISITOR_WINDOWS_ENABLED:
+            return None
+        day_key, month_key = _visitor_window_keys()
+        if _redis_enabled():
+            return redis_pool.run(
+                lambda rc: (int(rc.pfcount(day_key)), int(rc.pfcount(month_key))),
+                default=(0, 0),
+            )
+        windows = app.config.get("VISITOR_HLL_WINDOWS", {})
+        try:
+            return (
+                windows[day_key].count() if day_key in windows else 0,
+                windows[month_key].count() if month_key in windows else 0,
+            )
+        except Exception:
+            return 0, 0
+
     def _maybe_count_unique_visitor(ip: str):
-        """Record a unique visitor by hashed IP if not seen before."""
+        """Record a visitor (hashed IP) in the unique-visitor sketches."""
         try:
             h = _hash_ip(ip or "")
         except Exception:
             return
-        rc = _redis_client()
-        if rc is not None:
-            try:
-                # SADD returns 1 if element added (new), 0 if existed
-                added = rc.sadd(VISITOR_SET_KEY, h)
-                # We rely on SCARD to display count; no separate counter increment needed
-                # (keeps value consistent on restarts)
-                _ = added
+        if _redis_enabled():
+
+            def _pfadd(rc):
+                if VISITOR_WINDOWS_ENABLED:
+                    day_key, month_key = _visitor_window_keys()
+                    pipe = rc.pipeline(transaction=False)
+                    pipe.pfadd(VISITOR_HLL_KEY, h)
+                    pipe.pfadd(day_key, h)
+                    pipe.expire(day_key, VISITOR_DAY_TTL)
+                    pipe.pfadd(month_key, h)
+                    pipe.expire(month_key, VISITOR_MONTH_TTL)
+                    pipe.execute()
+                else:
+                    rc.pfadd(VISITOR_HLL_KEY, h)
+                return True
+
+            if redis_pool.run(_pfadd, default=False):
                 return
-            except Exception:
-                pass
-        # Dev: in-memory set
+        # Dev: in-memory sketches
         try:
-            seen = app.config.get("VISITOR_IP_HASHES", set())
-            if h not in seen:
-                seen.add(h)
-                app.config["VISITOR_IP_HASHES"] = seen
+            app.config["VISITOR_HLL"].add(h)
+            if VISITOR_WINDOWS_ENABLED:
+                windows = app.config.get("VISITOR_HLL_WINDOWS", {})
+                day_key, month_key = _visitor_window_keys()
+                # Drop sketches of windows that have rolled over
+                for key in list(windows.keys()):
+                    if key not in (day_key, month_key):
+                        del windows[key]
+                windows.setdefault(day_key, HyperLogLog()).add(h)
+                windows.setdefault(month_key, HyperLogLog()).add(h)
+                app.config["VISITOR_HLL_WINDOWS"] = windows
         except Exception:
             pass
 
@@ -188,8 +330,23 @@ def create_app() -> Flask:
             session["sid"] = sid
         return sid
 
+    # Publicly cacheable responses must not touch the session (Set-Cookie / Vary: Cookie)
+    SESSIONLESS_ENDPOINTS = {
+        "api_run_bundle",
+        "api_game_pgn",
+        "api_certificate",
+        "styles",
+        "scripts",
+        "assets",
+        "favicon",
+        "piece_sprite",
+        "metrics",
+    }
+
     @app.before_request
     def _track_session_last_access():
+        if request.endpoint in SESSIONLESS_ENDPOINTS:
+            return
         try:
             had_sid = bool(session.get("sid"))
             old_sid = session.get("sid")
@@ -241,7 +398,7 @@ def create_app() -> Flask:
 
     def _redirect_to_daily_run():
         # Otherwise redirect to the daily run
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
+        db_path = main_db_path
         wrapper = SQLiteWrapper(db_path)
         daily = wrapper.get_daily_run()
         try:
@@ -259,7 +416,7 @@ def create_app() -> Flask:
             runs_state = session.get("runs") or {}
             active_run_id = session.get("active_run_id")
             if active_run_id and active_run_id in runs_state:
-                db_path = os.path.join(base_dir, "database", "geo_chess.db")
+                db_path = main_db_path
                 wrapper = SQLiteWrapper(db_path)
                 run = wrapper.get_run(active_run_id)
                 try:
@@ -281,33 +438,116 @@ def create_app() -> Flask:
     def daily():
         return _redirect_to_daily_run()
 
+    # -------------------- Page caching --------------------
+    # index.html is identical for everyone viewing the same puzzle at the same
+    # run/puzzle version; the submission state (per session) and the run's
+    # completion stats are filled in per request at SESSION_STATE_MARKER.
+    app.config.setdefault(
+        "PAGE_CACHE",
+        TTLCache(
+            "pages",
+            max_size=int(os.getenv("PAGE_CACHE_SIZE", "2048")),
+            ttl_seconds=float(os.getenv("PAGE_CACHE_TTL", "300")),
+        ),
+    )
+
+    def _run_version(run) -> tuple:
+        # Everything run-level the page shows that can change after creation
+        return (
+            bool(run.is_daily),
+            int(getattr(run, "completed_count", 0) or 0),
+            getattr(run, "avg_time_seconds", None),
+            getattr(run, "avg_correct_count", None),
+        )
+
+    def _puzzle_version(geo) -> tuple:
+        return (int(geo.successes or 0), int(geo.fails or 0))
+
+    _render_version_cache = {}
+
+    def _render_version() -> str:
+        """
+        Changes whenever a template or a static asset does. Computed once in
+        production (both only change on deploy); per call in development.
+        """
+        if "value" in _render_version_cache:
+            return _render_version_cache["value"]
+        h = hashlib.sha256()
+        template_dir = app.template_folder
+        for name in sorted(os.listdir(template_dir)):
+            path = os.path.join(template_dir, name)
+            h.update(f"{name}:{os.path.getmtime(path)}:{os.path.getsize(path)}".encode())
+        for key, entry in sorted(asset_manifest.files.items()):
+            h.update(f"{key}:{entry['hash']}".encode())
+        value = h.hexdigest()[:16]
+        if os.getenv("FLASK_ENV") == "production":
+            _render_version_cache["value"] = value
+        return value
+
+    def _with_session_state(html: str, prior_submission, all_submissions, run=None) -> str:
+        return fill_session_state(
+            html,
+            PRIOR_SUBMISSION=prior_submission or None,
+            ALL_SUBMISSIONS=all_submissions or [],
+            RUN_STATS=run_stats(run),
+        )
+
     @app.route("/puzzle/<int:rec_id>")
     def single_puzzle(rec_id: int):
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
-        wrapper = SQLiteWrapper(db_path)
-        geo = wrapper.get_geo_chess(rec_id)
-        try:
-            wrapper.conn.close()
-        except Exception:
-            pass
+        # A warm puzzle cache and shared counters answer revalidations without
+        # opening the database
+        geo = SQLiteWrapper.GEO_CACHE.peek(int(rec_id))
+        counts = SQLiteWrapper.shared_geo_chess_counts(rec_id)
+        if geo is None or counts is None:
+            db_path = main_db_path
+            wrapper = SQLiteWrapper(db_path)
+            try:
+                if geo is None:
+                    geo = wrapper.get_geo_chess(rec_id)
+                if geo is not None and counts is None:
+                    counts = wrapper.get_geo_chess_counts(rec_id)
+            finally:
+                try:
+                    wrapper.conn.close()
+                except Exception:
+                    pass
         if geo is None:
             return "Puzzle not found", 404
+        # The worker-local copy may lag other workers' guesses; validator and
+        # page both use the counters every worker sees
+        if counts != _puzzle_version(geo):
+            geo = geo.model_copy(update={"successes": counts[0], "fails": counts[1]})
+
+        version = _puzzle_version(geo)
+        # The page only changes with the puzzle's counters (or a deploy)
+        etag = version_etag("puzzle", geo.id, version, _render_version())
+        return conditional_page(
+            etag,
+            lambda: _with_session_state(
+                app.config["PAGE_CACHE"].get_or_load(
+                    ("puzzle", geo.id, version, _render_version()),
+                    lambda: _render_single_puzzle(geo),
+                ),
+                None,
+                [],
+            ),
+        )
 
+    def _render_single_puzzle(geo):
+        display = puzzle_display(geo)
         # Build unmasked metadata for single-puzzle view, augmented with successes/fails
-        game_meta = _build_game_meta(geo)
+        game_meta = display["game_meta"]
         try:
             if isinstance(game_meta, dict):
+                game_meta = dict(game_meta)
                 game_meta["successes"] = int(getattr(geo, "successes", 0) or 0)
                 game_meta["fails"] = int(getattr(geo, "fails", 0) or 0)
         except Exception:
             pass
         initial_subfen = geo.subfen
         geochess_id = geo.id
-        try:
-            top_left_light = ((int(geo.posx) + int(geo.posy)) % 2) == 0
-        except Exception:
-            top_left_light = None
-        last_move_cells = _subfen_last_move_cells(geo)
+        top_left_light = display["top_left_light"]
+        last_move_cells = display["last_move_cells"]
         # Use default metadata fields for single-puzzle mode (no URL)
         try:
             metadata_fields = SOURCE_METADATA_FIELDS.get("default", [])
@@ -336,61 +576,66 @@ def create_app() -> Flask:
             run_index=None,
             run_len=None,
             is_daily=False,
-            prior_submission=None,
-            all_submissions=[],
+            session_state=SESSION_STATE_MARKER,
             metadata_fields=metadata_fields,
-            run_completed_count=0,
-            run_avg_time_seconds=None,
-            run_avg_correct_count=None,
             is_single_puzzle=True,
         )
 
     @app.route("/about")
     def about_page():
         puzzles, visitors = _get_counters()
+        windows = _get_visitor_windows()
         return render_template(
-            "about.html", puzzles_solved_count=puzzles, unique_visitors_count=visitors
+            "about.html",
+            puzzles_solved_count=puzzles,
+            unique_visitors_count=visitors,
+            visitors_today_count=(windows[0] if windows else None),
+            visitors_month_count=(windows[1] if windows else None),
         )
 
     # -------------------- Daily background task --------------------
-    def _seconds_until_next_midnight() -> float:
-        now_dt = datetime.now()
-        tomorrow = now_dt.date() + timedelta(days=1)
-        midnight = datetime.combine(tomorrow, datetime.min.time())
-        delta = (midnight - now_dt).total_seconds()
-        # Safety: never negative
-        return max(1.0, float(delta))
+    # Every worker polls, but only the holder of the SQLite `daily_run` lease
+    # ingests and builds upcoming daily runs ahead of time; job_status records
+    # the last successful day, so a missed midnight is caught up on the next
+    # poll (including right after boot). Rollover itself is a pointer flip that
+    # every worker attempts right after midnight.
+    DAILY_POLL_SECONDS = float(os.getenv("DAILY_POLL_SECONDS", "60"))
 
     def _run_daily_job():
+        owner = make_owner_id()
+        db_path = main_db_path
+        last_purge_day = today_str()
+        warmed_run_ids = set()
         # Run forever as a daemon
         while True:
             try:
-                # Sleep until next midnight
-                sleep_s = _seconds_until_next_midnight()
-                time.sleep(sleep_s)
-                # Execute inside app context
-                with app.app_context():
-                    # Create the new daily run
-                    db_path = os.path.join(base_dir, "database", "geo_chess.db")
-                    wrapper = SQLiteWrapper(db_path)
+                wrapper = SQLiteWrapper(db_path)
+                try:
+                    activate_due_daily_run(wrapper)
+                    # Warm today's and upcoming daily runs into this worker
+                    for run_id in wrapper.get_scheduled_daily_runs(
+                        today_str()
+                    ).values():
+                        if run_id not in warmed_run_ids:
+                            warm_run(wrapper, run_id)
+                            warmed_run_ids.add(run_id)
+                finally:
                     try:
-                        from geo_server.manage_runs import create_daily_run
-
-                        create_daily_run(
-                            wrapper,
-                            grab_new_tournaments=True,
-                            source=random.choice(["lichess", "world_champion"]),
-                        )
-                    finally:
-                        try:
-                            wrapper.conn.close()
-                        except Exception:
-                            pass
-                    # Purge sessions not accessed in the last hour
+                        wrapper.conn.close()
+                    except Exception:
+                        pass
+                with app.app_context():
+                    run_daily_job_if_due(db_path, owner, grab_new_tournaments=True)
+                # Purge sessions not accessed in the last hour (per-worker state)
+                if today_str() != last_purge_day:
+                    last_purge_day = today_str()
                     purge_old_sessions(max_age_seconds=3600)
-            except Exception:
-                # If anything goes wrong, wait a minute and retry scheduling
-                time.sleep(60)
+            except Exception as e:
+                print(f"Daily job failed: {e}")
+            # Wake up right after midnight so rollover is not delayed by the poll
+            time.sleep(
+                max(1.0, min(DAILY_POLL_SECONDS, seconds_until_next_midnight() + 1.0))
+            )
 
     def _start_daily_thread_if_needed():
         # Avoid duplicate threads in reloader/production multi-workers
@@ -407,133 +652,9 @@ def create_app() -> Flask:
         t.start()
         app.config["DAILY_THREAD_STARTED"] = True
 
-    def _build_game_meta(geo):
-        try:
-
-            def round_elo(val):
-                try:
-                    return int(round(int(val) / 100.0) * 100)
-                except Exception:
-                    return None
-
-            result_map = {1: "1-0", 0: "0-1", 0.5: "1/2-1/2"}
-            cg = geo.chess_game
-            res_key = None
-            try:
-                rv = float(cg.result) if cg is not None else None
-                if rv is not None:
-                    if abs(rv - 1.0) < 1e-9:
-                        res_key = 1
-                    elif abs(rv - 0.0) < 1e-9:
-                        res_key = 0
-                    else:
-                        res_key = 0.5
-            except Exception:
-                pass
-            return {
-                "result": result_map.get(res_key, ""),
-                "whiteElo": round_elo(cg.whiteElo) if cg else None,
-                "blackElo": round_elo(cg.blackElo) if cg else None,
-                "timeControl": (cg.timeControl if cg else "") or "",
-                "eco": (cg.eco if cg else "Unknown"),
-                "opening_name": (
-                    get_eco_openings().get(cg.eco, "Unknown") if cg else "Unknown"
-                ),
-                "moveNum": (
-                    int(geo.move_num)
-                    if getattr(geo, "move_num", None) is not None
-                    else None
-                ),
-                "whitePlayer": (cg.whitePlayer if cg else None),
-                "blackPlayer": (cg.blackPlayer if cg else None),
-                "year": (cg.year if cg else None),
-            }
-        except Exception:
-            return None
-
-    def _mask_game_meta(
-        game_meta: dict | None,
-        run_id: str | None,
-        puzzle_index: int | None,
-        black_info_rate: float | None,
-    ) -> dict | None:
-        if not game_meta:
-            return game_meta
-        try:
-            bir = float(black_info_rate or 0.0)
-        except Exception:
-            bir = 0.0
-        if bir <= 0:
-            return game_meta
-        # Deterministic pseudo-random using SHA256 of (run_id|index|field)
-        import hashlib
-
-        def masked(field_name: str, value):
-            try:
-                key = f"{run_id}|{puzzle_index}|{field_name}".encode("utf-8")
-                h = hashlib.sha256(key).digest()
-                # Use first 4 bytes to get a float in [0,1)
-                import struct
-
-                rnd = struct.unpack("!I", h[:4])[0] / 2**32
-                if rnd < bir:
-                    return "*****"
-                return value
-            except Exception:
-                return value
-
-        masked_meta = dict(game_meta)
-        masked_meta["result"] = masked("result", game_meta.get("result"))
-        masked_meta["whiteElo"] = masked("whiteElo", game_meta.get("whiteElo"))
-        masked_meta["blackElo"] = masked("blackElo", game_meta.get("blackElo"))
-        masked_meta["timeControl"] = masked("timeControl", game_meta.get("timeControl"))
-        masked_meta["moveNum"] = masked("moveNum", game_meta.get("moveNum"))
-        masked_meta["whitePlayer"] = masked("whitePlayer", game_meta.get("whitePlayer"))
-        masked_meta["blackPlayer"] = masked("blackPlayer", game_meta.get("blackPlayer"))
-        masked_meta["year"] = masked("year", game_meta.get("year"))
-        masked_meta["opening_name"] = masked(
-            "opening_name", game_meta.get("opening_name")
-        )
-        return masked_meta
-
-    def _subfen_last_move_cells(geo):
-        cells = []
-        try:
-            lm = (geo.last_move or "").strip()
-            if len(lm) == 4:
-
-                def sq_to_rc(sq: str):
-                    files = "abcdefgh"
-                    file_c = sq[0].lower()
-                    rank_c = sq[1]
-                    if file_c not in files or not rank_c.isdigit():
-                        return None
-                    col = files.index(file_c)
-                    rank = int(rank_c)
-                    if rank < 1 or rank > 8:
-                        return None
-                    row = 8 - rank  # 0 is top (rank 8)
-                    return row, col
-
-                src = sq_to_rc(lm[0:2])
-                dst = sq_to_rc(lm[2:4])
-                bx, by = int(geo.posx), int(geo.posy)
-                w, h = int(geo.dimx), int(geo.dimy)
-                if src is not None:
-                    sr, sc = src
-                    if by <= sr < by + h and bx <= sc < bx + w:
-                        cells.append({"r": sr - by, "c": sc - bx})
-                if dst is not None:
-                    dr, dc = dst
-                    if by <= dr < by + h and bx <= dc < bx + w:
-                        cells.append({"r": dr - by, "c": dc - bx})
-        except Exception:
-            pass
-        return cells
-
     @app.route("/run/<run_id>")
     def run_page(run_id: str):
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
+        db_path = main_db_path
         wrapper = SQLiteWrapper(db_path)
         run = wrapper.get_run(run_id)
         if run is None or not run.puzzle_ids:
@@ -570,39 +691,50 @@ def create_app() -> Flask:
         runs_state[run.identifier] = st
         session["runs"] = runs_state
         session["active_run_id"] = run.identifier
-        geo = wrapper.get_geo_chess(run.puzzle_ids[index])
+        # Check if already submitted
+        submissions = st.get("submissions") or []
+        prior_sub = None
+        if 0 <= index < len(submissions):
+            prior_sub = submissions[index]
+        # Pass all submissions if this is the last puzzle (for run summary)
+        all_subs = submissions if index == len(run.puzzle_ids) - 1 else []
         try:
-            wrapper.conn.close()
-        except Exception:
-            pass
-        if geo is None:
+            html = app.config["PAGE_CACHE"].get_or_load(
+                run_page_key(run, index, _render_version()),
+                lambda: _render_run_puzzle(wrapper, run, index),
+            )
+        finally:
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+        if html is None:
             return "Puzzle not found", 404
+        return _with_session_state(html, prior_sub, all_subs, run)
+
+    def _render_run_puzzle(wrapper, run, index: int):
+        """index.html for one puzzle of a run, minus the per-session state."""
+        geo = wrapper.get_geo_chess(run.puzzle_ids[index])
+        if geo is None:
+            return None
         initial_subfen = geo.subfen
         geochess_id = geo.id
-        try:
-            top_left_light = ((int(geo.posx) + int(geo.posy)) % 2) == 0
-        except Exception:
-            top_left_light = None
-        game_meta = _build_game_meta(geo)
+        display = puzzle_display(geo)
+        top_left_light = display["top_left_light"]
+        game_meta = display["game_meta"]
         # Apply deterministic masking based on run settings
         try:
-            masked_meta = _mask_game_meta(
+            masked_meta = mask_game_meta(
                 game_meta,
                 run.identifier,
                 index,
+                len(run.puzzle_ids),
                 run.black_info_rate,
             )
         except Exception:
             raise
             masked_meta = game_meta
-        last_move_cells = _subfen_last_move_cells(geo)
-        # Check if already submitted
-        submissions = st.get("submissions") or []
-        prior_sub = None
-        if 0 <= index < len(submissions):
-            prior_sub = submissions[index]
-        # Pass all submissions if this is the last puzzle (for run summary)
-        all_subs = submissions if index == len(run.puzzle_ids) - 1 else []
+        last_move_cells = display["last_move_cells"]
         return render_template(
             "index.html",
             initial_subfen=initial_subfen,
@@ -615,21 +747,25 @@ def create_app() -> Flask:
             run_len=len(run.puzzle_ids),
             run_puzzle_ids=run.puzzle_ids,
             is_daily=run.is_daily,
-            prior_submission=prior_sub,
-            all_submissions=all_subs,
+            session_state=SESSION_STATE_MARKER,
             metadata_fields=run.metadata_fields,
-            run_completed_count=getattr(run, "completed_count", 0),
-            run_avg_time_seconds=getattr(run, "avg_time_seconds", None),
-            run_avg_correct_count=getattr(run, "avg_correct_count", None),
         )
 
     @app.route("/styles/<path:filename>")
     def styles(filename: str):
-        return send_from_directory(styles_dir, filename)
+        return asset_manifest.serve("styles", filename)
 
     @app.route("/scripts/<path:filename>")
     def scripts(filename: str):
-        return send_from_directory(scripts_dir, filename)
+        return asset_manifest.serve("scripts", filename)
+
+    @app.route("/sprites/pieces.svg")
+    def piece_sprite():
+        entry = app.config.get("PIECE_SPRITE")
+        if entry is None:
+            return "Not found", 404
+        body, gzipped, etag = entry
+        return precompressed_response(body, gzipped, etag, "image/svg+xml")
 
     @app.route("/favicon.ico")
     def favicon():
@@ -637,7 +773,7 @@ def create_app() -> Flask:
 
     @app.route("/assets/<path:filename>")
     def assets(filename: str):
-        return send_from_directory(assets_dir, filename)
+        return asset_manifest.serve("assets", filename)
 
     @app.route("/api/check_position", methods=["POST"])
     def api_check_position():
@@ -656,7 +792,7 @@ def create_app() -> Flask:
         except Exception:
             is_single = False
 
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
+        db_path = main_db_path
         wrapper = SQLiteWrapper(db_path)
         geo = wrapper.get_geo_chess(rec_id)
         try:
@@ -713,48 +849,12 @@ def create_app() -> Flask:
         posx = int(geo.posx)
         posy = int(geo.posy)
         correct = x == posx and y == posy
-        # Build game link info
-        try:
-            move_num = int(geo.move_num)
-            white_to_move = bool(geo.white_to_move)
-            half_move_num = (move_num - 1) * 2 + (0 if white_to_move else 1)
-        except Exception:
-            half_move_num = None
-        game_id = geo.chess_game.gameId if geo.chess_game else None
-        game_url = (
-            f"https://lichess.org/{game_id}#{half_move_num}"
-            if (game_id and half_move_num is not None)
-            else None
-        )
-        # Last move absolute cells on 8x8 board
-        last_move_cells = []
-        try:
-            lm = (geo.last_move or "").strip()
-            if len(lm) == 4:
-
-                def sq_to_rc(sq: str):
-                    files = "abcdefgh"
-                    file_c = sq[0].lower()
-                    rank_c = sq[1]
-                    if file_c not in files or not rank_c.isdigit():
-                        return None
-                    col = files.index(file_c)
-                    rank = int(rank_c)
-                    if rank < 1 or rank > 8:
-                        return None
-                    row = 8 - rank
-                    return row, col
-
-                src = sq_to_rc(lm[0:2])
-                dst = sq_to_rc(lm[2:4])
-                if src is not None:
-                    sr, sc = src
-                    last_move_cells.append({"r": sr, "c": sc})
-                if dst is not None:
-                    dr, dc = dst
-                    last_move_cells.append({"r": dr, "c": dc})
-        except Exception:
-            pass
+        # Game link info and absolute last-move cells on the 8x8 board
+        display = puzzle_display(geo)
+        half_move_num = display["half_move_num"]
+        game_id = display["game_id"]
+        game_url = display["game_url"]
+        last_move_cells = display["last_move_cells_abs"]
         # Update session submission state for active run (if any, and not single-puzzle mode)
         submissions = []
         time_taken_seconds = None
@@ -791,9 +891,7 @@ def create_app() -> Flask:
                                             for s in submissions
                                             if s and s.get("correct")
                                         )
-                                        db_path2 = os.path.join(
-                                            base_dir, "database", "geo_chess.db"
-                                        )
+                                        db_path2 = main_db_path
                                         wrapper_stats = SQLiteWrapper(db_path2)
                                         wrapper_stats.update_run_completion_stats(
                                             active_run_id,
@@ -833,13 +931,17 @@ def create_app() -> Flask:
 
         # Increment total puzzles-solved counter on every valid check
         try:
-            _increment_puzzles_solved()
+            _increment_puzzles_solved(geo)
         except Exception:
             pass
 
+        # Counts before this attempt (the cached puzzle is updated in place below)
+        cur_succ = int(getattr(geo, "successes", 0) or 0)
+        cur_fail = int(getattr(geo, "fails", 0) or 0)
+
         # Update per-puzzle successes/fails
         try:
-            db_path3 = os.path.join(base_dir, "database", "geo_chess.db")
+            db_path3 = main_db_path
             wrapper_sf = SQLiteWrapper(db_path3)
             wrapper_sf.increment_geo_chess_attempt(rec_id, bool(correct))
             try:
@@ -851,10 +953,8 @@ def create_app() -> Flask:
 
         # Build game meta for response and include up-to-date successes/fails estimate
         try:
-            gm = _build_game_meta(geo) or {}
+            gm = dict(display["game_meta"] or {})
             # Use in-memory increment to reflect this attempt immediately
-            cur_succ = int(getattr(geo, "successes", 0) or 0)
-            cur_fail = int(getattr(geo, "fails", 0) or 0)
             if bool(correct):
                 gm["successes"] = cur_succ + 1
                 gm["fails"] = cur_fail
@@ -862,7 +962,7 @@ def create_app() -> Flask:
                 gm["successes"] = cur_succ
                 gm["fails"] = cur_fail + 1
         except Exception:
-            gm = _build_game_meta(geo)
+            gm = display["game_meta"]
 
         return jsonify(
             {
@@ -874,7 +974,12 @@ def create_app() -> Flask:
                 "halfMoveNum": half_move_num,
                 "gameUrl": game_url,
                 "lastMoveCells": last_move_cells,
-                "pgn": (geo.chess_game.pgn if geo and geo.chess_game else None),
+                # PGN is served (and cached) separately; see api_game_pgn
+                "pgnUrl": (
+                    f"/api/game/{game_id}/pgn"
+                    if game_id and geo.chess_game and geo.chess_game.pgn
+                    else None
+                ),
                 # In feedback, do not apply masking – send full metadata
                 "gameMeta": gm,
                 # Full submissions array for run summary on the client
@@ -886,7 +991,7 @@ def create_app() -> Flask:
 
     @app.route("/api/next/<run_id>", methods=["GET"])
     def api_next(run_id: str):
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
+        db_path = main_db_path
         wrapper = SQLiteWrapper(db_path)
         run = wrapper.get_run(run_id)
         if run is None or not run.puzzle_ids:
@@ -909,8 +1014,28 @@ def create_app() -> Flask:
             except Exception:
                 pass
             return jsonify({"ok": False, "error": "No more puzzles"}), 404
-        geo = wrapper.get_geo_chess(run.puzzle_ids[next_index])
         is_last = next_index == len(run.puzzle_ids) - 1
+        # lite=1: the client renders from the run bundle and only needs the
+        # session index advanced, so skip loading the puzzle
+        if request.args.get("lite") == "1":
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+            st["current_index"] = next_index
+            runs_state[run.identifier] = st
+            session["runs"] = runs_state
+            session["active_run_id"] = run.identifier
+            return jsonify(
+                {
+                    "ok": True,
+                    "index": next_index,
+                    "len": len(run.puzzle_ids),
+                    "is_last": is_last,
+                    "is_daily": run.is_daily,
+                }
+            )
+        geo = wrapper.get_geo_chess(run.puzzle_ids[next_index])
         try:
             wrapper.conn.close()
         except Exception:
@@ -920,22 +1045,21 @@ def create_app() -> Flask:
 
         initial_subfen = geo.subfen
         geochess_id = geo.id
-        last_move_cells = _subfen_last_move_cells(geo)
-        try:
-            top_left_light = ((int(geo.posx) + int(geo.posy)) % 2) == 0
-        except Exception:
-            top_left_light = None
-        game_meta = _build_game_meta(geo)
+        display = puzzle_display(geo)
+        last_move_cells = display["last_move_cells"]
+        top_left_light = display["top_left_light"]
+        game_meta = display["game_meta"]
         # Update session index
         st["current_index"] = next_index
         runs_state[run.identifier] = st
         session["runs"] = runs_state
         session["active_run_id"] = run.identifier
         try:
-            masked_meta = _mask_game_meta(
+            masked_meta = mask_game_meta(
                 game_meta,
                 run.identifier,
                 next_index,
+                len(run.puzzle_ids),
                 run.black_info_rate,
             )
         except Exception:
@@ -955,6 +1079,119 @@ def create_app() -> Flask:
             }
         )
 
+    # -------------------- Run bundle --------------------
+    # A run's puzzle list and masking are fixed at creation, so the masked
+    # payloads for the whole run are encoded once and served as immutable.
+    app.config.setdefault(
+        "RUN_BUNDLE_CACHE",
+        TTLCache(
+            "run_bundles",
+            max_size=int(os.getenv("RUN_BUNDLE_CACHE_SIZE", "512")),
+            ttl_seconds=float(os.getenv("RUN_BUNDLE_CACHE_TTL", "3600")),
+        ),
+    )
+
+    def _build_run_bundle(run_id: str):
+        db_path = main_db_path
+        wrapper = SQLiteWrapper(db_path)
+        try:
+            run = wrapper.get_run(run_id)
+            if run is None or not run.puzzle_ids:
+                return None
+            geos = wrapper.get_geo_chess_many(run.puzzle_ids)
+        finally:
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+        n = len(run.puzzle_ids)
+        puzzles = []
+        for index, puzzle_id in enumerate(run.puzzle_ids):
+            geo = geos.get(int(puzzle_id))
+            if geo is None:
+                return None
+            display = puzzle_display(geo)
+            try:
+                masked_meta = mask_game_meta(
+                    display["game_meta"], run.identifier, index, n, run.black_info_rate
+                )
+            except Exception:
+                masked_meta = display["game_meta"]
+            # Same fields as /api/next; no answer position or solve stats
+            puzzles.append(
+                {
+                    "initial_subfen": geo.subfen,
+                    "geochess_id": geo.id,
+                    "last_move_cells": display["last_move_cells"],
+                    "top_left_light": display["top_left_light"],
+                    "game_meta": masked_meta,
+                    "index": index,
+                    "len": n,
+                    "is_last": index == n - 1,
+                }
+            )
+        body = dumps_bytes(
+            {
+                "ok": True,
+                "run_id": run.identifier,
+                "len": n,
+                "metadata_fields": run.metadata_fields,
+                "puzzles": puzzles,
+            }
+        )
+        return body, strong_etag(body)
+
+    @app.route("/api/run/<run_id>/bundle", methods=["GET"])
+    def api_run_bundle(run_id: str):
+        bundle = app.config["RUN_BUNDLE_CACHE"].get_or_load(
+            run_id, lambda: _build_run_bundle(run_id)
+        )
+        if bundle is None:
+            return jsonify({"ok": False, "error": "Run not found"}), 404
+        body, etag = bundle
+        return cached_response(body, etag)
+
+    # -------------------- Game PGNs --------------------
+    # A game's PGN never changes, so it is served once per client with an
+    # immutable cache policy, stored here identity + gzip encoded.
+    app.config.setdefault(
+        "PGN_CACHE",
+        TTLCache(
+            "game_pgns",
+            max_size=int(os.getenv("PGN_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("PGN_CACHE_TTL", "3600")),
+        ),
+    )
+
+    def _load_pgn(game_id: str):
+        db_path = main_db_path
+        wrapper = SQLiteWrapper(db_path)
+        try:
+            cg = wrapper.get_chess_game(game_id)
+        finally:
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+        if cg is None or not cg.pgn:
+            return None
+        body = cg.pgn.encode("utf-8")
+        return body, gzip_bytes(body), strong_etag(body)
+
+    @app.route("/api/game/<game_id>/pgn", methods=["GET"])
+    def api_game_pgn(game_id: str):
+        entry = app.config["PGN_CACHE"].get_or_load(game_id, lambda: _load_pgn(game_id))
+        if entry is None:
+            return jsonify({"ok": False, "error": "Not found"}), 404
+        body, gzipped, etag = entry
+        return precompressed_response(
+            body,
+            gzipped,
+            etag,
+            "application/x-chess-pgn",
+            headers={"Content-Disposition": 'attachment; filename="game.pgn"'},
+        )
+
     @app.route("/api/create_run", methods=["POST"])
     def api_create_run():
         try:
@@ -962,59 +1199,43 @@ def create_app() -> Flask:
         except Exception:
             return jsonify({"ok": False, "error": "Invalid payload"}), 400
 
-        # Map difficulty from slider (0..3) to percentages and black_info_rate
-        difficulty = int(data.get("difficulty", 1))
-        if difficulty == 0:
-            min_dp, max_dp, bir, min_score = 0.0, 0.3, 0.0, 6.0
-        elif difficulty == 1:
-            min_dp, max_dp, bir, min_score = 0.2, 0.6, 0.2, 6.0
-        elif difficulty == 2:
-            min_dp, max_dp, bir, min_score = 0.4, 0.8, 0.5, 5.0
-        else:
-            min_dp, max_dp, bir, min_score = 0.6, 1.0, 0.8, 5.0
-
-        n_puzzles = int(data.get("n_puzzles", 10))
-        min_move = int(data.get("min_move", 5))
-        max_move = int(data.get("max_move", 20))
+        try:
+            difficulty = max(0, min(3, int(data.get("difficulty", 1))))
+            n_puzzles = int(data.get("n_puzzles", 10))
+            min_move = int(data.get("min_move", 5))
+            max_move = int(data.get("max_move", 20))
+        except Exception:
+            return jsonify({"ok": False, "error": "Invalid payload"}), 400
         source = (data.get("source") or "lichess").strip()
         if source not in ("lichess", "world_champion"):
             source = "lichess"
 
-        # Derive metadata_fields from selected source
-        try:
-            source_fields = SOURCE_METADATA_FIELDS.get(source, [])
-        except Exception:
-            source_fields = []
-
-        settings = RunSettings(
-            min_difficulty_percentage=min_dp,
-            max_difficulty_percentage=max_dp,
-            min_score=min_score,
-            n_puzzles=n_puzzles,
-            max_played=None,
-            early_timestamp=None,
-            late_timestamp=None,
-            min_move_num=min_move,
-            max_move_num=max_move,
-            black_info_rate=bir,
-            source=source,
-            metadata_fields=source_fields,
-        )
-
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
+        db_path = main_db_path
         wrapper = SQLiteWrapper(db_path)
         try:
+            # Presets offered by the form are served from the pre-generated pool
+            if is_pooled_preset(difficulty, n_puzzles, min_move, max_move, source):
+                run_id = wrapper.pop_run_pool(
+                    preset_key(difficulty, n_puzzles, min_move, max_move, source)
+                )
+                # Top the pool back up in the job worker
+                try:
+                    wrapper.enqueue_job("refill_run_pool", {}, dedupe=True)
+                except Exception:
+                    pass
+                if run_id is not None:
+                    return jsonify({"ok": True, "run_id": run_id})
+            settings = run_settings_for_request(
+                difficulty, n_puzzles, min_move, max_move, source
+            )
             run = create_run_and_add_to_database(wrapper, settings, False)
-        except Exception as e:
+        except Exception:
+            return jsonify({"ok": False, "error": "Failed to create run"}), 500
+        finally:
             try:
                 wrapper.conn.close()
             except Exception:
                 pass
-            return jsonify({"ok": False, "error": "Failed to create run"}), 500
-        try:
-            wrapper.conn.close()
-        except Exception:
-            pass
         return jsonify({"ok": True, "run_id": run.identifier})
 
     @app.route("/api/random_run", methods=["POST"])
@@ -1041,7 +1262,7 @@ def create_app() -> Flask:
         except Exception:
             seen = set()
 
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
+        db_path = main_db_path
         wrapper = SQLiteWrapper(db_path)
         try:
             # Query eligible runs: completed_count >= min_completed and not daily
@@ -1053,6 +1274,7 @@ def create_app() -> Flask:
                 params.extend(list(seen))
             cursor = wrapper.conn.execute(
                 f"SELECT identifier FROM runs WHERE IFNULL(completed_count,0) >= ? AND IFNULL(is_daily,0) = 0{exclude_clause}"
+                " AND identifier NOT IN (SELECT run_id FROM run_pool)"
                 " ORDER BY RANDOM() LIMIT 1",
                 tuple(params) if params else (),
             )
@@ -1083,25 +1305,43 @@ def create_app() -> Flask:
         except Exception:
             return jsonify({"ok": False, "error": "Failed"}), 500
 
-    @app.route("/certificate/<cert_id>", methods=["GET"])
-    def certificate_page(cert_id: str):
-        db_path = os.path.join(base_dir, "database", "geo_chess.db")
+    # -------------------- Certificates --------------------
+    # Certificate data is immutable; the rendered page also carries the run's
+    # live stats, so cached pages are keyed by the run version as well.
+    app.config.setdefault(
+        "CERT_PAGE_CACHE",
+        TTLCache(
+            "certificate_pages",
+            max_size=int(os.getenv("CERT_PAGE_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("CERT_PAGE_TTL", "300")),
+        ),
+    )
+
+    def _certificate_with_run(cert_id: str):
+        """(certificate, run) from the per-process caches, else from SQLite."""
+        cert = SQLiteWrapper.CERT_CACHE.peek(cert_id)
+        run_id = cert.get("run_id") if cert is not None else None
+        run = SQLiteWrapper.RUN_CACHE.peek(run_id) if run_id else None
+        if cert is not None and (run is not None or not run_id):
+            return cert, run
+        db_path = main_db_path
         wrapper = SQLiteWrapper(db_path)
-        cert = wrapper.get_certificate(cert_id)
         try:
-            wrapper.conn.close()
-        except Exception:
-            pass
-        if cert is None:
-            return "Certificate not found", 404
-        # Also fetch run stats for header if available
-        db_path2 = os.path.join(base_dir, "database", "geo_chess.db")
-        wrapper2 = SQLiteWrapper(db_path2)
-        run = wrapper2.get_run(cert["run_id"]) if cert.get("run_id") else None
-        try:
-            wrapper2.conn.close()
-        except Exception:
-            pass
+            cert = wrapper.get_certificate(cert_id)
+            # Also fetch run stats for header if available
+            run = (
+                wrapper.get_run(cert["run_id"])
+                if cert is not None and cert.get("run_id")
+                else None
+            )
+        finally:
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+        return cert, run
+
+    def _render_certificate_page(cert: dict, run):
         return render_template(
             "certificate.html",
             run_id=cert["run_id"],
@@ -1117,6 +1357,219 @@ def create_app() -> Flask:
             ),
         )
 
+    @app.route("/certificate/<cert_id>", methods=["GET"])
+    def certificate_page(cert_id: str):
+        cert, run = _certificate_with_run(cert_id)
+        if cert is None:
+            return "Certificate not found", 404
+        run_version = _run_version(run) if run is not None else None
+        etag = version_etag("certificate", cert_id, run_version, _render_version())
+        return conditional_page(
+            etag,
+            lambda: app.config["CERT_PAGE_CACHE"].get_or_load(
+                (cert_id, run_version), lambda: _render_certificate_page(cert, run)
+            ),
+        )
+
+    @app.route("/api/certificate/<cert_id>", methods=["GET"])
+    def api_certificate(cert_id: str):
+        db_path = main_db_path
+        wrapper = SQLiteWrapper(db_path)
+        try:
+            cert = wrapper.get_certificate(cert_id)
+        finally:
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+        if cert is None:
+            return jsonify({"ok": False, "error": "Certificate not found"}), 404
+        body = dumps_bytes({"ok": True, **cert})
+        return cached_response(body, strong_etag(body))
+
+    # -------------------- Admin: background jobs --------------------
+    def _is_admin_request() -> bool:
+        token = os.getenv("ADMIN_TOKEN")
+        if not token:
+            return False
+        supplied = request.headers.get("X-Admin-Token") or ""
+        return _secrets.compare_digest(supplied, token)
+
+    @app.route("/api/admin/jobs", methods=["POST"])
+    def api_admin_enqueue_job():
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        try:
+            data = request.get_json(force=True, silent=False) or {}
+            kind = str(data.get("kind") or "")
+            payload = data.get("payload") or {}
+        except Exception:
+            return jsonify({"ok": False, "error": "Invalid payload"}), 400
+        if kind not in JOB_HANDLERS:
+            return jsonify({"ok": False, "error": "Unknown job kind"}), 400
+        db_path = main_db_path
+        job_id = enqueue_job(db_path, kind, payload, dedupe=True)
+        return jsonify({"ok": True, "job_id": job_id})
+
+    @app.route("/api/admin/jobs/<int:job_id>", methods=["GET"])
+    def api_admin_job_status(job_id: int):
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        db_path = main_db_path
+        job = get_job(db_path, job_id)
+        if job is None:
+            return jsonify({"ok": False, "error": "Not found"}), 404
+        return jsonify({"ok": True, "job": job})
+
+    @app.route("/api/admin/jobs/<int:job_id>/cancel", methods=["POST"])
+    def api_admin_cancel_job(job_id: int):
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        db_path = main_db_path
+        wrapper = SQLiteWrapper(db_path)
+        try:
+            cancelled = wrapper.request_job_cancel(job_id)
+        finally:
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+        return jsonify({"ok": cancelled})
+
+    @app.route("/api/admin/cache_stats", methods=["GET"])
+    def api_admin_cache_stats():
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        return jsonify(
+            {
+                "ok": True,
+                "pid": os.getpid(),
+                "caches": SQLiteWrapper.cache_stats(),
+                "redis": redis_pool.stats(),
+            }
+        )
+
+    @app.route("/api/admin/query_stats", methods=["GET"])
+    def api_admin_query_stats():
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        try:
+            top = int(request.args.get("top", "50"))
+        except Exception:
+            top = 50
+        stats = QUERY_LOG.stats(top, request.args.get("order", "total"))
+        if request.args.get("reset") == "1":
+            QUERY_LOG.reset()
+        return jsonify({"ok": True, "pid": os.getpid(), **stats})
+
+    # -------------------- Admin: memory --------------------
+    # Long-lived per-worker structures, reported with their approximate deep size
+    for _name in ("SESSION_INDEX", "REVOKED_SIDS", "VISITOR_HLL", "VISITOR_HLL_WINDOWS"):
+        memory.register_structure(_name, lambda key=_name: app.config.get(key))
+    memory.register_structure(
+        "eco_openings",
+        # Only once loaded; measuring must not trigger the load
+        lambda: get_eco_openings() if get_eco_openings.cache_info().currsize else None,
+    )
+    memory.register_structure("eco_openings_lru", lambda: get_eco_openings)
+    memory.register_structure("run_mask_bitmap_lru", lambda: run_mask_bitmap)
+    memory.register_structure("normalize_sql_lru", lambda: normalize_sql)
+    memory.register_structure("asset_manifest", lambda: asset_manifest.files)
+    memory.register_structure("query_log", QUERY_LOG.entries)
+    if int(os.getenv("TRACEMALLOC_FRAMES", "0")) > 0:
+        memory.start_tracing(int(os.getenv("TRACEMALLOC_FRAMES")))
+    if float(os.getenv("MEMORY_LOG_INTERVAL", "0")) > 0:
+        memory.start_periodic_log(float(os.getenv("MEMORY_LOG_INTERVAL")))
+
+    @app.route("/api/admin/memory", methods=["GET"])
+    def api_admin_memory():
+        """
+        This worker's memory report. ?since=<label> adds the growth since that
+        snapshot; ?from=<label>&to=<label> compares two stored snapshots.
+        """
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        try:
+            top = int(request.args.get("top", str(memory.TOP_ALLOCATORS)))
+        except Exception:
+            top = memory.TOP_ALLOCATORS
+        old_label = request.args.get("from") or request.args.get("since")
+        if old_label:
+            old = memory.get_snapshot(old_label)
+            if old is None:
+                return jsonify({"ok": False, "error": "Unknown snapshot"}), 404
+            if request.args.get("to"):
+                new = memory.get_snapshot(request.args["to"])
+                if new is None:
+                    return jsonify({"ok": False, "error": "Unknown snapshot"}), 404
+            else:
+                new = memory.memory_report(top, with_snapshot=True)
+            return jsonify(
+                {
+                    "ok": True,
+                    "pid": os.getpid(),
+                    "report": memory.public(new),
+                    "diff": memory.diff_reports(old, new, top),
+                }
+            )
+        return jsonify(
+            {
+                "ok": True,
+                "report": memory.public(memory.memory_report(top)),
+                "snapshots": memory.snapshot_labels(),
+            }
+        )
+
+    @app.route("/api/admin/memory/snapshots", methods=["POST"])
+    def api_admin_memory_snapshot():
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        data = request.get_json(silent=True) or {}
+        label = memory.take_snapshot(str(data.get("label") or "") or None)
+        return jsonify(
+            {
+                "ok": True,
+                "pid": os.getpid(),
+                "label": label,
+                "snapshots": memory.snapshot_labels(),
+            }
+        )
+
+    @app.route("/api/admin/memory/tracemalloc", methods=["POST"])
+    def api_admin_tracemalloc():
+        if not _is_admin_request():
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        data = request.get_json(silent=True) or {}
+        action = data.get("action")
+        if action == "start":
+            changed = memory.start_tracing(int(data.get("frames") or 1))
+        elif action == "stop":
+            changed = memory.stop_tracing()
+        else:
+            return jsonify({"ok": False, "error": "action must be start or stop"}), 400
+        return jsonify({"ok": True, "pid": os.getpid(), "changed": changed})
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        # Scrapers authenticate with `Authorization: Bearer $ADMIN_TOKEN` (or X-Admin-Token)
+        token = os.getenv("ADMIN_TOKEN")
+        bearer = request.headers.get("Authorization") or ""
+        allowed = _is_admin_request() or (
+            bool(token)
+            and bearer.startswith("Bearer ")
+            and _secrets.compare_digest(bearer[len("Bearer ") :], token)
+        )
+        if not allowed and os.getenv("METRICS_PUBLIC") != "true":
+            return jsonify({"ok": False, "error": "Forbidden"}), 403
+        publish_metrics(force=True)
+        resp = Response(
+            render_prometheus(collect_snapshots()),
+            mimetype="text/plain",
+        )
+        resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+
     # Ensure the daily thread is started when the app is created
     _start_daily_thread_if_needed()
     return app
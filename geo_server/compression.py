@@ -0,0 +1,182 @@
+"""
+Response compression for dynamic HTML and JSON.
+
+An after_request hook compresses buffered responses of allowlisted content
+types above a size threshold, using the best coding the client accepts
+(brotli when the optional `brotli` module is installed, else gzip/deflate).
+Streamed and file responses, already-encoded bodies and responses marked
+no-transform are left alone.
+
+`python -m geo_server.compression` benchmarks compression CPU time against
+bytes saved on payloads rendered by the app.
+"""
+
+import gzip
+import os
+import time
+import zlib
+
+from flask import Flask, request
+
+from geo_server.http_caching import coded_etag, preferred_encoding
+
+try:
+    import brotli  # optional
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/csv",
+    "application/json",
+    "application/javascript",
+    "application/x-chess-pgn",
+    "image/svg+xml",
+}
+
+
+def compress_bytes(data: bytes, coding: str, level: int, br_quality: int) -> bytes:
+    if coding == "br":
+        return brotli.compress(data, quality=br_quality)
+    if coding == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if coding == "deflate":
+        return zlib.compress(data, level)
+    raise ValueError(f"Unsupported coding: {coding}")
+
+
+def available_codings() -> tuple[str, ...]:
+    """Supported codings in server preference order."""
+    return (("br",) if brotli is not None else ()) + ("gzip", "deflate")
+
+
+def init_compression(
+    app: Flask,
+    min_size: int | None = None,
+    level: int | None = None,
+    br_quality: int | None = None,
+):
+    """Register the compression hook on `app` (settings default to env vars)."""
+    min_size = int(min_size if min_size is not None else os.getenv("COMPRESS_MIN_SIZE", "500"))
+    level = int(level if level is not None else os.getenv("COMPRESS_LEVEL", "6"))
+    br_quality = int(
+        br_quality if br_quality is not None else os.getenv("COMPRESS_BR_QUALITY", "4")
+    )
+    codings = available_codings()
+
+    @app.after_request
+    def _compress_response(response):
+        try:
+            if (
+                response.status_code < 200
+                or response.status_code in (204, 206, 304)
+                or request.method == "HEAD"
+                # Streamed bodies and send_file responses must not be buffered here
+                or response.direct_passthrough
+                or response.is_streamed
+                or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or "no-transform" in (response.headers.get("Cache-Control") or "")
+            ):
+                return response
+            # Vary even when this client gets identity: caches must not reuse it for others
+            response.vary.add("Accept-Encoding")
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            coding = preferred_encoding(codings)
+            if coding is None:
+                return response
+            packed = compress_bytes(data, coding, level, br_quality)
+            if len(packed) >= len(data):
+                return response
+            response.set_data(packed)
+            response.headers["Content-Encoding"] = coding
+            etag = response.headers.get("ETag")
+            if etag:
+                response.headers["ETag"] = coded_etag(etag, coding)
+        except Exception as e:
+            print(f"Response compression skipped: {e}")
+        return response
+
+    return _compress_response
+
+
+# -------------------- Benchmark --------------------
+def bench(samples: dict[str, bytes], repeat: int = 50) -> list[dict]:
+    """Per (payload, coding, level): compressed size and mean CPU time per call."""
+    settings = [("gzip", 1), ("gzip", 6), ("gzip", 9), ("deflate", 6)]
+    if brotli is not None:
+        settings += [("br", 4), ("br", 11)]
+    results = []
+    for name, data in samples.items():
+        for coding, level in settings:
+            start = time.process_time()
+            for _ in range(repeat):
+                packed = compress_bytes(data, coding, level, level)
+            elapsed = (time.process_time() - start) / repeat
+            results.append(
+                {
+                    "payload": name,
+                    "coding": f"{coding}:{level}",
+                    "raw_bytes": len(data),
+                    "compressed_bytes": len(packed),
+                    "saved_pct": 100.0 * (1 - len(packed) / max(1, len(data))),
+                    "cpu_us": elapsed * 1e6,
+                }
+            )
+    return results
+
+
+def _collect_samples() -> dict[str, bytes]:
+    """
+    Typical payloads, rendered through the app against the local database.
+    Only read-only endpoints are sampled: a guess on /api/check_position
+    would update the real puzzle's counters.
+    """
+    os.environ.setdefault("NO_DAILY_RUNNER", "true")
+    from app import create_app
+    from geo_server.sqlite_wrapper import SQLiteWrapper
+
+    app = create_app()
+    client = app.test_client()
+    samples = {}
+    wrapper = SQLiteWrapper(
+        os.getenv("GEO_CHESS_DB") or os.path.join(app.root_path, "database", "geo_chess.db")
+    )
+    try:
+        run = wrapper.get_daily_run()
+        row = wrapper.conn.execute(
+            "SELECT pgn FROM chess_games WHERE pgn IS NOT NULL ORDER BY length(pgn) DESC LIMIT 1"
+        ).fetchone()
+    finally:
+        wrapper.conn.close()
+    if run is not None:
+        samples["run_page_html"] = client.get(f"/run/{run.identifier}").get_data()
+        samples["run_bundle_json"] = client.get(f"/api/run/{run.identifier}/bundle").get_data()
+        samples["next_json"] = client.get(f"/api/next/{run.identifier}").get_data()
+    if row is not None:
+        samples["longest_pgn"] = row[0].encode("utf-8")
+    samples["about_html"] = client.get("/about").get_data()
+    return samples
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark response compression")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    rows = bench(_collect_samples(), repeat=args.repeat)
+    print(f"{'payload':<18}{'coding':<11}{'raw':>9}{'packed':>9}{'saved':>8}{'cpu us':>10}")
+    for r in rows:
+        print(
+            f"{r['payload']:<18}{r['coding']:<11}{r['raw_bytes']:>9}"
+            f"{r['compressed_bytes']:>9}{r['saved_pct']:>7.1f}%{r['cpu_us']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import atexit
+import os
+import threading
+import time
+from typing import Optional
+
+from geo_server import redis_pool
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+COUNTER_KEY_PREFIX = "geochessr:counters:"
+
+
+class RedisCounterStore:
+    """Persist counters as plain Redis integers under geochessr:counters:<name>."""
+
+    def incr_many(self, deltas: dict[str, int]):
+        def _flush(rc):
+            pipe = rc.pipeline(transaction=False)
+            for name, amount in deltas.items():
+                pipe.incrby(COUNTER_KEY_PREFIX + name, amount)
+            pipe.execute()
+
+        redis_pool.call(_flush)
+
+    def get_many(self, names: list[str]) -> dict[str, int]:
+        values = redis_pool.call(
+            lambda rc: rc.mget([COUNTER_KEY_PREFIX + n for n in names])
+        )
+        return {n: int(v) if v is not None else 0 for n, v in zip(names, values)}
+
+
+class SQLiteCounterStore:
+    """Persist counters in the `counters` table (used in development)."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def incr_many(self, deltas: dict[str, int]):
+        wrapper = SQLiteWrapper(self.db_path)
+        try:
+            wrapper.increment_counters(deltas)
+        finally:
+            wrapper.conn.close()
+
+    def get_many(self, names: list[str]) -> dict[str, int]:
+        wrapper = SQLiteWrapper(self.db_path)
+        try:
+            return wrapper.get_counters(names)
+        finally:
+            wrapper.conn.close()
+
+
+class BatchedCounters:
+    """
+    Per-worker counter buffer. Increments are aggregated locally and flushed to
+    the store with one INCRBY pipeline every `flush_every` increments, every
+    `flush_interval` seconds (background thread) and at process shutdown.
+    """
+
+    def __init__(self, store, flush_every: int = 100, flush_interval: float = 5.0):
+        self.store = store
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval = float(flush_interval)
+        self._pending: dict[str, int] = {}
+        self._pending_ops = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._started_pid: Optional[int] = None
+
+    def incr(self, name: str, amount: int = 1):
+        # Threads do not survive uWSGI's fork; (re)start the flusher per worker
+        if self._started_pid != os.getpid():
+            self.start()
+        with self._lock:
+            self._pending[name] = self._pending.get(name, 0) + int(amount)
+            self._pending_ops += 1
+            should_flush = self._pending_ops >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def pending(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self) -> bool:
+        with self._lock:
+            if not self._pending:
+                return True
+            batch = self._pending
+            self._pending = {}
+            self._pending_ops = 0
+        try:
+            self.store.incr_many(batch)
+            return True
+        except Exception as e:
+            print(f"Failed to flush counters: {e}")
+            # Put the batch back so it is retried on the next flush
+            with self._lock:
+                for name, amount in batch.items():
+                    self._pending[name] = self._pending.get(name, 0) + amount
+            return False
+
+    def get(self, names: list[str]) -> dict[str, int]:
+        """Persisted values plus this worker's not-yet-flushed increments."""
+        try:
+            values = self.store.get_many(names)
+        except Exception:
+            values = {n: 0 for n in names}
+        pending = self.pending()
+        return {n: int(values.get(n, 0)) + pending.get(n, 0) for n in names}
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def start(self):
+        """Start the periodic flusher and register shutdown flushing."""
+        if self._started_pid == os.getpid():
+            return
+        self._started_pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._flush_loop, name="counter-flusher", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.flush)
+        # uWSGI workers do not reliably run atexit handlers; chain its hook too
+        try:
+            import uwsgi  # type: ignore
+
+            previous = getattr(uwsgi, "atexit", None)
+
+            def _uwsgi_atexit():
+                self.flush()
+                if previous is not None:
+                    previous()
+
+            uwsgi.atexit = _uwsgi_atexit
+        except ImportError:
+            pass
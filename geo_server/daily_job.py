@@ -0,0 +1,294 @@
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from geo_server.sqlite_wrapper import SQLiteWrapper
+from geo_server.manage_runs import create_daily_run
+from geo_server.job_queue import enqueue_job, wait_for_job
+
+DAILY_JOB_NAME = "daily_run"
+LEASE_TTL_SECONDS = 300.0
+HEARTBEAT_SECONDS = 60.0
+INGEST_WAIT_SECONDS = float(os.getenv("INGEST_WAIT_SECONDS", "1800"))
+# Stop waiting for the ingest job if no job worker has claimed it by then
+INGEST_CLAIM_WAIT_SECONDS = float(os.getenv("INGEST_CLAIM_WAIT_SECONDS", "120"))
+# Daily runs are built this many days ahead, so rollover is only a pointer flip
+DAILY_LOOKAHEAD_DAYS = int(os.getenv("DAILY_LOOKAHEAD_DAYS", "2"))
+# After a failed attempt the job waits RETRY_BASE_SECONDS, doubling per
+# consecutive failure up to RETRY_MAX_SECONDS, before the next worker tries
+RETRY_BASE_SECONDS = float(os.getenv("DAILY_RETRY_BASE_SECONDS", "60"))
+RETRY_MAX_SECONDS = float(os.getenv("DAILY_RETRY_MAX_SECONDS", "3600"))
+
+
+def make_owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def today_str() -> str:
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def upcoming_days(lookahead: int) -> list[str]:
+    """Today and the following `lookahead` days as YYYY-MM-DD strings."""
+    now_dt = datetime.now()
+    return [
+        (now_dt + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(lookahead + 1)
+    ]
+
+
+def seconds_until_next_midnight() -> float:
+    now_dt = datetime.now()
+    tomorrow = now_dt.date() + timedelta(days=1)
+    midnight = datetime.combine(tomorrow, datetime.min.time())
+    return max(0.0, (midnight - now_dt).total_seconds())
+
+
+def retry_delay(failures: int) -> float:
+    """Seconds to wait after `failures` consecutive failed attempts."""
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** max(0, failures - 1))
+
+
+def activate_due_daily_run(wrapper: SQLiteWrapper) -> Optional[str]:
+    """
+    Point the live daily run at today's scheduled run if it isn't already.
+    Cheap and idempotent, so every worker calls it right after midnight.
+    Returns the newly activated run id, if any.
+    """
+    day = today_str()
+    _, pointer_day = wrapper.get_daily_pointer()
+    if pointer_day == day:
+        return None
+    run_id = wrapper.get_scheduled_daily_runs(day).get(day)
+    if run_id is None:
+        return None
+    wrapper.activate_daily_run(run_id, day)
+    print(f"Activated daily run {run_id} for {day}")
+    return run_id
+
+
+def warm_run(wrapper: SQLiteWrapper, run_id: str):
+    """Load a run and its puzzles so they are hot before they go live."""
+    run = wrapper.get_run(run_id)
+    if run is None:
+        return
+    for puzzle_id in run.puzzle_ids:
+        wrapper.get_geo_chess(puzzle_id)
+
+
+class LeaseLost(Exception):
+    """The job's lease expired or was taken over while it was running."""
+
+
+class LeaseHeartbeat:
+    """
+    Keeps renewing a held lease from a background thread while a job runs.
+    Call `check()` before each write: once the lease is lost another worker may
+    be doing the same job, so this one must stop.
+    """
+
+    def __init__(self, db_path: str, name: str, owner: str, ttl_seconds: float):
+        self.db_path = db_path
+        self.name = name
+        self.owner = owner
+        self.ttl_seconds = ttl_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _loop(self):
+        wrapper = SQLiteWrapper(self.db_path)
+        try:
+            while not self._stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    if not wrapper.renew_lease(self.name, self.owner, self.ttl_seconds):
+                        self.lost = True
+                        print(f"Lost lease {self.name} held by {self.owner}")
+                        return
+                except Exception as e:
+                    print(f"Failed to renew lease {self.name}: {e}")
+        finally:
+            try:
+                wrapper.conn.close()
+            except Exception:
+                pass
+
+    def check(self):
+        if self.lost:
+            raise LeaseLost(f"Lease {self.name} lost by {self.owner}")
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._loop, name=f"lease-{self.name}", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        return False
+
+
+def run_daily_job_if_due(
+    db_path: str,
+    owner: str,
+    grab_new_tournaments: bool = True,
+    source: Optional[str] = None,
+) -> bool:
+    """
+    Once per day: ingest new tournaments and build the daily runs for today and
+    the next DAILY_LOOKAHEAD_DAYS days into `scheduled_daily_runs`. Only the
+    worker holding the `daily_run` lease does the work, so concurrent callers
+    (one per uWSGI worker) build each day exactly once. A missed day (e.g. the
+    server was down at midnight) is caught up on the next call, including at
+    boot. After a failure no worker retries before `next_attempt_at`, which
+    backs off exponentially. Returns True if this call did the work.
+    """
+    day = today_str()
+    wrapper = SQLiteWrapper(db_path)
+    try:
+        status = wrapper.get_job_status(DAILY_JOB_NAME)
+        if status is not None and status.get("last_success_day") == day:
+            return False
+        if status is not None and (status.get("next_attempt_at") or 0) > time.time():
+            return False
+        if not wrapper.acquire_lease(DAILY_JOB_NAME, owner, LEASE_TTL_SECONDS):
+            return False
+        try:
+            # Another worker may have finished between our status read and the lease
+            status = wrapper.get_job_status(DAILY_JOB_NAME)
+            if status is not None and status.get("last_success_day") == day:
+                return False
+            if status is not None and (status.get("next_attempt_at") or 0) > time.time():
+                return False
+            wrapper.update_job_status(
+                DAILY_JOB_NAME, last_started_at=time.time(), progress="starting"
+            )
+
+            def progress(message: str):
+                try:
+                    wrapper.update_job_status(DAILY_JOB_NAME, progress=message)
+                except Exception:
+                    pass
+
+            with LeaseHeartbeat(
+                db_path, DAILY_JOB_NAME, owner, LEASE_TTL_SECONDS
+            ) as heartbeat:
+                scheduled = wrapper.get_scheduled_daily_runs(day)
+                pointer_id, _ = wrapper.get_daily_pointer()
+                current = wrapper.get_daily_run() if pointer_id is None else None
+                if day not in scheduled and current is not None:
+                    # First run after upgrading: keep the live is_daily run as
+                    # today's, so players mid-run aren't switched to a new one
+                    heartbeat.check()
+                    wrapper.schedule_daily_run(day, current.identifier, "existing")
+                    scheduled[day] = current.identifier
+                if day not in scheduled:
+                    # Nothing prepared for today: build it right away, ingest later
+                    progress(f"building daily run for {day}")
+                    src = source or random.choice(["lichess", "world_champion"])
+                    run = create_daily_run(
+                        wrapper, grab_new_tournaments=False, source=src, activate=False
+                    )
+                    heartbeat.check()
+                    wrapper.schedule_daily_run(day, run.identifier, src)
+                    scheduled[day] = run.identifier
+                heartbeat.check()
+                activate_due_daily_run(wrapper)
+                if grab_new_tournaments:
+                    # Ingest runs in the job worker (python -m geo_server.job_queue),
+                    # not in this process; wait for it, but not forever.
+                    job_id = enqueue_job(
+                        db_path,
+                        "ingest_tournaments",
+                        {"n_tournaments": 3},
+                        dedupe=True,
+                    )
+                    progress(f"waiting for ingest job {job_id}")
+                    job = wait_for_job(
+                        db_path,
+                        job_id,
+                        INGEST_WAIT_SECONDS,
+                        claim_timeout_seconds=INGEST_CLAIM_WAIT_SECONDS,
+                    )
+                    if job is None or job["status"] != "done":
+                        print(
+                            f"Ingest job {job_id} not done "
+                            f"({job['status'] if job else 'missing'}); using existing puzzles"
+                        )
+                for upcoming in upcoming_days(DAILY_LOOKAHEAD_DAYS):
+                    if upcoming in scheduled:
+                        continue
+                    progress(f"building daily run for {upcoming}")
+                    src = source or random.choice(["lichess", "world_champion"])
+                    run = create_daily_run(
+                        wrapper,
+                        grab_new_tournaments=False,
+                        source=src,
+                        progress=progress,
+                        activate=False,
+                    )
+                    heartbeat.check()
+                    wrapper.schedule_daily_run(upcoming, run.identifier, src)
+                    scheduled[upcoming] = run.identifier
+                heartbeat.check()
+            wrapper.update_job_status(
+                DAILY_JOB_NAME,
+                last_success_day=day,
+                last_success_at=time.time(),
+                last_error=None,
+                failures=0,
+                next_attempt_at=None,
+                progress=f"done ({', '.join(f'{d}={r}' for d, r in scheduled.items())})",
+            )
+            return True
+        except LeaseLost as e:
+            # The new lease holder owns the job status now; leave it alone
+            print(f"Daily job aborted: {e}")
+            return False
+        except Exception as e:
+            failures = (status or {}).get("failures", 0) + 1
+            wrapper.update_job_status(
+                DAILY_JOB_NAME,
+                last_error=str(e),
+                failures=failures,
+                next_attempt_at=time.time() + retry_delay(failures),
+                progress="failed",
+            )
+            raise
+        finally:
+            wrapper.release_lease(DAILY_JOB_NAME, owner)
+    finally:
+        try:
+            wrapper.conn.close()
+        except Exception:
+            pass
+
+
+def main():
+    """
+    Standalone entry point, e.g. for cron or a uWSGI mule:
+        python -m geo_server.daily_job [--once] [db_path]
+    Set NO_DAILY_RUNNER=true for the web workers when running it this way.
+    """
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db_path = args[0] if args else "database/geo_chess.db"
+    owner = make_owner_id()
+    while True:
+        try:
+            if run_daily_job_if_due(db_path, owner):
+                print(f"Created daily run for {today_str()}")
+        except Exception as e:
+            print(f"Daily job failed: {e}")
+        if "--once" in sys.argv[1:]:
+            return 0
+        time.sleep(60)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import os
+
+from geo_server.buiid_eco_json import get_eco_openings
+from geo_server.cache import TTLCache
+from geo_server.model import GeoChess
+
+# Everything a page or API response derives from a puzzle for display. Puzzles
+# never change after ingest (apart from successes/fails, which are not part of
+# this record), so each one is computed once and then only serialized.
+DISPLAY_CACHE = TTLCache(
+    "puzzle_display",
+    max_size=int(os.getenv("DISPLAY_CACHE_SIZE", "8192")),
+    ttl_seconds=float(os.getenv("DISPLAY_CACHE_TTL", "3600")),
+)
+
+RESULT_MAP = {1: "1-0", 0: "0-1", 0.5: "1/2-1/2"}
+FILES = "abcdefgh"
+
+
+def _round_elo(val):
+    try:
+        return int(round(int(val) / 100.0) * 100)
+    except Exception:
+        return None
+
+
+def _result_string(result) -> str:
+    try:
+        rv = float(result)
+    except Exception:
+        return ""
+    if abs(rv - 1.0) < 1e-9:
+        return RESULT_MAP[1]
+    if abs(rv - 0.0) < 1e-9:
+        return RESULT_MAP[0]
+    return RESULT_MAP[0.5]
+
+
+def build_game_meta(geo: GeoChess) -> dict | None:
+    try:
+        cg = geo.chess_game
+        return {
+            "result": _result_string(cg.result) if cg is not None else "",
+            "whiteElo": _round_elo(cg.whiteElo) if cg else None,
+            "blackElo": _round_elo(cg.blackElo) if cg else None,
+            "timeControl": (cg.timeControl if cg else "") or "",
+            "eco": (cg.eco if cg else "Unknown"),
+            "opening_name": (
+                get_eco_openings().get(cg.eco, "Unknown") if cg else "Unknown"
+            ),
+            "moveNum": (
+                int(geo.move_num) if getattr(geo, "move_num", None) is not None else None
+            ),
+            "whitePlayer": (cg.whitePlayer if cg else None),
+            "blackPlayer": (cg.blackPlayer if cg else None),
+            "year": (cg.year if cg else None),
+        }
+    except Exception:
+        return None
+
+
+def square_to_rc(sq: str):
+    """Algebraic square -> (row, col) on the 8x8 board, row 0 being rank 8."""
+    file_c = sq[0].lower()
+    rank_c = sq[1]
+    if file_c not in FILES or not rank_c.isdigit():
+        return None
+    rank = int(rank_c)
+    if rank < 1 or rank > 8:
+        return None
+    return 8 - rank, FILES.index(file_c)
+
+
+def absolute_last_move_cells(geo: GeoChess) -> list[dict]:
+    cells = []
+    try:
+        lm = (geo.last_move or "").strip()
+        if len(lm) == 4:
+            for rc in (square_to_rc(lm[0:2]), square_to_rc(lm[2:4])):
+                if rc is not None:
+                    cells.append({"r": rc[0], "c": rc[1]})
+    except Exception:
+        pass
+    return cells
+
+
+def subfen_last_move_cells(geo: GeoChess, absolute: list[dict] | None = None) -> list[dict]:
+    """Last-move cells that fall inside the puzzle window, relative to its top-left."""
+    if absolute is None:
+        absolute = absolute_last_move_cells(geo)
+    cells = []
+    try:
+        bx, by = int(geo.posx), int(geo.posy)
+        w, h = int(geo.dimx), int(geo.dimy)
+        for cell in absolute:
+            r, c = cell["r"], cell["c"]
+            if by <= r < by + h and bx <= c < bx + w:
+                cells.append({"r": r - by, "c": c - bx})
+    except Exception:
+        pass
+    return cells
+
+
+def _top_left_light(geo: GeoChess):
+    try:
+        return ((int(geo.posx) + int(geo.posy)) % 2) == 0
+    except Exception:
+        return None
+
+
+def _half_move_num(geo: GeoChess):
+    try:
+        return (int(geo.move_num) - 1) * 2 + (0 if bool(geo.white_to_move) else 1)
+    except Exception:
+        return None
+
+
+def compute_puzzle_display(geo: GeoChess) -> dict:
+    absolute = absolute_last_move_cells(geo)
+    half_move_num = _half_move_num(geo)
+    game_id = geo.chess_game.gameId if geo.chess_game else None
+    return {
+        "game_meta": build_game_meta(geo),
+        "last_move_cells": subfen_last_move_cells(geo, absolute),
+        "last_move_cells_abs": absolute,
+        "top_left_light": _top_left_light(geo),
+        "half_move_num": half_move_num,
+        "game_id": game_id,
+        "game_url": (
+            f"https://lichess.org/{game_id}#{half_move_num}"
+            if (game_id and half_move_num is not None)
+            else None
+        ),
+    }
+
+
+def puzzle_display(geo: GeoChess) -> dict:
+    """
+    Cached display record for a puzzle. Shared between requests: callers that
+    want to add fields (e.g. successes/fails) must copy game_meta first.
+    """
+    if geo.id is None:
+        return compute_puzzle_display(geo)
+    return DISPLAY_CACHE.get_or_load(int(geo.id), lambda: compute_puzzle_display(geo))
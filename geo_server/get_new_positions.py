@@ -2,7 +2,7 @@ import requests
 import hashlib
 from functools import reduce
 from operator import mul
-from typing import Optional
+from typing import Callable, Optional
 import os
 import chess.pgn
 import random
@@ -264,12 +264,18 @@ def create_and_store_geochess_from_pgn(
     min_score: float = 5.0,
     rate: float = 0.1,
     source: str = "lichess",
+    progress: Optional[Callable[[float, str], None]] = None,
 ):
-    for game in tqdm(
-        parse_games_from_pgn(pgn_file),
-        desc="Parsing games",
-        total=count_games_from_pgn(pgn_file),
+    total = count_games_from_pgn(pgn_file)
+    for i, game in enumerate(
+        tqdm(
+            parse_games_from_pgn(pgn_file),
+            desc="Parsing games",
+            total=total,
+        )
     ):
+        if progress is not None and i % 50 == 0:
+            progress(i / max(1, total), f"parsed {i}/{total} games")
         chess_game = get_chess_game_from_game(game, source)
         if (
             chess_game.eco is None
@@ -302,11 +308,31 @@ def create_and_store_geochess_from_pgn(
                     sqlite_wrapper.insert_geo_chess(geo_chess)
 
 
-def add_geochess_to_database(sqlite_wrapper: SQLiteWrapper, n_tournaments: int = 10):
+def add_geochess_to_database(
+    sqlite_wrapper: SQLiteWrapper,
+    n_tournaments: int = 10,
+    progress: Optional[Callable[[float, str], None]] = None,
+):
+    """
+    Download and ingest up to `n_tournaments` finished lichess tournaments.
+    `progress(fraction, message)` is called regularly; it may raise to abort.
+    """
     i = 0
     for tournament_id in get_valid_tournament_ids():
+        if progress is not None:
+            progress(i / n_tournaments, f"downloading tournament {tournament_id}")
         path = get_games_from_tournament(tournament_id)
-        create_and_store_geochess_from_pgn(path, sqlite_wrapper)
+
+        def tournament_progress(fraction: float, message: str, i=i):
+            if progress is not None:
+                progress(
+                    (i + fraction) / n_tournaments,
+                    f"tournament {i + 1}/{n_tournaments}: {message}",
+                )
+
+        create_and_store_geochess_from_pgn(
+            path, sqlite_wrapper, progress=tournament_progress
+        )
         i += 1
         if i >= n_tournaments:
             break
@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+
+from flask import Response, request
+from jinja2.utils import htmlsafe_json_dumps
+from markupsafe import Markup
+
+# Content addressed by an id that never changes meaning (runs, games)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Pages that may change: keep a copy, but revalidate it on every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def strong_etag(body: bytes) -> str:
+    """Quoted strong validator derived from the exact response bytes."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+# Suffixes appended to an ETag for each content-coding of the same resource
+CODING_ETAG_SUFFIXES = ("-gzip", "-br", "-deflate")
+
+
+def version_etag(*parts) -> str:
+    """
+    Weak validator for a rendered page, derived from the inputs that determine
+    it (row versions, counters, template version) rather than from its bytes,
+    so it can be computed and checked without rendering.
+    """
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
+    return f'W/"{digest}"'
+
+
+# Shared page caching: a page is rendered once with this marker where the
+# per-request state goes, cached, then filled in for each request
+SESSION_STATE_MARKER = Markup("/*__SESSION_STATE__*/")
+
+
+def fill_session_state(html: str, **values) -> str:
+    """Replace the marker in a cached page with `window.<NAME> = <json>;` lines."""
+    state = "\n    ".join(
+        f"window.{name} = {htmlsafe_json_dumps(value)};" for name, value in values.items()
+    )
+    return html.replace(SESSION_STATE_MARKER, state, 1)
+
+
+def run_stats(run) -> dict:
+    """Completion stats of a run; they change with every finished run, so pages get them per request."""
+    if run is None:
+        return {"completedCount": 0, "avgTimeSeconds": None, "avgCorrectCount": None}
+    return {
+        "completedCount": int(getattr(run, "completed_count", 0) or 0),
+        "avgTimeSeconds": getattr(run, "avg_time_seconds", None),
+        "avgCorrectCount": getattr(run, "avg_correct_count", None),
+    }
+
+
+def run_page_key(run, index: int, render_version: str) -> tuple:
+    """
+    Page-cache key of one puzzle of a run: only what the cached page renders.
+    is_daily shows in the title and flips once a day at rollover.
+    """
+    return (
+        "run",
+        run.identifier,
+        index,
+        tuple(run.puzzle_ids),
+        bool(run.is_daily),
+        render_version,
+    )
+
+
+def _etag_base(tag: str) -> str:
+    tag = tag[2:] if tag.startswith("W/") else tag
+    for suffix in CODING_ETAG_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[: -len(suffix) - 1] + '"'
+    return tag
+
+
+def coded_etag(etag: str, coding: str) -> str:
+    """ETag of the `coding`-encoded variant of a representation tagged `etag`."""
+    weak = etag.startswith("W/")
+    base = _etag_base(etag)
+    return ("W/" if weak else "") + base[:-1] + f'-{coding}"'
+
+
+def etag_matches(etag: str) -> bool:
+    """
+    True if the request's If-None-Match covers `etag`. Comparison is weak (as
+    for GET) and ignores content-coding suffixes: every encoding of the same
+    bytes is the same content to the client.
+    """
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    base = _etag_base(etag)
+    return any(_etag_base(c.strip()) == base for c in header.split(","))
+
+
+def not_modified(etag: str, last_modified: float | None = None) -> bool:
+    """
+    Whether the client's cached copy is current. If-None-Match wins when
+    present; If-Modified-Since is only consulted without it (RFC 9110 13.2.2).
+    """
+    if request.headers.get("If-None-Match"):
+        return etag_matches(etag)
+    since = request.if_modified_since
+    if since is None or last_modified is None:
+        return False
+    return int(last_modified) <= since.timestamp()
+
+
+def accepted_encodings() -> dict[str, float]:
+    """Content-coding -> q-value from the request's Accept-Encoding header."""
+    prefs: dict[str, float] = {}
+    for part in (request.headers.get("Accept-Encoding") or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        prefs[coding] = q
+    return prefs
+
+
+def preferred_encoding(available) -> str | None:
+    """
+    Best of `available` codings (listed in server preference order) that the
+    client accepts with q > 0, or None for identity.
+    """
+    prefs = accepted_encodings()
+    best, best_q = None, 0.0
+    for coding in available:
+        q = prefs.get(coding, prefs.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def accepts_gzip() -> bool:
+    return preferred_encoding(("gzip",)) == "gzip"
+
+
+def gzip_bytes(body: bytes) -> bytes:
+    # mtime=0 keeps the output (and so its ETag) identical across workers
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def cached_response(
+    body: bytes,
+    etag: str,
+    mimetype: str = "application/json",
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    headers: dict | None = None,
+) -> Response:
+    """Response for a pre-encoded body, or an empty 304 when the client's copy is current."""
+    if etag_matches(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype=mimetype)
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = cache_control
+    for name, value in (headers or {}).items():
+        resp.headers[name] = value
+    return resp
+
+
+def precompressed_response(
+    body: bytes,
+    gzipped: bytes,
+    etag: str,
+    mimetype: str,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    headers: dict | None = None,
+) -> Response:
+    """
+    Serve the gzip variant to clients that accept it, the identity body otherwise.
+    Each variant gets its own strong ETag, as the bytes differ.
+    """
+    extra = {"Vary": "Accept-Encoding", **(headers or {})}
+    if accepts_gzip():
+        extra["Content-Encoding"] = "gzip"
+        return cached_response(
+            gzipped, coded_etag(etag, "gzip"), mimetype, cache_control, extra
+        )
+    return cached_response(body, etag, mimetype, cache_control, extra)
+
+
+def conditional_page(
+    etag: str,
+    render,
+    last_modified: float | None = None,
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+) -> Response:
+    """
+    304 when the client's copy matches the validators, otherwise the page from
+    `render()`; the renderer is not called for a 304.
+    """
+    if not_modified(etag, last_modified):
+        resp = Response(status=304)
+    else:
+        resp = Response(render(), mimetype="text/html")
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        resp.last_modified = int(last_modified)
+    return resp
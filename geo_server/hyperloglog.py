@@ -0,0 +1,68 @@
+import hashlib
+import math
+
+
+class HyperLogLog:
+    """
+    Fixed-size cardinality sketch, used as the in-process stand-in for Redis
+    PFADD/PFCOUNT in development. With the default precision of 14 it keeps
+    16384 one-byte registers (16 KiB) and has a standard error of about 0.8%.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    @staticmethod
+    def _hash64(item) -> int:
+        if isinstance(item, str):
+            item = item.encode("utf-8")
+        return int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), "big")
+
+    def add(self, item) -> bool:
+        """Add an item. Returns True if a register changed (like PFADD)."""
+        x = self._hash64(item)
+        idx = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining bits (1-based)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+            return True
+        return False
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        regs = self.registers
+        for i, val in enumerate(other.registers):
+            if val > regs[i]:
+                regs[i] = val
+
+    def count(self) -> int:
+        m = self.m
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        elif m == 64:
+            alpha = 0.709
+        elif m == 32:
+            alpha = 0.697
+        else:
+            alpha = 0.673
+        z = 0.0
+        zeros = 0
+        for val in self.registers:
+            z += 2.0**-val
+            if val == 0:
+                zeros += 1
+        estimate = alpha * m * m / z
+        # Small-range correction (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def __len__(self) -> int:
+        return self.count()
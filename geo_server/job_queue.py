@@ -0,0 +1,165 @@
+import os
+import socket
+import sys
+import time
+import uuid
+
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+POLL_SECONDS = 2.0
+STALE_JOB_SECONDS = 1800.0
+RETRY_BASE_SECONDS = 30.0
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to job handlers to report progress; raises JobCancelled when asked to stop."""
+
+    def __init__(self, wrapper: SQLiteWrapper, job: dict):
+        self.wrapper = wrapper
+        self.job = job
+        self.payload = job.get("payload") or {}
+
+    def progress(self, fraction: float, message: str = None):
+        fraction = max(0.0, min(1.0, float(fraction)))
+        if self.wrapper.update_job_progress(self.job["id"], fraction, message):
+            raise JobCancelled(f"Job {self.job['id']} cancelled")
+
+
+def _ingest_tournaments(ctx: JobContext):
+    from geo_server.get_new_positions import add_geochess_to_database
+
+    add_geochess_to_database(
+        ctx.wrapper,
+        n_tournaments=int(ctx.payload.get("n_tournaments", 3)),
+        progress=ctx.progress,
+    )
+
+
+def _refill_run_pool(ctx: JobContext):
+    from geo_server.run_pool import POOL_TARGET_SIZE, refill_pool
+
+    created = refill_pool(
+        ctx.wrapper,
+        target_size=int(ctx.payload.get("target_size", POOL_TARGET_SIZE)),
+        progress=ctx.progress,
+    )
+    print(f"Run pool refilled with {created} runs")
+
+
+# kind -> handler(ctx)
+JOB_HANDLERS = {
+    "ingest_tournaments": _ingest_tournaments,
+    "refill_run_pool": _refill_run_pool,
+}
+
+
+def enqueue_job(db_path: str, kind: str, payload: dict | None = None, **kwargs) -> int:
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    wrapper = SQLiteWrapper(db_path)
+    try:
+        return wrapper.enqueue_job(kind, payload, **kwargs)
+    finally:
+        wrapper.conn.close()
+
+
+def get_job(db_path: str, job_id: int):
+    wrapper = SQLiteWrapper(db_path)
+    try:
+        return wrapper.get_job(job_id)
+    finally:
+        wrapper.conn.close()
+
+
+def wait_for_job(
+    db_path: str,
+    job_id: int,
+    timeout_seconds: float,
+    poll: float = 5.0,
+    claim_timeout_seconds: float | None = None,
+):
+    """
+    Poll until the job leaves the queue; returns the job dict (possibly still
+    running on timeout). With `claim_timeout_seconds`, gives up early if no
+    worker has picked the job up by then, e.g. when no job worker is running.
+    """
+    started = time.time()
+    deadline = started + timeout_seconds
+    job = get_job(db_path, job_id)
+    while job is not None and job["status"] in ("queued", "running"):
+        if time.time() >= deadline:
+            break
+        if (
+            claim_timeout_seconds is not None
+            and job["status"] == "queued"
+            and not job["attempts"]
+            and time.time() - started >= claim_timeout_seconds
+        ):
+            break
+        time.sleep(poll)
+        job = get_job(db_path, job_id)
+    return job
+
+
+def run_one_job(wrapper: SQLiteWrapper, worker: str) -> bool:
+    """Claim and run a single job. Returns False if the queue was empty."""
+    job = wrapper.claim_job(worker)
+    if job is None:
+        return False
+    handler = JOB_HANDLERS.get(job["kind"])
+    if handler is None:
+        wrapper.finish_job(job["id"], "failed", error=f"Unknown job kind {job['kind']}")
+        return True
+    ctx = JobContext(wrapper, job)
+    try:
+        print(f"Running job {job['id']} ({job['kind']}), attempt {job['attempts']}")
+        handler(ctx)
+    except JobCancelled:
+        wrapper.finish_job(job["id"], "cancelled")
+    except Exception as e:
+        if job["attempts"] < job["max_attempts"]:
+            delay = RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+            print(f"Job {job['id']} failed ({e}); retrying in {delay:.0f}s")
+            wrapper.finish_job(job["id"], "queued", error=str(e), retry_after_seconds=delay)
+        else:
+            print(f"Job {job['id']} failed permanently: {e}")
+            wrapper.finish_job(job["id"], "failed", error=str(e))
+    else:
+        wrapper.update_job_progress(job["id"], 1.0, "done")
+        wrapper.finish_job(job["id"], "done")
+    return True
+
+
+def main():
+    """
+    Worker entry point, run outside the web tier:
+        python -m geo_server.job_queue [--once] [db_path]
+    With --once it processes at most one job and exits.
+    """
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    db_path = args[0] if args else "database/geo_chess.db"
+    worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    wrapper = SQLiteWrapper(db_path)
+    print(f"Job worker {worker} started on {db_path}")
+    once = "--once" in sys.argv[1:]
+    while True:
+        ran = False
+        try:
+            requeued = wrapper.requeue_stale_jobs(STALE_JOB_SECONDS)
+            if requeued:
+                print(f"Requeued {requeued} stale jobs")
+            ran = run_one_job(wrapper, worker)
+        except Exception as e:
+            print(f"Job worker error: {e}")
+        if once:
+            return 0
+        if not ran:
+            time.sleep(POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
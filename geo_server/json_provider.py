@@ -0,0 +1,74 @@
+"""
+JSON serialization for API responses.
+
+`FastJSONProvider` plugs into Flask (`app.json`) and uses orjson when it is
+installed, falling back to the stdlib encoder for anything orjson rejects
+(or everywhere, with JSON_BACKEND=stdlib). Cached payloads are encoded once
+with `dumps_bytes` and served as bytes (see `cached_response` in
+http_caching.py), so they are not serialized again per request.
+"""
+
+import json
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson  # optional accelerated backend
+except ImportError:
+    orjson = None
+
+if os.getenv("JSON_BACKEND") == "stdlib":
+    orjson = None
+
+
+def dumps_bytes(obj, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON for caching."""
+    if orjson is not None:
+        try:
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            pass
+    return json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    def _orjson_dumps(self, obj, indent: bool = False) -> bytes | None:
+        if orjson is None:
+            return None
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bits; the stdlib encoder handles those
+            return None
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Custom arguments (indent, cls, ...) are the stdlib encoder's business
+        if not kwargs:
+            encoded = self._orjson_dumps(obj)
+            if encoded is not None:
+                return encoded.decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # Let the stdlib raise its usual error (or accept what it allows)
+                pass
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        encoded = self._orjson_dumps(obj, indent=indent)
+        if encoded is None:
+            return super().response(obj)
+        return self._app.response_class(encoded + b"\n", mimetype=self.mimetype)
@@ -1,6 +1,7 @@
 from geo_server.sqlite_wrapper import SQLiteWrapper
 from geo_server.model import GeoChess, ChessGame, RunSettings, Run
 import time
+from typing import Callable, Optional
 from sqlite3 import IntegrityError
 from datetime import datetime, timedelta
 from geo_server.get_new_positions import add_geochess_to_database
@@ -22,53 +23,130 @@ daily_run_settings = RunSettings(
 )
 
 
+def run_settings_for_request(
+    difficulty: int,
+    n_puzzles: int,
+    min_move: int,
+    max_move: int,
+    source: str,
+) -> RunSettings:
+    """Map the "New run" form (difficulty slider 0..3, etc.) to RunSettings."""
+    if difficulty == 0:
+        min_dp, max_dp, bir, min_score = 0.0, 0.3, 0.0, 6.0
+    elif difficulty == 1:
+        min_dp, max_dp, bir, min_score = 0.2, 0.6, 0.2, 6.0
+    elif difficulty == 2:
+        min_dp, max_dp, bir, min_score = 0.4, 0.8, 0.5, 5.0
+    else:
+        min_dp, max_dp, bir, min_score = 0.6, 1.0, 0.8, 5.0
+    return RunSettings(
+        min_difficulty_percentage=min_dp,
+        max_difficulty_percentage=max_dp,
+        min_score=min_score,
+        n_puzzles=n_puzzles,
+        max_played=None,
+        early_timestamp=None,
+        late_timestamp=None,
+        min_move_num=min_move,
+        max_move_num=max_move,
+        black_info_rate=bir,
+        source=source,
+        metadata_fields=SOURCE_METADATA_FIELDS.get(source, []),
+    )
+
+
+def _prepare_daily_run_settings(
+    sqlite_wrapper: SQLiteWrapper, source: str
+) -> RunSettings:
+    # A fresh copy per build, so one day's lichess cutoff doesn't leak into the next
+    settings = daily_run_settings.model_copy()
+    settings.source = source
+    settings.metadata_fields = SOURCE_METADATA_FIELDS[source]
+    if source == "lichess":
+        settings.early_timestamp = int(
+            (datetime.now() - timedelta(days=1)).timestamp()
+        )
+        try:
+            stuff = sqlite_wrapper.select_geo_chess_for_run(settings)
+            if len(stuff) < 5:
+                print("Failed to get 5 geochess")
+                settings.early_timestamp = None
+        except Exception:
+            print("Failed to create runs with new timestamps")
+            settings.early_timestamp = None
+    return settings
+
+
 def create_daily_run(
     sqlite_wrapper: SQLiteWrapper,
     grab_new_tournaments: bool = True,
     source: str = "lichess",
+    progress: Optional[Callable[[str], None]] = None,
+    activate: bool = True,
 ) -> Run:
-    if source == "lichess":
-        daily_run_settings.early_timestamp = int(
-            (datetime.now() - timedelta(days=1)).timestamp()
-        )
-    daily_run_settings.source = source
-    daily_run_settings.metadata_fields = SOURCE_METADATA_FIELDS[source]
+    """
+    Create a daily run. With activate=False the run is only built (not marked
+    daily), to be scheduled for a future day and activated at rollover.
+    """
     if grab_new_tournaments:
+        if progress is not None:
+            progress("ingesting tournaments")
         try:
             add_geochess_to_database(sqlite_wrapper, n_tournaments=3)
         except Exception as e:
             print(f"Failed to add geochess to database: {e}")
-    sqlite_wrapper.remove_daily_run()
-    if source == "lichess":
-        try:
-            stuff = sqlite_wrapper.select_geo_chess_for_run(daily_run_settings)
-            if len(stuff) < 5:
-                print("Failed to get 5 geochess")
-                daily_run_settings.early_timestamp = None
-        except Exception:
-            print("Failed to create runs with new timestamps")
-            daily_run_settings.early_timestamp = None
-
-    return create_run_and_add_to_database(sqlite_wrapper, daily_run_settings, True)
+    if progress is not None:
+        progress("selecting puzzles")
+    settings = _prepare_daily_run_settings(sqlite_wrapper, source)
+    run = create_run_and_add_to_database(
+        sqlite_wrapper, settings, False, daily_fallback=True
+    )
+    if activate:
+        # Only replace the live daily run once the new one exists
+        sqlite_wrapper.activate_daily_run(
+            run.identifier, datetime.now().strftime("%Y-%m-%d")
+        )
+        run.is_daily = True
+    return run
 
 
 def create_run_and_add_to_database(
-    sqlite_wrapper: SQLiteWrapper, run_settings: RunSettings, is_daily: bool
+    sqlite_wrapper: SQLiteWrapper,
+    run_settings: RunSettings,
+    is_daily: bool,
+    daily_fallback: Optional[bool] = None,
 ) -> Run:
+    if daily_fallback is None:
+        daily_fallback = is_daily
     geochess_list = sqlite_wrapper.select_geo_chess_for_run(run_settings)
-    if len(geochess_list) == 0 and is_daily:
+    if len(geochess_list) == 0 and daily_fallback:
         print("No geochess found")
         run_settings = daily_run_settings.model_copy()
         run_settings.source = "world_champion"
+        run_settings.metadata_fields = SOURCE_METADATA_FIELDS["world_champion"]
         geochess_list = sqlite_wrapper.select_geo_chess_for_run(run_settings)
+        if len(geochess_list) == 0:
+            # Never schedule an empty daily run; the caller retries later
+            raise Exception("No puzzles available for the daily run")
+    return add_run_to_database(
+        sqlite_wrapper, [geochess.id for geochess in geochess_list], run_settings, is_daily
+    )
+
 
+def add_run_to_database(
+    sqlite_wrapper: SQLiteWrapper,
+    puzzle_ids: list[int],
+    run_settings: RunSettings,
+    is_daily: bool,
+) -> Run:
+    """Insert a run over already selected puzzles under a fresh random identifier."""
     for _ in range(10):
         try:
             run = Run(
                 identifier="".join(
                     secrets.choice(string.ascii_uppercase) for _ in range(8)
                 ),
-                puzzle_ids=[geochess.id for geochess in geochess_list],
+                puzzle_ids=puzzle_ids,
                 is_daily=is_daily,
                 black_info_rate=run_settings.black_info_rate,
                 metadata_fields=run_settings.metadata_fields,
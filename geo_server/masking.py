@@ -0,0 +1,67 @@
+import hashlib
+import struct
+from functools import lru_cache
+
+MASK_VALUE = "*****"
+
+# Metadata fields that can be hidden; bit i of a puzzle's mask is MASKABLE_FIELDS[i]
+MASKABLE_FIELDS = (
+    "result",
+    "whiteElo",
+    "blackElo",
+    "timeControl",
+    "moveNum",
+    "whitePlayer",
+    "blackPlayer",
+    "year",
+    "opening_name",
+)
+
+
+def _normalize_rate(black_info_rate) -> float:
+    try:
+        return float(black_info_rate or 0.0)
+    except Exception:
+        return 0.0
+
+
+def _mask_bits(run_id, puzzle_index, rate: float) -> int:
+    # Deterministic pseudo-random draw per field from SHA256 of (run_id|index|field)
+    bits = 0
+    for i, field_name in enumerate(MASKABLE_FIELDS):
+        digest = hashlib.sha256(f"{run_id}|{puzzle_index}|{field_name}".encode("utf-8")).digest()
+        if struct.unpack("!I", digest[:4])[0] / 2**32 < rate:
+            bits |= 1 << i
+    return bits
+
+
+@lru_cache(maxsize=4096)
+def run_mask_bitmap(run_id: str, n_puzzles: int, rate: float) -> tuple[int, ...]:
+    """Mask bits for every puzzle of a run, computed once per (run, rate)."""
+    return tuple(_mask_bits(run_id, index, rate) for index in range(n_puzzles))
+
+
+def mask_game_meta(
+    game_meta: dict | None,
+    run_id: str | None,
+    puzzle_index: int | None,
+    n_puzzles: int,
+    black_info_rate: float | None,
+) -> dict | None:
+    """Replace the fields selected by the run's mask with MASK_VALUE."""
+    if not game_meta:
+        return game_meta
+    rate = _normalize_rate(black_info_rate)
+    if rate <= 0:
+        return game_meta
+    if isinstance(puzzle_index, int) and 0 <= puzzle_index < n_puzzles:
+        bits = run_mask_bitmap(run_id, int(n_puzzles), rate)[puzzle_index]
+    else:
+        bits = _mask_bits(run_id, puzzle_index, rate)
+    return {
+        **game_meta,
+        **{
+            field_name: MASK_VALUE if bits >> i & 1 else game_meta.get(field_name)
+            for i, field_name in enumerate(MASKABLE_FIELDS)
+        },
+    }
@@ -0,0 +1,290 @@
+"""
+Per-worker memory reporting.
+
+`memory_report()` gathers:
+  - RSS (current, from /proc on Linux, plus the peak from getrusage),
+  - the approximate deep size and length of every registered structure
+    (app-level dicts/sets, every TTLCache, lru_caches),
+  - the top tracemalloc allocation sites, when tracing is on.
+
+Tracing costs CPU and memory, so it is off unless TRACEMALLOC_FRAMES > 0 at
+startup or an admin turns it on. `take_snapshot()` keeps a labelled report
+(and tracemalloc snapshot) in the worker; `diff_reports()` compares two of
+them, so growth between two points in time shows up per structure and per
+allocation site. With MEMORY_LOG_INTERVAL > 0 a one-line summary is printed
+periodically.
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from typing import Any, Callable
+
+try:
+    import resource  # POSIX only
+except ImportError:  # pragma: no cover
+    resource = None
+
+TOP_ALLOCATORS = 25
+# Deep sizes stop walking after this many objects per structure (reported as truncated)
+SIZE_WALK_LIMIT = int(os.getenv("MEMORY_SIZE_WALK_LIMIT", "200000"))
+MAX_SNAPSHOTS = 8
+
+# name -> callable returning the object to measure (or an lru_cache'd function)
+_STRUCTURES: dict[str, Callable[[], Any]] = {}
+_snapshots: "OrderedDict[str, dict]" = OrderedDict()
+_snapshot_lock = threading.Lock()
+
+
+def register_structure(name: str, getter: Callable[[], Any]):
+    """Report the object returned by `getter()` under `name`."""
+    _STRUCTURES[name] = getter
+
+
+def unregister_structure(name: str):
+    _STRUCTURES.pop(name, None)
+
+
+def rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_bytes() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def deep_sizeof(obj, limit: int = SIZE_WALK_LIMIT) -> tuple[int, bool]:
+    """
+    Approximate size of `obj` and everything reachable through containers and
+    instance attributes, counting shared objects once. Returns (bytes, truncated).
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        if len(seen) >= limit:
+            return total, True
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, type) or callable(o):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o, 0)
+        try:
+            if isinstance(o, dict):
+                stack.extend(o.keys())
+                stack.extend(o.values())
+                continue
+            if isinstance(o, (list, tuple, set, frozenset, deque)):
+                stack.extend(o)
+                continue
+        except RuntimeError:
+            # Resized by another thread mid-walk; the estimate just misses its items
+            continue
+        if isinstance(o, (str, bytes, bytearray, int, float, bool)) or o is None:
+            continue
+        d = getattr(o, "__dict__", None)
+        if d is not None:
+            stack.append(d)
+        for slot in getattr(type(o), "__slots__", ()):
+            if hasattr(o, slot):
+                stack.append(getattr(o, slot))
+    return total, False
+
+
+def _measure(target) -> dict:
+    info = getattr(target, "cache_info", None)
+    if callable(info):
+        # An lru_cache'd function: its entries cannot be walked, report the counters
+        ci = info()
+        return {
+            "kind": "lru_cache",
+            "len": ci.currsize,
+            "maxsize": ci.maxsize,
+            "hits": ci.hits,
+        }
+    data = getattr(target, "_data", None)  # TTLCache
+    if data is not None and hasattr(target, "ttl_seconds"):
+        size, truncated = deep_sizeof(data)
+        return {"kind": "ttl_cache", "len": len(data), "bytes": size, "truncated": truncated}
+    size, truncated = deep_sizeof(target)
+    out = {"kind": type(target).__name__, "bytes": size, "truncated": truncated}
+    try:
+        out["len"] = len(target)
+    except TypeError:
+        pass
+    return out
+
+
+def structure_sizes() -> dict:
+    from geo_server.cache import _REGISTRY as ttl_caches
+
+    out = {}
+    for name, getter in list(_STRUCTURES.items()):
+        try:
+            target = getter()
+            if target is not None:
+                out[name] = _measure(target)
+        except Exception as e:
+            out[name] = {"error": str(e)}
+    for name, cache in list(ttl_caches.items()):
+        out[f"cache:{name}"] = _measure(cache)
+    return out
+
+
+def start_tracing(frames: int = 1) -> bool:
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(max(1, int(frames)))
+    return True
+
+
+def stop_tracing() -> bool:
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    with _snapshot_lock:
+        for snap in _snapshots.values():
+            snap.pop("_tracemalloc", None)
+    return True
+
+
+def _top_allocators(snapshot, limit: int) -> list[dict]:
+    stats = snapshot.statistics("lineno")[:limit]
+    return [
+        {"where": str(s.traceback[0]), "bytes": s.size, "count": s.count} for s in stats
+    ]
+
+
+def memory_report(top: int = TOP_ALLOCATORS, with_snapshot: bool = False) -> dict:
+    report = {
+        "pid": os.getpid(),
+        "at": time.time(),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "gc_objects": len(gc.get_objects()),
+        "structures": structure_sizes(),
+        "tracemalloc": None,
+    }
+    if tracemalloc.is_tracing():
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        report["tracemalloc"] = {
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "top": _top_allocators(snapshot, top),
+        }
+        if with_snapshot:
+            report["_tracemalloc"] = snapshot
+    return report
+
+
+def public(report: dict) -> dict:
+    return {k: v for k, v in report.items() if not k.startswith("_")}
+
+
+def take_snapshot(label: str | None = None) -> str:
+    """Keep the current report under `label` (default: a timestamp); oldest are dropped."""
+    label = label or time.strftime("%Y%m%dT%H%M%S")
+    report = memory_report(with_snapshot=True)
+    with _snapshot_lock:
+        _snapshots[label] = report
+        _snapshots.move_to_end(label)
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return label
+
+
+def get_snapshot(label: str) -> dict | None:
+    with _snapshot_lock:
+        return _snapshots.get(label)
+
+
+def snapshot_labels() -> list[str]:
+    with _snapshot_lock:
+        return list(_snapshots)
+
+
+def _delta(new, old):
+    if new is None or old is None:
+        return None
+    return new - old
+
+
+def diff_reports(old: dict, new: dict, top: int = TOP_ALLOCATORS) -> dict:
+    """Growth from `old` to `new`: RSS, per structure, and per allocation site."""
+    structures = {}
+    for name in sorted(set(old["structures"]) | set(new["structures"])):
+        a = old["structures"].get(name, {})
+        b = new["structures"].get(name, {})
+        entry = {
+            field: _delta(b.get(field), a.get(field))
+            for field in ("len", "bytes")
+            if b.get(field) is not None
+        }
+        if any(entry.values()):
+            structures[name] = entry
+    out = {
+        "seconds": new["at"] - old["at"],
+        "rss_bytes": _delta(new["rss_bytes"], old["rss_bytes"]),
+        "gc_objects": new["gc_objects"] - old["gc_objects"],
+        "structures": structures,
+        "tracemalloc": None,
+    }
+    old_snap, new_snap = old.get("_tracemalloc"), new.get("_tracemalloc")
+    if old_snap is not None and new_snap is not None:
+        stats = new_snap.compare_to(old_snap, "lineno")[:top]
+        out["tracemalloc"] = [
+            {
+                "where": str(s.traceback[0]),
+                "size_diff": s.size_diff,
+                "count_diff": s.count_diff,
+                "bytes": s.size,
+            }
+            for s in stats
+        ]
+    return out
+
+
+def summary_line(report: dict, top: int = 5) -> str:
+    sized = sorted(
+        ((n, s.get("bytes", 0)) for n, s in report["structures"].items() if s.get("bytes")),
+        key=lambda kv: kv[1],
+        reverse=True,
+    )[:top]
+    rss = report["rss_bytes"]
+    parts = ", ".join(f"{n}={b / 1024:.0f}KiB" for n, b in sized)
+    rss_text = f"{rss / 1048576:.1f}MiB" if rss is not None else "?"
+    return f"Memory pid={report['pid']} rss={rss_text} {parts}"
+
+
+def start_periodic_log(interval_seconds: float):
+    """Print a one-line summary every `interval_seconds` from a daemon thread."""
+
+    def _loop():
+        while True:
+            time.sleep(interval_seconds)
+            try:
+                print(summary_line(memory_report(top=0)))
+            except Exception as e:
+                print(f"Memory report failed: {e}")
+
+    t = threading.Thread(target=_loop, name="memory-log", daemon=True)
+    t.start()
+    return t
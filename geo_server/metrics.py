@@ -0,0 +1,477 @@
+"""
+Request metrics in Prometheus text format.
+
+Each worker records, per endpoint, a latency histogram (by method and
+status), SQLite query counts and time, and Redis round trips; cache hit and
+miss counts come from the TTLCache registry and the shared cache. Workers
+publish JSON snapshots of their registry every few seconds to a dedicated
+uWSGI cache (METRICS_CACHE_NAME) with no expiry and no LRU purge, so an idle
+worker's counters never vanish, and /metrics sums the snapshots of all
+workers of the instance. Outside uWSGI (dev server) it reports the current
+process only.
+
+Latency runs from the first before_request hook to the last after_request
+hook, so it includes compression but not saving the session, which Flask
+does after the after_request hooks; Redis calls made while saving it are
+counted under endpoint="-".
+
+SQLite is measured by `InstrumentedConnection` (the SQLiteWrapper connection
+factory, which also feeds the slow-query log in query_log.py), Redis by
+`redis_pool.call`; both report into the request being
+served through a thread-local (greenlet-local under gevent). Work done
+outside a request, like the daily job thread, is labelled endpoint="-".
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+from geo_server.query_log import QUERY_LOG
+
+try:
+    import uwsgi  # only importable when running under uWSGI
+except ImportError:
+    uwsgi = None
+
+PREFIX = "geochessr"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "5"))
+# A cache2 of its own (see uwsgi.ini): the shared page/puzzle cache expires
+# and LRU-purges entries, which would look like counter resets
+METRICS_CACHE_NAME = os.getenv("METRICS_CACHE_NAME", "geochessr_metrics")
+NO_REQUEST = "-"
+
+_local = threading.local()
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, buckets: tuple, value: float):
+        # counts are per bucket here; cumulated when rendered
+        i = bisect_left(buckets, value)
+        if i < len(buckets):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (endpoint, method, status) -> latency histogram
+        self.latency: dict[tuple, _Histogram] = {}
+        # endpoint -> histogram of SQLite queries per request
+        self.queries_per_request: dict[str, _Histogram] = {}
+        # (name, endpoint) -> total, for sqlite_queries, sqlite_seconds, redis_calls, redis_seconds
+        self.counters: dict[tuple, float] = {}
+
+    def _add(self, name: str, endpoint: str, value: float):
+        key = (name, endpoint)
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def record_request(
+        self, endpoint: str, method: str, status: int, seconds: float, work: dict
+    ):
+        with self._lock:
+            key = (endpoint, method, str(status))
+            hist = self.latency.get(key)
+            if hist is None:
+                hist = self.latency[key] = _Histogram(len(LATENCY_BUCKETS))
+            hist.observe(LATENCY_BUCKETS, seconds)
+            qhist = self.queries_per_request.get(endpoint)
+            if qhist is None:
+                qhist = self.queries_per_request[endpoint] = _Histogram(
+                    len(QUERY_COUNT_BUCKETS)
+                )
+            qhist.observe(QUERY_COUNT_BUCKETS, work["sqlite_queries"])
+            for name, value in work.items():
+                if value:
+                    self._add(name, endpoint, value)
+
+    def record_outside_request(self, name: str, value: float):
+        with self._lock:
+            self._add(name, NO_REQUEST, value)
+
+    def snapshot(self) -> dict:
+        """JSON-able copy of this worker's metrics, including cache counters."""
+        with self._lock:
+            snap = {
+                "latency": [
+                    [list(k), h.counts[:], h.sum, h.count]
+                    for k, h in self.latency.items()
+                ],
+                "queries_per_request": [
+                    [k, h.counts[:], h.sum, h.count]
+                    for k, h in self.queries_per_request.items()
+                ],
+                "counters": [[k[0], k[1], v] for k, v in self.counters.items()],
+            }
+        snap["caches"] = _cache_counters()
+        return snap
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _cache_counters() -> dict:
+    from geo_server.cache import all_cache_stats
+    from geo_server.shared_cache import get_shared_cache
+    from geo_server import redis_pool
+
+    out = {}
+    for name, stats in all_cache_stats().items():
+        out[name] = {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "entries": stats.get("size", 0),
+        }
+    try:
+        shared = get_shared_cache().stats()
+        out["shared"] = {"hits": shared.get("hits", 0), "misses": shared.get("misses", 0)}
+    except Exception:
+        pass
+    rstats = redis_pool.stats()
+    out["redis_percentiles"] = {
+        "hits": rstats.get("cache_hits", 0),
+        "misses": rstats.get("cache_misses", 0),
+    }
+    return out
+
+
+# -------------------- Per-request accounting --------------------
+def begin_request():
+    _local.start = time.perf_counter()
+    _local.work = {
+        "sqlite_queries": 0,
+        "sqlite_seconds": 0.0,
+        "redis_calls": 0,
+        "redis_seconds": 0.0,
+    }
+
+
+def end_request(endpoint: str, method: str, status: int):
+    work = getattr(_local, "work", None)
+    if work is None:
+        return
+    seconds = time.perf_counter() - _local.start
+    _local.work = None
+    REGISTRY.record_request(endpoint, method, status, seconds, work)
+
+
+def _record(count_name: str, seconds_name: str, seconds: float, count: int = 1):
+    work = getattr(_local, "work", None)
+    if work is not None:
+        work[count_name] += count
+        work[seconds_name] += seconds
+    else:
+        if count:
+            REGISTRY.record_outside_request(count_name, count)
+        REGISTRY.record_outside_request(seconds_name, seconds)
+
+
+def record_sqlite(seconds: float, statements: int = 1):
+    _record("sqlite_queries", "sqlite_seconds", seconds, statements)
+
+
+def record_redis(seconds: float):
+    _record("redis_calls", "redis_seconds", seconds)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Times execute and fetch calls; each statement's total also goes to the
+    query log, which prints it with its plan once it crosses the slow threshold.
+    """
+
+    _sql = None
+
+    def _executed(self, sql, parameters, seconds: float, rows: int | None = None):
+        record_sqlite(seconds)
+        QUERY_LOG.record(sql, seconds, seconds)
+        self._sql, self._params, self._rows, self._elapsed = sql, parameters, rows, seconds
+        self._logged = seconds >= QUERY_LOG.slow_seconds
+        if self._logged:
+            QUERY_LOG.slow(self.connection, sql, parameters, seconds, rows)
+
+    def _fetched(self, seconds: float):
+        record_sqlite(seconds, statements=0)
+        if self._sql is None:
+            return
+        self._elapsed += seconds
+        QUERY_LOG.record(self._sql, seconds, self._elapsed, new_statement=False)
+        if not self._logged and self._elapsed >= QUERY_LOG.slow_seconds:
+            self._logged = True
+            QUERY_LOG.slow(self.connection, self._sql, self._params, self._elapsed, self._rows)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._executed(sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            first = seq_of_parameters[0] if seq_of_parameters else ()
+            self._executed(
+                sql, first, time.perf_counter() - start, rows=len(seq_of_parameters)
+            )
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            seconds = time.perf_counter() - start
+            record_sqlite(seconds)
+            QUERY_LOG.record(sql_script, seconds, seconds)
+            self._sql = None
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._fetched(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._fetched(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._fetched(time.perf_counter() - start)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    sqlite3 connection factory that counts and times every statement run
+    through execute*/cursor(). Rows read by iterating a cursor are not timed;
+    fetchone/fetchmany/fetchall are.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# -------------------- Cross-worker aggregation --------------------
+_last_publish = [0.0]
+
+
+def _worker_key(worker_id) -> str:
+    return f"metrics:worker:{worker_id}"
+
+
+def publish(force: bool = False):
+    """Store this worker's snapshot in the metrics cache (at most every PUBLISH_INTERVAL)."""
+    if uwsgi is None:
+        return
+    now = time.monotonic()
+    if not force and now - _last_publish[0] < PUBLISH_INTERVAL:
+        return
+    _last_publish[0] = now
+    try:
+        body = json.dumps(REGISTRY.snapshot(), separators=(",", ":")).encode("utf-8")
+        uwsgi.cache_update(_worker_key(uwsgi.worker_id()), body, 0, METRICS_CACHE_NAME)
+    except Exception as e:
+        print(f"Metrics publish failed: {e}")
+
+
+def collect_snapshots() -> list[dict]:
+    """Snapshots of every worker of this instance; the live registry for this one."""
+    snaps = [REGISTRY.snapshot()]
+    if uwsgi is None:
+        return snaps
+    own = uwsgi.worker_id()
+    for worker_id in range(1, int(uwsgi.numproc) + 1):
+        if worker_id == own:
+            continue
+        try:
+            # Raw reads: scrapes shouldn't count towards the shared cache's hit stats
+            raw = uwsgi.cache_get(_worker_key(worker_id), METRICS_CACHE_NAME)
+            if raw is not None:
+                snaps.append(json.loads(raw))
+        except Exception:
+            pass
+    return snaps
+
+
+def _merge(snaps: list[dict]) -> dict:
+    latency: dict[tuple, list] = {}
+    queries: dict[str, list] = {}
+    counters: dict[tuple, float] = {}
+    caches: dict[str, dict] = {}
+    for snap in snaps:
+        for labels, counts, total, count in snap.get("latency", []):
+            acc = latency.setdefault(tuple(labels), [[0] * len(counts), 0.0, 0])
+            acc[0] = [a + b for a, b in zip(acc[0], counts)]
+            acc[1] += total
+            acc[2] += count
+        for endpoint, counts, total, count in snap.get("queries_per_request", []):
+            acc = queries.setdefault(endpoint, [[0] * len(counts), 0.0, 0])
+            acc[0] = [a + b for a, b in zip(acc[0], counts)]
+            acc[1] += total
+            acc[2] += count
+        for name, endpoint, value in snap.get("counters", []):
+            counters[(name, endpoint)] = counters.get((name, endpoint), 0.0) + value
+        for cache_name, stats in snap.get("caches", {}).items():
+            acc = caches.setdefault(cache_name, {})
+            for k, v in stats.items():
+                acc[k] = acc.get(k, 0) + v
+    return {"latency": latency, "queries": queries, "counters": counters, "caches": caches}
+
+
+# -------------------- Prometheus text format --------------------
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name: str, buckets: tuple, series: dict, label_names) -> list[str]:
+    lines = []
+    for key, (counts, total, count) in sorted(series.items()):
+        key = key if isinstance(key, tuple) else (key,)
+        base = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, n in zip(buckets, counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(**base, le=_fmt(float(bound)))} {cumulative}")
+        lines.append(f'{name}_bucket{_labels(**base, le="+Inf")} {count}')
+        lines.append(f"{name}_sum{_labels(**base)} {_fmt(float(total))}")
+        lines.append(f"{name}_count{_labels(**base)} {count}")
+    return lines
+
+
+COUNTER_HELP = {
+    "sqlite_queries": ("sqlite_queries_total", "SQLite statements executed"),
+    "sqlite_seconds": ("sqlite_query_seconds_total", "Time spent executing SQLite statements"),
+    "redis_calls": ("redis_round_trips_total", "Redis round trips (pipelines count once)"),
+    "redis_seconds": ("redis_seconds_total", "Time spent waiting on Redis"),
+}
+
+
+def render_prometheus(snaps: list[dict]) -> str:
+    merged = _merge(snaps)
+    lines = []
+
+    name = f"{PREFIX}_http_request_duration_seconds"
+    lines += [
+        f"# HELP {name} Request latency by endpoint, method and status",
+        f"# TYPE {name} histogram",
+    ]
+    lines += _histogram_lines(
+        name, LATENCY_BUCKETS, merged["latency"], ("endpoint", "method", "status")
+    )
+
+    name = f"{PREFIX}_sqlite_queries_per_request"
+    lines += [
+        f"# HELP {name} SQLite statements executed per request",
+        f"# TYPE {name} histogram",
+    ]
+    lines += _histogram_lines(name, QUERY_COUNT_BUCKETS, merged["queries"], ("endpoint",))
+
+    for key, (suffix, help_text) in COUNTER_HELP.items():
+        name = f"{PREFIX}_{suffix}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (counter, endpoint), value in sorted(merged["counters"].items()):
+            if counter == key:
+                lines.append(f"{name}{_labels(endpoint=endpoint)} {_fmt(value)}")
+
+    caches = sorted(merged["caches"].items())
+    for suffix, field, kind, help_text in (
+        ("cache_hits_total", "hits", "counter", "Cache lookups served from the cache"),
+        ("cache_misses_total", "misses", "counter", "Cache lookups that missed"),
+        ("cache_entries", "entries", "gauge", "Entries currently held (summed over workers)"),
+    ):
+        name = f"{PREFIX}_{suffix}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for cache_name, stats in caches:
+            if field in stats:
+                lines.append(f"{name}{_labels(cache=cache_name)} {stats[field]}")
+    name = f"{PREFIX}_cache_hit_ratio"
+    lines += [f"# HELP {name} hits / (hits + misses) since start", f"# TYPE {name} gauge"]
+    for cache_name, stats in caches:
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        if lookups:
+            lines.append(
+                f"{name}{_labels(cache=cache_name)} {_fmt(stats['hits'] / lookups)}"
+            )
+
+    name = f"{PREFIX}_metrics_workers"
+    lines += [f"# HELP {name} Worker snapshots aggregated", f"# TYPE {name} gauge"]
+    lines.append(f"{name} {len(snaps)}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+    """Register the request hooks on `app`."""
+    from flask import request
+
+    @app.before_request
+    def _metrics_begin():
+        begin_request()
+
+    @app.after_request
+    def _metrics_end(response):
+        try:
+            rule = request.url_rule
+            end_request(
+                rule.endpoint if rule is not None else "unmatched",
+                request.method,
+                response.status_code,
+            )
+            publish()
+        except Exception as e:
+            print(f"Metrics recording failed: {e}")
+        return response
+
+    @app.teardown_request
+    def _metrics_teardown(exc):
+        # Unhandled errors skip after_request; still count them
+        if getattr(_local, "work", None) is not None:
+            try:
+                rule = request.url_rule
+                end_request(
+                    rule.endpoint if rule is not None else "unmatched",
+                    request.method,
+                    500,
+                )
+            except Exception:
+                pass
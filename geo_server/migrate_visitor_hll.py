@@ -0,0 +1,48 @@
+import sys
+
+from geo_server import redis_pool
+
+LEGACY_SET_KEY = "geochessr:counters:visitor_ip_hashes"
+VISITOR_HLL_KEY = "geochessr:counters:visitors_hll"
+
+
+def main():
+    """
+    One-shot migration of the legacy unique-visitor SET into the HyperLogLog key.
+    Pass --keep-set to leave the old set in place after copying.
+    """
+    if redis_pool.redis is None:
+        print("redis module not available; nothing to migrate.")
+        return 0
+    keep_set = "--keep-set" in sys.argv[1:]
+    try:
+        r = redis_pool.direct_client()
+        if not r.exists(LEGACY_SET_KEY):
+            print(f"No legacy set at {LEGACY_SET_KEY}; nothing to migrate.")
+            return 0
+        legacy_count = int(r.scard(LEGACY_SET_KEY))
+        cursor = 0
+        migrated = 0
+        while True:
+            cursor, members = r.sscan(LEGACY_SET_KEY, cursor=cursor, count=1000)
+            if members:
+                r.pfadd(VISITOR_HLL_KEY, *members)
+                migrated += len(members)
+            if cursor == 0:
+                break
+        estimate = int(r.pfcount(VISITOR_HLL_KEY))
+        print(
+            f"Migrated {migrated} visitor hashes (set had {legacy_count}); "
+            f"HyperLogLog estimate is now {estimate}."
+        )
+        if not keep_set:
+            r.delete(LEGACY_SET_KEY)
+            print(f"Deleted legacy set {LEGACY_SET_KEY}.")
+        return 0
+    except Exception as e:
+        print(f"Failed to migrate visitor set: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Combine the cburnett piece SVGs into one sprite sheet of <symbol>s, so the
+board loads a single cached file and references pieces with
+<use href="...#piece-wN">.
+"""
+
+import os
+import re
+
+SVG_ROOT_RE = re.compile(r"<svg\b([^>]*)>(.*)</svg>", re.DOTALL)
+VIEWBOX_RE = re.compile(r'viewBox="([^"]+)"')
+
+
+def _minify(markup: str) -> str:
+    markup = re.sub(r"<\?xml[^>]*\?>|<!--.*?-->", "", markup, flags=re.DOTALL)
+    markup = re.sub(r">\s+<", "><", markup)
+    return re.sub(r"\s+", " ", markup).strip()
+
+
+def symbol_id(filename: str) -> str:
+    """wN.svg -> piece-wN"""
+    return "piece-" + os.path.splitext(filename)[0]
+
+
+def build_piece_sprite(piece_dir: str) -> bytes:
+    symbols = []
+    for name in sorted(os.listdir(piece_dir)):
+        if not name.endswith(".svg"):
+            continue
+        with open(os.path.join(piece_dir, name), "r", encoding="utf-8") as f:
+            markup = f.read()
+        match = SVG_ROOT_RE.search(markup)
+        if match is None:
+            print(f"Skipping {name}: no <svg> root")
+            continue
+        attrs, body = match.groups()
+        viewbox = VIEWBOX_RE.search(attrs)
+        symbols.append(
+            f'<symbol id="{symbol_id(name)}" viewBox="{viewbox.group(1) if viewbox else "0 0 45 45"}">'
+            f"{_minify(body)}</symbol>"
+        )
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg">' + "".join(symbols) + "</svg>"
+    ).encode("utf-8")
@@ -0,0 +1,213 @@
+"""
+Opt-in request profiling.
+
+A request is run under cProfile when either
+  - a random draw falls under PROFILE_SAMPLE_RATE (0..1, default 0 = off), or
+  - it carries `X-Profile: 1` together with a valid admin token; the
+    response then names the dump in an `X-Profile-Dump` header.
+
+Each profiled request is written to PROFILE_DIR/<endpoint>/<time>-<pid>-<n>.prof
+(pstats format); only the newest PROFILE_KEEP (default 50) dumps of each
+endpoint are kept. Only one request per worker is profiled at a time, and
+sampled requests are skipped while one is running. Under gevent, greenlets
+that run while the profiled request waits on I/O are included in its profile.
+
+`python -m geo_server.profiling merge [DIR]` merges the dumps of each endpoint
+into <endpoint>.prof plus <endpoint>.collapsed, one "a;b;c <microseconds>"
+line per stack, ready for flamegraph.pl or speedscope. cProfile records
+caller/callee edges rather than full stacks, so the stacks are rebuilt from
+the call graph by splitting each function's time across its callers in
+proportion to the calls they made.
+"""
+
+import argparse
+import cProfile
+import itertools
+import os
+import pstats
+import random
+import re
+import threading
+import time
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER = "X-Profile"
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+# Stacks deeper than this are truncated in the collapsed output
+MAX_STACK_DEPTH = 64
+
+_active = threading.Lock()
+_local = threading.local()
+_counter = itertools.count()
+_ADDRESS_RE = re.compile(r" at 0x[0-9a-fA-F]+")
+
+
+def default_profile_dir(base_dir: str) -> str:
+    return os.getenv("PROFILE_DIR") or os.path.join(base_dir, "profiles")
+
+
+def _dump_path(profile_dir: str, endpoint: str) -> str:
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    name = f"{stamp}-{os.getpid()}-{next(_counter):06d}.prof"
+    return os.path.join(profile_dir, endpoint, name)
+
+
+def _prune(ep_dir: str, keep: int):
+    """Delete all but the newest `keep` dumps in an endpoint's directory."""
+    dumps = []
+    for name in os.listdir(ep_dir):
+        if name.endswith(".prof"):
+            path = os.path.join(ep_dir, name)
+            try:
+                dumps.append((os.path.getmtime(path), path))
+            except OSError:
+                pass  # removed by another worker
+    dumps.sort()
+    for _, path in dumps[: max(0, len(dumps) - keep)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def init_profiling(
+    app,
+    profile_dir: str,
+    is_admin_request,
+    sample_rate: float | None = None,
+    keep: int | None = None,
+):
+    """Register the profiling hooks on `app`; `is_admin_request()` gates the header."""
+    from flask import request
+
+    rate = PROFILE_SAMPLE_RATE if sample_rate is None else float(sample_rate)
+    keep = PROFILE_KEEP if keep is None else int(keep)
+
+    @app.before_request
+    def _profile_begin():
+        requested = request.headers.get(PROFILE_HEADER) == "1" and is_admin_request()
+        if not requested and not (rate > 0 and random.random() < rate):
+            return
+        if not _active.acquire(blocking=False):
+            return
+        profiler = cProfile.Profile()
+        _local.profiler = profiler
+        _local.requested = requested
+        profiler.enable()
+
+    def _finish():
+        profiler = getattr(_local, "profiler", None)
+        if profiler is None:
+            return None
+        profiler.disable()
+        _local.profiler = None
+        _active.release()
+        rule = request.url_rule
+        endpoint = rule.endpoint if rule is not None else "unmatched"
+        path = _dump_path(profile_dir, endpoint)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            profiler.dump_stats(path)
+            _prune(os.path.dirname(path), keep)
+        except Exception as e:
+            print(f"Profile dump failed: {e}")
+            return None
+        return path
+
+    @app.after_request
+    def _profile_end(response):
+        path = _finish()
+        if path is not None and getattr(_local, "requested", False):
+            response.headers["X-Profile-Dump"] = os.path.relpath(path, profile_dir)
+        return response
+
+    @app.teardown_request
+    def _profile_teardown(exc):
+        # Unhandled errors skip after_request; release the profiler anyway
+        _finish()
+
+
+# -------------------- Merging --------------------
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":
+        # builtins, e.g. <built-in method time.sleep>; addresses differ per process
+        return _ADDRESS_RE.sub("", name)
+    short = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+    return f"{name} ({short}:{line})"
+
+
+def collapsed_stacks(stats: pstats.Stats, min_us: int = 1) -> dict[str, int]:
+    """Stack ("root;...;leaf") -> self time in microseconds, from the call graph."""
+    raw = stats.stats
+    callees: dict[tuple, list] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+    out: dict[str, int] = {}
+
+    def walk(func, allotted: float, stack: list):
+        _, _, tt, ct, _ = raw[func]
+        frac = allotted / ct if ct > 0 else 0.0
+        key = ";".join(_label(f) for f in stack)
+        us = int(round(tt * frac * 1e6))
+        if us >= min_us:
+            out[key] = out.get(key, 0) + us
+        if len(stack) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            child = edge_ct * frac
+            # Recursion would repeat the same time; its self time is already counted
+            if child * 1e6 >= min_us and callee not in stack:
+                walk(callee, child, stack + [callee])
+
+    roots = [f for f, v in raw.items() if not v[4]]
+    for root in roots:
+        walk(root, raw[root][3], [root])
+    return out
+
+
+def merge_dir(profile_dir: str, out_dir: str | None = None) -> list[str]:
+    """Merge every endpoint's dumps; returns the files written."""
+    out_dir = out_dir or profile_dir
+    written = []
+    for endpoint in sorted(os.listdir(profile_dir)):
+        ep_dir = os.path.join(profile_dir, endpoint)
+        if not os.path.isdir(ep_dir):
+            continue
+        dumps = sorted(
+            os.path.join(ep_dir, name) for name in os.listdir(ep_dir) if name.endswith(".prof")
+        )
+        if not dumps:
+            continue
+        stats = pstats.Stats(*dumps)
+        prof_path = os.path.join(out_dir, f"{endpoint}.prof")
+        stats.dump_stats(prof_path)
+        collapsed_path = os.path.join(out_dir, f"{endpoint}.collapsed")
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for stack, us in sorted(collapsed_stacks(stats).items()):
+                f.write(f"{stack} {us}\n")
+        print(f"{endpoint}: {len(dumps)} profiles -> {prof_path}, {collapsed_path}")
+        written += [prof_path, collapsed_path]
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge request profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    merge = sub.add_parser("merge", help="merge dumps into per-endpoint .prof and .collapsed")
+    merge.add_argument(
+        "profile_dir",
+        nargs="?",
+        default=default_profile_dir(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    )
+    merge.add_argument("--out", default=None, help="output directory (default: profile_dir)")
+    args = parser.parse_args()
+    if args.command == "merge":
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+        merge_dir(args.profile_dir, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+SQL statement statistics and slow-query log.
+
+Every statement run through `InstrumentedConnection` (see metrics.py) is
+aggregated by its normalised text: literals become `?` and `IN (?, ?, ...)`
+lists collapse to `IN (?+)`, so the dynamically built run-selection queries
+group by filter combination rather than by value. Execute and fetch time
+both count towards a statement's duration.
+
+A statement slower than SLOW_QUERY_MS (default 100) is printed with its
+bound-parameter shape and `EXPLAIN QUERY PLAN` output. Plans are captured at
+most once per QUERY_PLAN_INTERVAL seconds per normalised statement, and the
+most recent slow entries are kept for /api/admin/query_stats.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "100")) / 1000.0
+QUERY_PLAN_INTERVAL = float(os.getenv("QUERY_PLAN_INTERVAL", "300"))
+# Distinct statements tracked; the rest are counted under OTHER_KEY
+MAX_STATEMENTS = int(os.getenv("QUERY_STATS_MAX", "500"))
+OTHER_KEY = "<other>"
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _SPACE_RE.sub(" ", sql).strip()
+    return _IN_LIST_RE.sub("IN (?+)", sql)
+
+
+def _type_name(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"blob[{len(value)}]"
+    return type(value).__name__
+
+
+def param_shape(parameters, rows: int | None = None) -> str:
+    """
+    Types of the bound parameters, with repeats run-length encoded:
+    (1, 2, 3, 'a') -> "(int*3, str)"; executemany adds the row count.
+    """
+    if isinstance(parameters, dict):
+        shape = "{" + ", ".join(f"{k}: {_type_name(v)}" for k, v in parameters.items()) + "}"
+    else:
+        parts = []
+        for value in parameters or ():
+            name = _type_name(value)
+            if parts and parts[-1][0] == name:
+                parts[-1][1] += 1
+            else:
+                parts.append([name, 1])
+        shape = "(" + ", ".join(n if c == 1 else f"{n}*{c}" for n, c in parts) + ")"
+    return shape if rows is None else f"{shape} x {rows} rows"
+
+
+def explain(conn: sqlite3.Connection, sql: str, parameters) -> list[str]:
+    """EXPLAIN QUERY PLAN as indented lines, on an uninstrumented cursor."""
+    rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+class _StatementStats:
+    __slots__ = ("count", "total", "max", "slow", "shape", "plan", "plan_at")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.shape = ""
+        self.plan: list[str] | None = None
+        self.plan_at = 0.0
+
+    def as_dict(self, sql: str) -> dict:
+        return {
+            "sql": sql,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / max(1, self.count), 3),
+            "max_ms": round(self.max * 1000, 3),
+            "slow": self.slow,
+            "last_params": self.shape,
+            "plan": self.plan,
+        }
+
+
+class QueryLog:
+    def __init__(
+        self, slow_seconds: float = SLOW_QUERY_SECONDS, max_statements: int = MAX_STATEMENTS
+    ):
+        self.slow_seconds = slow_seconds
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._stats: dict[str, _StatementStats] = {}
+        self.recent_slow: deque = deque(maxlen=50)
+
+    def _entry(self, key: str) -> _StatementStats:
+        entry = self._stats.get(key)
+        if entry is None:
+            if len(self._stats) >= self.max_statements:
+                key = OTHER_KEY
+                entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = _StatementStats()
+        return entry
+
+    def record(
+        self, sql: str, seconds: float, statement_seconds: float, new_statement: bool = True
+    ):
+        """
+        Add `seconds` to the statement's totals; `statement_seconds` is this
+        execution's time so far (fetch time passes new_statement=False).
+        """
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._entry(key)
+            if new_statement:
+                entry.count += 1
+            entry.total += seconds
+            entry.max = max(entry.max, statement_seconds)
+
+    def slow(self, conn, sql: str, parameters, seconds: float, rows: int | None = None):
+        """Log one slow execution, capturing the plan unless one is fresh."""
+        key = normalize_sql(sql)
+        shape = param_shape(parameters, rows)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(key)
+            entry.slow += 1
+            entry.shape = shape
+            need_plan = entry.plan is None or now - entry.plan_at >= QUERY_PLAN_INTERVAL
+            if need_plan:
+                entry.plan_at = now
+        if need_plan:
+            try:
+                plan = explain(conn, sql, parameters)
+            except Exception as e:
+                plan = [f"(plan unavailable: {e})"]
+            with self._lock:
+                entry.plan = plan
+        plan = entry.plan or []
+        self.recent_slow.append(
+            {
+                "at": time.time(),
+                "ms": round(seconds * 1000, 3),
+                "sql": key,
+                "params": shape,
+                "plan": plan,
+            }
+        )
+        print(
+            f"Slow query ({seconds * 1000:.1f} ms): {key} params={shape}"
+            + "".join(f"\n    {line}" for line in plan)
+        )
+
+    def stats(self, top: int = 50, order: str = "total") -> dict:
+        """Top statements by total, mean or max time, or by count."""
+        field = {"total": "total_ms", "mean": "mean_ms", "max": "max_ms", "count": "count"}
+        with self._lock:
+            items = [entry.as_dict(sql) for sql, entry in self._stats.items()]
+        items.sort(key=lambda d: d[field.get(order, "total_ms")], reverse=True)
+        return {
+            "slow_query_ms": self.slow_seconds * 1000,
+            "statements": items[:top],
+            "recent_slow": list(self.recent_slow),
+        }
+
+    def entries(self) -> dict:
+        """Normalised statement -> its running stats (a snapshot of the mapping)."""
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.recent_slow.clear()
+
+
+QUERY_LOG = QueryLog()
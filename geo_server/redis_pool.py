@@ -0,0 +1,159 @@
+"""
+Shared Redis connection pool used by sessions, counters and the percentile cache.
+
+All optional Redis traffic goes through `run`/`call`, which consult a circuit
+breaker: after a few consecutive failures Redis is skipped entirely for a
+cool-down window, so an outage costs nothing instead of a connect timeout on
+every request.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from geo_server.metrics import record_redis
+
+try:
+    import redis  # optional; everything degrades to "no Redis" without it
+except Exception:  # pragma: no cover
+    redis = None
+
+
+class RedisUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown_seconds = float(cooldown_seconds)
+        self._failures = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        # Once the cool-down has passed, requests go through again (half-open);
+        # a single further failure re-opens the breaker.
+        return time.monotonic() >= self._open_until
+
+    def is_open(self) -> bool:
+        return not self.allow()
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+
+    def record_failure(self) -> bool:
+        """Record a failure; returns True if this failure tripped the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._failures = self.failure_threshold - 1
+                self._open_until = time.monotonic() + self.cooldown_seconds
+                return True
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("REDIS_BREAKER_THRESHOLD", "3")),
+    cooldown_seconds=float(os.getenv("REDIS_BREAKER_COOLDOWN", "30")),
+)
+_stats = {
+    "calls": 0,
+    "errors": 0,
+    "skipped": 0,
+    "breaker_trips": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+}
+
+
+def _get_pool():
+    global _pool
+    if _pool is not None:
+        return _pool
+    if redis is None:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = redis.ConnectionPool(
+                host=os.getenv("REDIS_HOST", "localhost"),
+                port=int(os.getenv("REDIS_PORT", "6379")),
+                db=0,
+                password=os.getenv("REDIS_PASSWORD"),
+                socket_timeout=float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5")),
+                socket_connect_timeout=float(
+                    os.getenv("REDIS_CONNECT_TIMEOUT", "0.25")
+                ),
+                max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+            )
+    return _pool
+
+
+def direct_client():
+    """
+    Pooled client that bypasses the breaker. Used by Flask-Session (sessions cannot
+    work without Redis) and by the maintenance scripts.
+    """
+    pool = _get_pool()
+    if pool is None:
+        raise RedisUnavailable("redis module not available")
+    return redis.Redis(connection_pool=pool)
+
+
+def get_client():
+    """Pooled client, or None when Redis is unavailable or the breaker is open."""
+    pool = _get_pool()
+    if pool is None:
+        return None
+    if not _breaker.allow():
+        _stats["skipped"] += 1
+        return None
+    return redis.Redis(connection_pool=pool)
+
+
+def call(op: Callable[[Any], Any]):
+    """Run `op(client)`, raising RedisUnavailable on skip or failure."""
+    rc = get_client()
+    if rc is None:
+        raise RedisUnavailable("Redis skipped")
+    _stats["calls"] += 1
+    start = time.perf_counter()
+    try:
+        result = op(rc)
+    except Exception as e:
+        record_redis(time.perf_counter() - start)
+        _stats["errors"] += 1
+        if _breaker.record_failure():
+            _stats["breaker_trips"] += 1
+            print(f"Redis circuit breaker opened: {e}")
+        raise RedisUnavailable(str(e)) from e
+    record_redis(time.perf_counter() - start)
+    _breaker.record_success()
+    return result
+
+
+def run(op: Callable[[Any], Any], default=None):
+    """Like `call`, but returns `default` instead of raising."""
+    try:
+        return call(op)
+    except RedisUnavailable:
+        return default
+
+
+def record_cache_lookup(hit: bool):
+    _stats["cache_hits" if hit else "cache_misses"] += 1
+
+
+def breaker_open() -> bool:
+    return _breaker.is_open()
+
+
+def stats() -> dict:
+    out = dict(_stats)
+    out["breaker_open"] = _breaker.is_open()
+    return out
@@ -0,0 +1,68 @@
+import os
+from itertools import product
+from typing import Callable, Optional
+
+from geo_server.sqlite_wrapper import SQLiteWrapper
+from geo_server.manage_runs import (
+    add_run_to_database,
+    run_settings_for_request,
+)
+
+# Presets offered by the "New run" form: every difficulty and source with the
+# default puzzle counts and move range. Other settings are created on demand.
+# 5 is the first-visit default in scripts/main.js, 10 the slider's initial
+# value in templates/index.html.
+POOL_DIFFICULTIES = (0, 1, 2, 3)
+POOL_SOURCES = ("lichess", "world_champion")
+POOL_N_PUZZLES = (5, 10)
+POOL_MOVE_RANGES = ((5, 20),)
+POOL_TARGET_SIZE = int(os.getenv("RUN_POOL_SIZE", "3"))
+
+
+def preset_key(
+    difficulty: int, n_puzzles: int, min_move: int, max_move: int, source: str
+) -> str:
+    return f"d{difficulty}:n{n_puzzles}:m{min_move}-{max_move}:{source}"
+
+
+def pool_presets() -> list[tuple[int, int, int, int, str]]:
+    return [
+        (difficulty, n_puzzles, min_move, max_move, source)
+        for difficulty, n_puzzles, (min_move, max_move), source in product(
+            POOL_DIFFICULTIES, POOL_N_PUZZLES, POOL_MOVE_RANGES, POOL_SOURCES
+        )
+    ]
+
+
+def is_pooled_preset(
+    difficulty: int, n_puzzles: int, min_move: int, max_move: int, source: str
+) -> bool:
+    return (difficulty, n_puzzles, min_move, max_move, source) in pool_presets()
+
+
+def refill_pool(
+    sqlite_wrapper: SQLiteWrapper,
+    target_size: int = POOL_TARGET_SIZE,
+    progress: Optional[Callable[[float, str], None]] = None,
+) -> int:
+    """Top every preset up to `target_size` ready runs. Returns the number created."""
+    presets = pool_presets()
+    sizes = sqlite_wrapper.run_pool_sizes()
+    created = 0
+    for i, preset in enumerate(presets):
+        key = preset_key(*preset)
+        if progress is not None:
+            progress(i / len(presets), f"refilling {key}")
+        missing = target_size - sizes.get(key, 0)
+        for _ in range(max(0, missing)):
+            settings = run_settings_for_request(*preset)
+            geochess_list = sqlite_wrapper.select_geo_chess_for_run(settings)
+            if not geochess_list:
+                # Not enough puzzles for this preset; don't create empty runs
+                break
+            run = add_run_to_database(
+                sqlite_wrapper, [geo.id for geo in geochess_list], settings, False
+            )
+            sqlite_wrapper.add_to_run_pool(key, run.identifier)
+            created += 1
+    return created
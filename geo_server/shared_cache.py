@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+try:
+    import uwsgi  # only importable when running under uWSGI
+except ImportError:
+    uwsgi = None
+
+SHARED_CACHE_NAME = os.getenv("SHARED_CACHE_NAME", "geochessr")
+
+
+class UwsgiSharedCache:
+    """
+    Shared-memory cache backed by uWSGI's cache framework, so all workers of an
+    instance share one copy of each serialized payload. Requires a matching
+    `cache2 = name=geochessr,...` entry in uwsgi.ini.
+    """
+
+    def __init__(self, cache_name: str = SHARED_CACHE_NAME):
+        self.cache_name = cache_name
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = uwsgi.cache_get(key, self.cache_name)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: int = 0):
+        # cache_update overwrites; a failed store (item too big, cache full) is ignored
+        uwsgi.cache_update(key, value, int(ttl_seconds), self.cache_name)
+
+    def delete(self, key: str):
+        uwsgi.cache_del(key, self.cache_name)
+
+    def stats(self) -> dict:
+        return {"backend": "uwsgi", "hits": self.hits, "misses": self.misses}
+
+
+class LocalSharedCache:
+    """
+    Stand-in used outside uWSGI (the dev Flask server): same interface, but the
+    store is a bounded in-process dict, so it is only shared between threads.
+    """
+
+    def __init__(self, max_items: int = 8192):
+        self.max_items = max_items
+        self._data: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[0] and entry[0] < time.monotonic()):
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl_seconds: int = 0):
+        expires = time.monotonic() + ttl_seconds if ttl_seconds else 0.0
+        with self._lock:
+            self._data[key] = (expires, bytes(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "local",
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_shared_cache = None
+
+
+def get_shared_cache():
+    """The uWSGI cache when available and configured, else the in-process stand-in."""
+    global _shared_cache
+    if _shared_cache is not None:
+        return _shared_cache
+    cache = None
+    if uwsgi is not None and os.getenv("SHARED_CACHE") != "local":
+        try:
+            # Raises if no cache with this name is configured
+            uwsgi.cache_exists("__probe__", SHARED_CACHE_NAME)
+            cache = UwsgiSharedCache(SHARED_CACHE_NAME)
+        except Exception:
+            print(f"uWSGI cache '{SHARED_CACHE_NAME}' not configured; using local cache")
+    _shared_cache = cache or LocalSharedCache()
+    return _shared_cache
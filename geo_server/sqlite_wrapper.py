@@ -2,40 +2,97 @@ import sqlite3
 import os
 import json
 import hashlib
+import struct
+import threading
 from typing import Optional, Tuple
 
-try:
-    import redis  # optional; used for percentile cache
-except Exception:  # pragma: no cover
-    redis = None
+from geo_server import redis_pool
+from geo_server.cache import TTLCache, all_cache_stats
+from geo_server.metrics import InstrumentedConnection
+from geo_server.shared_cache import get_shared_cache
 from geo_server.model import GeoChess, ChessGame, RunSettings, Run
 
 
+def pack_puzzle_ids(ids) -> bytes:
+    """Puzzle ids as little-endian int64s, the runs.puzzle_ids_blob format."""
+    ids = [int(i) for i in ids]
+    return struct.pack(f"<{len(ids)}q", *ids)
+
+
+def unpack_puzzle_ids(blob: bytes) -> list[int]:
+    return list(struct.unpack(f"<{len(blob) // 8}q", blob))
+
+
 class SQLiteWrapper:
     def __init__(self, db_path: str):
-        self.conn = sqlite3.connect(db_path)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, factory=InstrumentedConnection)
         self.conn.execute("PRAGMA busy_timeout=5000;")
         self.initialize_tables()
 
-    # -------------------- Optional Redis Cache --------------------
-    _redis_instance = None
+    # -------------------- Per-process caches --------------------
+    # Runs and puzzles are read on every page view; keep hot ones in memory.
+    # Writers below invalidate (or patch) entries they change; the TTL bounds
+    # staleness for changes made by other workers.
+    RUN_CACHE = TTLCache(
+        "runs",
+        max_size=int(os.getenv("RUN_CACHE_SIZE", "2048")),
+        ttl_seconds=float(os.getenv("RUN_CACHE_TTL", "60")),
+    )
+    GEO_CACHE = TTLCache(
+        "geo_chess",
+        max_size=int(os.getenv("GEO_CACHE_SIZE", "8192")),
+        ttl_seconds=float(os.getenv("GEO_CACHE_TTL", "300")),
+    )
 
-    @classmethod
-    def _get_redis(cls):
-        if cls._redis_instance is not None:
-            return cls._redis_instance
-        if redis is None:
-            return None
+    # Second tier shared by all workers (uWSGI cache, or a local stand-in),
+    # holding serialized payloads between the per-process caches and SQLite.
+    SHARED_RUN_TTL = int(os.getenv("SHARED_RUN_TTL", "60"))
+    SHARED_GEO_TTL = int(os.getenv("SHARED_GEO_TTL", "300"))
+
+    @staticmethod
+    def cache_stats() -> dict:
+        stats = all_cache_stats()
         try:
-            password = os.getenv("REDIS_PASSWORD")
-            r = redis.Redis(host="localhost", port=6379, db=0, password=password)
-            # simple ping to validate
-            r.ping()
-            cls._redis_instance = r
-            return r
+            stats["shared"] = get_shared_cache().stats()
         except Exception:
-            return None
+            pass
+        return stats
 
+    @staticmethod
+    def _shared_load(key: str, model, loader, ttl_seconds: int, exclude=None):
+        try:
+            raw = get_shared_cache().get(key)
+            if raw is not None:
+                return model.model_validate_json(raw)
+        except Exception:
+            pass
+        obj = loader()
+        if obj is not None:
+            try:
+                get_shared_cache().set(
+                    key,
+                    obj.model_dump_json(exclude=exclude).encode("utf-8"),
+                    ttl_seconds,
+                )
+            except Exception:
+                pass
+        return obj
+
+    def _invalidate_runs(self, run_ids):
+        shared = get_shared_cache()
+        for run_id in run_ids:
+            self.RUN_CACHE.invalidate(run_id)
+            try:
+                shared.delete(f"run:{run_id}")
+            except Exception:
+                pass
+
+    def _daily_run_ids(self) -> list[str]:
+        cursor = self.conn.execute("SELECT identifier FROM runs WHERE is_daily = 1")
+        return [row[0] for row in cursor.fetchall()]
+
+    # -------------------- Optional Redis Cache --------------------
     @staticmethod
     def _percentile_cache_key(payload: dict) -> str:
         raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
@@ -65,18 +122,129 @@ class SQLiteWrapper:
             "CREATE TABLE IF NOT EXISTS chess_games (result REAL, url TEXT, whiteElo INTEGER, blackElo INTEGER, timeControl TEXT, gameId TEXT PRIMARY KEY, eco TEXT, whitePlayer TEXT, blackPlayer TEXT, source TEXT, year INTEGER, pgn TEXT)"
         )
         self.conn.execute(
-            "CREATE TABLE IF NOT EXISTS runs (identifier TEXT PRIMARY KEY, is_daily INTEGER, black_info_rate REAL, metadata_fields TEXT, completed_count INTEGER DEFAULT 0, avg_time_seconds REAL, avg_correct_count REAL)"
+            "CREATE TABLE IF NOT EXISTS runs (identifier TEXT PRIMARY KEY, is_daily INTEGER, black_info_rate REAL, metadata_fields TEXT, completed_count INTEGER DEFAULT 0, avg_time_seconds REAL, avg_correct_count REAL, puzzle_ids_blob BLOB)"
         )
         self.conn.execute(
-            "CREATE TABLE IF NOT EXISTS run_puzzles (run_id TEXT, puzzle_id INTEGER, PRIMARY KEY (run_id, puzzle_id))"
+            "CREATE TABLE IF NOT EXISTS run_puzzles (run_id TEXT, idx INTEGER, puzzle_id INTEGER, PRIMARY KEY (run_id, idx)) WITHOUT ROWID"
         )
         self.conn.execute(
-            "CREATE TABLE IF NOT EXISTS certificates (certificate_id TEXT PRIMARY KEY, run_id TEXT, created_at REAL, time_taken_seconds INTEGER)"
+            "CREATE TABLE IF NOT EXISTS certificates (certificate_id TEXT PRIMARY KEY, run_id TEXT, created_at REAL, time_taken_seconds INTEGER, puzzle_ids_blob BLOB, successes_blob BLOB)"
         )
         self.conn.execute(
             "CREATE TABLE IF NOT EXISTS certificate_puzzles (certificate_id TEXT, idx INTEGER, puzzle_id INTEGER, success INTEGER, PRIMARY KEY (certificate_id, idx))"
         )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_leases (name TEXT PRIMARY KEY, owner TEXT, expires_at REAL, heartbeat_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_status (name TEXT PRIMARY KEY, last_success_day TEXT, last_success_at REAL, last_started_at REAL, last_error TEXT, progress TEXT, updated_at REAL, failures INTEGER DEFAULT 0, next_attempt_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, payload TEXT, status TEXT, progress REAL DEFAULT 0, message TEXT, attempts INTEGER DEFAULT 0, max_attempts INTEGER DEFAULT 3, cancel_requested INTEGER DEFAULT 0, worker TEXT, error TEXT, created_at REAL, started_at REAL, finished_at REAL, updated_at REAL, run_after REAL DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, run_after)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS run_pool (run_id TEXT PRIMARY KEY, preset_key TEXT, created_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_run_pool_preset ON run_pool (preset_key)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheduled_daily_runs (day TEXT PRIMARY KEY, run_id TEXT, source TEXT, created_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS app_state (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.conn.commit()
+        self._migrate_once()
+
+    # -------------------- Schema migrations --------------------
+    # Checked once per database file per process, not on every connection.
+    _MIGRATED_DBS: set = set()
+    _MIGRATION_LOCK = threading.Lock()
+
+    def _migrate_once(self):
+        key = os.path.abspath(self.db_path)
+        if key in self._MIGRATED_DBS:
+            return
+        with self._MIGRATION_LOCK:
+            if key in self._MIGRATED_DBS:
+                return
+            self._migrate_run_puzzles()
+            self._add_column_if_missing("certificates", "puzzle_ids_blob", "BLOB")
+            self._add_column_if_missing("certificates", "successes_blob", "BLOB")
+            self._add_column_if_missing("job_status", "failures", "INTEGER DEFAULT 0")
+            self._add_column_if_missing("job_status", "next_attempt_at", "REAL")
+            self._MIGRATED_DBS.add(key)
+
+    def _table_columns(self, table: str) -> list[str]:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    def _add_column_if_missing(self, table: str, column: str, decl: str):
+        if column in self._table_columns(table):
+            return
+        try:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+            self.conn.commit()
+        except sqlite3.OperationalError:
+            # Another process added it first
+            pass
+
+    def _migrate_run_puzzles(self):
+        """
+        Legacy run_puzzles had no position column; its rows were read back in
+        puzzle_id order (via the primary key index), so that order becomes idx.
+        Also adds runs.puzzle_ids_blob and backfills it.
+        """
+        self._add_column_if_missing("runs", "puzzle_ids_blob", "BLOB")
+        if "idx" not in self._table_columns("run_puzzles"):
+            self._rebuild_run_puzzles()
+        if "idx" not in self._table_columns("run_puzzles"):
+            # Rebuild failed (logged); the next process to start retries it
+            return
+        cursor = self.conn.execute(
+            "SELECT rp.run_id, rp.puzzle_id FROM run_puzzles rp JOIN runs r ON r.identifier = rp.run_id WHERE r.puzzle_ids_blob IS NULL ORDER BY rp.run_id, rp.idx"
+        )
+        by_run: dict[str, list[int]] = {}
+        for run_id, puzzle_id in cursor.fetchall():
+            by_run.setdefault(run_id, []).append(int(puzzle_id))
+        if by_run:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE runs SET puzzle_ids_blob = ? WHERE identifier = ?",
+                    [(pack_puzzle_ids(ids), run_id) for run_id, ids in by_run.items()],
+                )
+
+    def _rebuild_run_puzzles(self):
+        # One write transaction for the whole rebuild: sqlite3 would otherwise run
+        # the DDL in autocommit mode, leaving run_puzzles_new behind on failure.
+        # BEGIN IMMEDIATE also serialises the workers and the job daemon, which
+        # all start at once on a deploy; whoever waited re-checks and finds it done.
         self.conn.commit()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if "idx" in self._table_columns("run_puzzles"):
+                self.conn.rollback()
+                return
+            self.conn.execute("DROP TABLE IF EXISTS run_puzzles_new")
+            self.conn.execute(
+                "CREATE TABLE run_puzzles_new (run_id TEXT, idx INTEGER, puzzle_id INTEGER, PRIMARY KEY (run_id, idx)) WITHOUT ROWID"
+            )
+            self.conn.execute(
+                "INSERT INTO run_puzzles_new (run_id, idx, puzzle_id) SELECT run_id, ROW_NUMBER() OVER (PARTITION BY run_id ORDER BY puzzle_id) - 1, puzzle_id FROM run_puzzles"
+            )
+            self.conn.execute("DROP TABLE run_puzzles")
+            self.conn.execute("ALTER TABLE run_puzzles_new RENAME TO run_puzzles")
+            self.conn.commit()
+            print("Migrated run_puzzles to ordered (run_id, idx) layout")
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"run_puzzles migration failed: {e}")
 
     def insert_geo_chess(self, geo_chess: GeoChess):
         self.conn.execute(
@@ -149,7 +317,60 @@ class SQLiteWrapper:
             pgn=result[11],
         )
 
+    # The shared puzzle payload leaves out successes/fails, which change on
+    # every guess; they live under their own small key (see get_geo_chess_counts)
+    _GEO_COUNT_FIELDS = {"successes", "fails"}
+
     def get_geo_chess(self, id: int):
+        return self.GEO_CACHE.get_or_load(int(id), lambda: self._load_geo_shared(int(id)))
+
+    def _load_geo_shared(self, geo_id: int):
+        geo = self._shared_load(
+            f"geo:{geo_id}",
+            GeoChess,
+            lambda: self._load_geo_chess(geo_id),
+            self.SHARED_GEO_TTL,
+            exclude=self._GEO_COUNT_FIELDS,
+        )
+        if geo is not None:
+            geo.successes, geo.fails = self.get_geo_chess_counts(geo_id)
+        return geo
+
+    @staticmethod
+    def shared_geo_chess_counts(geo_id: int) -> Optional[tuple[int, int]]:
+        """(successes, fails) from the shared tier, or None if it doesn't have them."""
+        try:
+            raw = get_shared_cache().get(f"geo_counts:{int(geo_id)}")
+            if raw is not None:
+                successes, fails = raw.split(b",")
+                return int(successes), int(fails)
+        except Exception:
+            pass
+        return None
+
+    def get_geo_chess_counts(self, geo_id: int) -> tuple[int, int]:
+        """
+        (successes, fails) of a puzzle as every worker sees them: the shared
+        `geo_counts:<id>` entry, which each guess drops, else SQLite.
+        """
+        counts = self.shared_geo_chess_counts(geo_id)
+        if counts is not None:
+            return counts
+        row = self.conn.execute(
+            "SELECT successes, fails FROM geo_chess WHERE id = ?", (int(geo_id),)
+        ).fetchone()
+        counts = (int(row[0] or 0), int(row[1] or 0)) if row is not None else (0, 0)
+        try:
+            get_shared_cache().set(
+                f"geo_counts:{int(geo_id)}",
+                f"{counts[0]},{counts[1]}".encode("ascii"),
+                self.SHARED_GEO_TTL,
+            )
+        except Exception:
+            pass
+        return counts
+
+    def _load_geo_chess(self, id: int):
         cursor = self.conn.execute(
             "SELECT id, fen, subfen, posx, posy, dimx, dimy, move_num, last_move, gameId, white_to_move, score, difficulty, successes, fails, timestamp_added FROM geo_chess WHERE id = ?",
             (id,),
@@ -178,6 +399,74 @@ class SQLiteWrapper:
             timestamp_added=result[15],
         )
 
+    def get_geo_chess_many(self, ids) -> dict[int, GeoChess]:
+        """
+        Load several puzzles at once: cached ones come from the per-process cache,
+        the rest from a single query joined with their games. Missing ids are
+        left out of the result.
+        """
+        out: dict[int, GeoChess] = {}
+        missing = []
+        for geo_id in {int(i) for i in ids}:
+            cached = self.GEO_CACHE.peek(geo_id)
+            if cached is not None:
+                out[geo_id] = cached
+            else:
+                missing.append(geo_id)
+        if not missing:
+            return out
+        placeholders = ",".join("?" for _ in missing)
+        cursor = self.conn.execute(
+            f"""
+            SELECT g.id, g.fen, g.subfen, g.posx, g.posy, g.dimx, g.dimy, g.move_num, g.last_move,
+                   g.gameId, g.white_to_move, g.score, g.difficulty, g.successes, g.fails, g.timestamp_added,
+                   c.result, c.url, c.whiteElo, c.blackElo, c.timeControl, c.gameId, c.eco,
+                   c.whitePlayer, c.blackPlayer, c.source, c.year, c.pgn
+            FROM geo_chess g
+            LEFT JOIN chess_games c ON c.gameId = g.gameId
+            WHERE g.id IN ({placeholders})
+            """,
+            missing,
+        )
+        for row in cursor.fetchall():
+            chess_game = None
+            if row[21] is not None:
+                chess_game = ChessGame(
+                    result=row[16],
+                    url=row[17],
+                    whiteElo=row[18],
+                    blackElo=row[19],
+                    timeControl=row[20],
+                    gameId=row[21],
+                    eco=row[22],
+                    whitePlayer=row[23],
+                    blackPlayer=row[24],
+                    source=row[25],
+                    year=row[26],
+                    pgn=row[27],
+                )
+            geo = GeoChess(
+                id=row[0],
+                fen=row[1],
+                subfen=row[2],
+                posx=row[3],
+                posy=row[4],
+                dimx=row[5],
+                dimy=row[6],
+                move_num=row[7],
+                last_move=row[8],
+                chess_game=chess_game,
+                white_to_move=bool(row[10]),
+                score=row[11],
+                difficulty=row[12],
+                successes=row[13],
+                fails=row[14],
+                timestamp_added=row[15],
+            )
+            self.GEO_CACHE.set(geo.id, geo)
+            out[geo.id] = geo
+        return out
+
     def increment_geo_chess_attempt(self, geo_id: int, correct: bool):
         """
         Increment successes if correct, otherwise increment fails, for a given puzzle id.
@@ -194,6 +483,15 @@ class SQLiteWrapper:
                     (int(geo_id),),
                 )
             self.conn.commit()
+            # Keep this worker's cached copy in step instead of dropping it;
+            # only the small shared counts entry is dropped, the puzzle stays
+            cached = self.GEO_CACHE.peek(int(geo_id))
+            if cached is not None:
+                if correct:
+                    cached.successes = int(cached.successes or 0) + 1
+                else:
+                    cached.fails = int(cached.fails or 0) + 1
+            get_shared_cache().delete(f"geo_counts:{int(geo_id)}")
         except Exception:
             # Swallow DB errors here to avoid impacting user flow
             pass
@@ -293,17 +591,16 @@ class SQLiteWrapper:
                 "max_pct": max_pct,
             }
             cache_key = self._percentile_cache_key(cache_payload)
-            r = self._get_redis()
-            if r is not None:
+            cached = redis_pool.run(lambda rc: rc.get(cache_key))
+            if cached:
                 try:
-                    cached = r.get(cache_key)
-                    if cached:
-                        obj = json.loads(cached)
-                        lb = float(obj.get("low"))
-                        hb = float(obj.get("high"))
-                        percentile_bounds = (lb, hb)
+                    obj = json.loads(cached)
+                    lb = float(obj.get("low"))
+                    hb = float(obj.get("high"))
+                    percentile_bounds = (lb, hb)
                 except Exception:
                     percentile_bounds = None
+            redis_pool.record_cache_lookup(percentile_bounds is not None)
 
             if percentile_bounds is None:
                 diff_query = (
@@ -327,14 +624,12 @@ class SQLiteWrapper:
                 high_bound = diffs[high_idx]
                 percentile_bounds = (low_bound, high_bound)
                 # Store in cache
-                if r is not None:
-                    try:
-                        r.set(
-                            cache_key,
-                            json.dumps({"low": low_bound, "high": high_bound}),
-                        )
-                    except Exception:
-                        pass
+                redis_pool.run(
+                    lambda rc: rc.set(
+                        cache_key,
+                        json.dumps({"low": low_bound, "high": high_bound}),
+                    )
+                )
 
         # Final selection query
         final_where_clauses = list(where_clauses)
@@ -416,7 +711,7 @@ class SQLiteWrapper:
 
     def insert_run(self, run: Run):
         self.conn.execute(
-            "INSERT INTO runs (identifier, is_daily, black_info_rate, metadata_fields, completed_count, avg_time_seconds, avg_correct_count) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            "INSERT INTO runs (identifier, is_daily, black_info_rate, metadata_fields, completed_count, avg_time_seconds, avg_correct_count, puzzle_ids_blob) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
             (
                 run.identifier,
                 run.is_daily,
@@ -433,29 +728,42 @@ class SQLiteWrapper:
                     if getattr(run, "avg_correct_count", None) is not None
                     else None
                 ),
+                pack_puzzle_ids(run.puzzle_ids),
             ),
         )
-        for puzzle_id in run.puzzle_ids:
-            self.conn.execute(
-                "INSERT INTO run_puzzles (run_id, puzzle_id) VALUES (?, ?)",
-                (run.identifier, puzzle_id),
-            )
+        self.conn.executemany(
+            "INSERT INTO run_puzzles (run_id, idx, puzzle_id) VALUES (?, ?, ?)",
+            [(run.identifier, idx, puzzle_id) for idx, puzzle_id in enumerate(run.puzzle_ids)],
+        )
         self.conn.commit()
 
     def get_run(self, identifier: str) -> Run:
+        return self.RUN_CACHE.get_or_load(
+            identifier,
+            lambda: self._shared_load(
+                f"run:{identifier}",
+                Run,
+                lambda: self._load_run(identifier),
+                self.SHARED_RUN_TTL,
+            ),
+        )
+
+    def _load_run(self, identifier: str) -> Run:
         cursor = self.conn.execute(
-            "SELECT identifier, is_daily, black_info_rate, metadata_fields, completed_count, avg_time_seconds, avg_correct_count FROM runs WHERE identifier = ?",
+            "SELECT identifier, is_daily, black_info_rate, metadata_fields, completed_count, avg_time_seconds, avg_correct_count, puzzle_ids_blob FROM runs WHERE identifier = ?",
             (identifier,),
         )
         result = cursor.fetchone()
-        print("Result", result)
         if result is None:
             return None
-        cursor = self.conn.execute(
-            "SELECT puzzle_id FROM run_puzzles WHERE run_id = ?",
-            (identifier,),
-        )
-        puzzle_ids = [row[0] for row in cursor.fetchall()]
+        if result[7] is not None:
+            puzzle_ids = unpack_puzzle_ids(result[7])
+        else:
+            cursor = self.conn.execute(
+                "SELECT puzzle_id FROM run_puzzles WHERE run_id = ? ORDER BY idx",
+                (identifier,),
+            )
+            puzzle_ids = [row[0] for row in cursor.fetchall()]
         return Run(
             identifier=result[0],
             is_daily=result[1],
@@ -468,32 +776,76 @@ class SQLiteWrapper:
         )
 
     def get_daily_run(self) -> Run:
+        # The live daily run is the `daily_run_id` pointer; fall back to the
+        # is_daily flag for databases that predate scheduled daily runs.
         cursor = self.conn.execute(
-            "SELECT identifier, is_daily, black_info_rate, metadata_fields, completed_count, avg_time_seconds, avg_correct_count FROM runs WHERE is_daily = 1",
+            "SELECT value FROM app_state WHERE key = 'daily_run_id'"
+        )
+        pointer = cursor.fetchone()
+        if pointer is not None and pointer[0]:
+            run = self.get_run(pointer[0])
+            if run is not None:
+                return run
+        cursor = self.conn.execute(
+            "SELECT identifier FROM runs WHERE is_daily = 1",
         )
         result = cursor.fetchone()
         if result is None:
             return None
-        cursor = self.conn.execute(
-            "SELECT puzzle_id FROM run_puzzles WHERE run_id = ?",
-            (result[0],),
-        )
-        puzzle_ids = [row[0] for row in cursor.fetchall()]
-        return Run(
-            identifier=result[0],
-            is_daily=result[1],
-            black_info_rate=result[2],
-            puzzle_ids=puzzle_ids,
-            metadata_fields=result[3].split(","),
-            completed_count=int(result[4] or 0),
-            avg_time_seconds=(float(result[5]) if result[5] is not None else None),
-            avg_correct_count=(float(result[6]) if result[6] is not None else None),
-        )
+        return self.get_run(result[0])
 
     def remove_daily_run(self):
+        previous = self._daily_run_ids()
         self.conn.execute("UPDATE runs SET is_daily = 0 WHERE is_daily = 1")
+        self.conn.execute("DELETE FROM app_state WHERE key = 'daily_run_id'")
+        self.conn.commit()
+        self.RUN_CACHE.invalidate_where(lambda _, run: bool(run.is_daily))
+        self._invalidate_runs(previous)
+
+    # -------------------- Scheduled daily runs --------------------
+    def schedule_daily_run(self, day: str, run_id: str, source: str | None = None):
+        import time
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO scheduled_daily_runs (day, run_id, source, created_at) VALUES (?, ?, ?, ?)",
+            (day, run_id, source, time.time()),
+        )
         self.conn.commit()
 
+    def get_scheduled_daily_runs(self, from_day: str) -> dict[str, str]:
+        """day -> run_id for all scheduled days on or after `from_day` (YYYY-MM-DD)."""
+        cursor = self.conn.execute(
+            "SELECT day, run_id FROM scheduled_daily_runs WHERE day >= ? ORDER BY day",
+            (from_day,),
+        )
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def get_daily_pointer(self) -> tuple[Optional[str], Optional[str]]:
+        """Return (daily_run_id, daily_run_day) of the live daily run pointer."""
+        cursor = self.conn.execute(
+            "SELECT key, value FROM app_state WHERE key IN ('daily_run_id', 'daily_run_day')"
+        )
+        values = dict(cursor.fetchall())
+        return values.get("daily_run_id"), values.get("daily_run_day")
+
+    def activate_daily_run(self, run_id: str, day: str):
+        """Make `run_id` the live daily run: pointer and is_daily flags flip in one transaction."""
+        previous = self._daily_run_ids()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET is_daily = 0 WHERE is_daily = 1 AND identifier != ?",
+                (run_id,),
+            )
+            self.conn.execute(
+                "UPDATE runs SET is_daily = 1 WHERE identifier = ?", (run_id,)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO app_state (key, value) VALUES (?, ?)",
+                [("daily_run_id", run_id), ("daily_run_day", day)],
+            )
+        self.RUN_CACHE.invalidate_where(lambda _, run: bool(run.is_daily))
+        self._invalidate_runs(previous + [run_id])
+
     def update_run_completion_stats(
         self,
         run_id: str,
@@ -537,8 +889,16 @@ class SQLiteWrapper:
             (new_completed, new_avg_time, new_avg_correct, run_id),
         )
         self.conn.commit()
+        self._invalidate_runs([run_id])
 
     # -------------------- Certificates --------------------
+    # Certificates never change once written, so they can be cached for long
+    CERT_CACHE = TTLCache(
+        "certificates",
+        max_size=int(os.getenv("CERT_CACHE_SIZE", "1024")),
+        ttl_seconds=float(os.getenv("CERT_CACHE_TTL", "3600")),
+    )
+
     def insert_certificate(
         self,
         certificate_id: str,
@@ -549,39 +909,55 @@ class SQLiteWrapper:
     ):
         import time
 
+        flags = [
+            1 if (idx < len(successes) and bool(successes[idx])) else 0
+            for idx in range(len(puzzle_ids))
+        ]
         self.conn.execute(
-            "INSERT INTO certificates (certificate_id, run_id, created_at, time_taken_seconds) VALUES (?, ?, ?, ?)",
+            "INSERT INTO certificates (certificate_id, run_id, created_at, time_taken_seconds, puzzle_ids_blob, successes_blob) VALUES (?, ?, ?, ?, ?, ?)",
             (
                 certificate_id,
                 run_id,
                 float(time.time()),
                 (int(time_taken_seconds) if time_taken_seconds is not None else None),
+                pack_puzzle_ids(puzzle_ids),
+                bytes(flags),
             ),
         )
-        for idx, pid in enumerate(puzzle_ids):
-            succ = 1 if (idx < len(successes) and bool(successes[idx])) else 0
-            self.conn.execute(
-                "INSERT INTO certificate_puzzles (certificate_id, idx, puzzle_id, success) VALUES (?, ?, ?, ?)",
-                (certificate_id, int(idx), int(pid), succ),
-            )
+        self.conn.executemany(
+            "INSERT INTO certificate_puzzles (certificate_id, idx, puzzle_id, success) VALUES (?, ?, ?, ?)",
+            [
+                (certificate_id, idx, int(pid), flags[idx])
+                for idx, pid in enumerate(puzzle_ids)
+            ],
+        )
         self.conn.commit()
 
     def get_certificate(self, certificate_id: str):
+        return self.CERT_CACHE.get_or_load(
+            certificate_id, lambda: self._load_certificate(certificate_id)
+        )
+
+    def _load_certificate(self, certificate_id: str):
         cur = self.conn.execute(
-            "SELECT run_id, created_at, time_taken_seconds FROM certificates WHERE certificate_id = ?",
+            "SELECT run_id, created_at, time_taken_seconds, puzzle_ids_blob, successes_blob FROM certificates WHERE certificate_id = ?",
             (certificate_id,),
         )
         head = cur.fetchone()
         if head is None:
             return None
         run_id, created_at, time_taken_seconds = head[0], head[1], head[2]
-        cur2 = self.conn.execute(
-            "SELECT idx, puzzle_id, success FROM certificate_puzzles WHERE certificate_id = ? ORDER BY idx ASC",
-            (certificate_id,),
-        )
-        rows = cur2.fetchall()
-        puzzle_ids = [r[1] for r in rows]
-        successes = [bool(r[2]) for r in rows]
+        if head[3] is not None and head[4] is not None:
+            puzzle_ids = unpack_puzzle_ids(head[3])
+            successes = [bool(b) for b in head[4]]
+        else:
+            cur2 = self.conn.execute(
+                "SELECT idx, puzzle_id, success FROM certificate_puzzles WHERE certificate_id = ? ORDER BY idx ASC",
+                (certificate_id,),
+            )
+            rows = cur2.fetchall()
+            puzzle_ids = [r[1] for r in rows]
+            successes = [bool(r[2]) for r in rows]
         return {
             "certificate_id": certificate_id,
             "run_id": run_id,
@@ -592,3 +968,289 @@ class SQLiteWrapper:
             "puzzle_ids": puzzle_ids,
             "successes": successes,
         }
+
+    # -------------------- Counters --------------------
+    def increment_counters(self, deltas: dict[str, int]):
+        """Add each delta to its named counter in a single transaction."""
+        self.conn.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [(name, int(amount)) for name, amount in deltas.items()],
+        )
+        self.conn.commit()
+
+    def get_counters(self, names: list[str]) -> dict[str, int]:
+        if not names:
+            return {}
+        placeholders = ",".join(["?"] * len(names))
+        cursor = self.conn.execute(
+            f"SELECT name, value FROM counters WHERE name IN ({placeholders})",
+            tuple(names),
+        )
+        values = {row[0]: int(row[1] or 0) for row in cursor.fetchall()}
+        return {name: values.get(name, 0) for name in names}
+
+    # -------------------- Job leases (leader election) --------------------
+    def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        Take the named lease if it is free, expired, or already held by `owner`.
+        Returns True if `owner` holds the lease afterwards.
+        """
+        import time
+
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO job_leases (name, owner, expires_at, heartbeat_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at, heartbeat_at = excluded.heartbeat_at "
+            "WHERE job_leases.expires_at < ? OR job_leases.owner = excluded.owner",
+            (name, owner, now + float(ttl_seconds), now, now),
+        )
+        self.conn.commit()
+        cursor = self.conn.execute(
+            "SELECT owner FROM job_leases WHERE name = ?", (name,)
+        )
+        row = cursor.fetchone()
+        return row is not None and row[0] == owner
+
+    def renew_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Extend a held lease. Returns False if the lease was lost."""
+        import time
+
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE job_leases SET expires_at = ?, heartbeat_at = ? WHERE name = ? AND owner = ?",
+            (now + float(ttl_seconds), now, name, owner),
+        )
+        self.conn.commit()
+        return cursor.rowcount == 1
+
+    def release_lease(self, name: str, owner: str):
+        self.conn.execute(
+            "UPDATE job_leases SET expires_at = 0 WHERE name = ? AND owner = ?",
+            (name, owner),
+        )
+        self.conn.commit()
+
+    def get_job_status(self, name: str):
+        cursor = self.conn.execute(
+            "SELECT last_success_day, last_success_at, last_started_at, last_error, progress, updated_at, failures, next_attempt_at FROM job_status WHERE name = ?",
+            (name,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {
+            "name": name,
+            "last_success_day": row[0],
+            "last_success_at": row[1],
+            "last_started_at": row[2],
+            "last_error": row[3],
+            "progress": row[4],
+            "updated_at": row[5],
+            "failures": int(row[6] or 0),
+            "next_attempt_at": row[7],
+        }
+
+    def update_job_status(self, name: str, **fields):
+        """Upsert the given job_status columns for `name`; updated_at is set automatically."""
+        import time
+
+        allowed = (
+            "last_success_day",
+            "last_success_at",
+            "last_started_at",
+            "last_error",
+            "progress",
+            "failures",
+            "next_attempt_at",
+        )
+        cols = [c for c in allowed if c in fields]
+        values = [fields[c] for c in cols]
+        cols.append("updated_at")
+        values.append(time.time())
+        self.conn.execute(
+            f"INSERT INTO job_status (name, {', '.join(cols)}) VALUES (?, {', '.join(['?'] * len(cols))}) "
+            f"ON CONFLICT(name) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in cols)}",
+            (name, *values),
+        )
+        self.conn.commit()
+
+    # -------------------- Job queue --------------------
+    _JOB_COLUMNS = "id, kind, payload, status, progress, message, attempts, max_attempts, cancel_requested, worker, error, created_at, started_at, finished_at, updated_at"
+
+    @staticmethod
+    def _job_from_row(row):
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "payload": json.loads(row[2]) if row[2] else {},
+            "status": row[3],
+            "progress": row[4],
+            "message": row[5],
+            "attempts": row[6],
+            "max_attempts": row[7],
+            "cancel_requested": bool(row[8]),
+            "worker": row[9],
+            "error": row[10],
+            "created_at": row[11],
+            "started_at": row[12],
+            "finished_at": row[13],
+            "updated_at": row[14],
+        }
+
+    def enqueue_job(
+        self,
+        kind: str,
+        payload: dict | None = None,
+        max_attempts: int = 3,
+        dedupe: bool = False,
+    ) -> int:
+        """
+        Queue a job and return its id. With dedupe=True an already queued or
+        running job of the same kind and payload is reused instead.
+        """
+        import time
+
+        payload_json = json.dumps(payload or {}, sort_keys=True)
+        if dedupe:
+            cursor = self.conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND payload = ? AND status IN ('queued', 'running') ORDER BY id LIMIT 1",
+                (kind, payload_json),
+            )
+            row = cursor.fetchone()
+            if row is not None:
+                return int(row[0])
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (kind, payload, status, max_attempts, created_at, updated_at, run_after) VALUES (?, ?, 'queued', ?, ?, ?, 0)",
+            (kind, payload_json, int(max_attempts), now, now),
+        )
+        self.conn.commit()
+        return int(cursor.lastrowid)
+
+    def claim_job(self, worker: str):
+        """Atomically mark the oldest runnable queued job as running and return it."""
+        import time
+
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ?, updated_at = ?, error = NULL "
+            "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ? AND attempts < max_attempts ORDER BY id LIMIT 1) "
+            f"RETURNING {self._JOB_COLUMNS}",
+            (worker, now, now, now),
+        )
+        row = cursor.fetchone()
+        self.conn.commit()
+        return self._job_from_row(row)
+
+    def get_job(self, job_id: int):
+        cursor = self.conn.execute(
+            f"SELECT {self._JOB_COLUMNS} FROM jobs WHERE id = ?", (int(job_id),)
+        )
+        return self._job_from_row(cursor.fetchone())
+
+    def update_job_progress(self, job_id: int, progress: float, message: str = None):
+        """Record progress; returns True if cancellation has been requested."""
+        import time
+
+        self.conn.execute(
+            "UPDATE jobs SET progress = ?, message = ?, updated_at = ? WHERE id = ?",
+            (float(progress), message, time.time(), int(job_id)),
+        )
+        self.conn.commit()
+        cursor = self.conn.execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (int(job_id),)
+        )
+        row = cursor.fetchone()
+        return bool(row and row[0])
+
+    def finish_job(
+        self,
+        job_id: int,
+        status: str,
+        error: str = None,
+        retry_after_seconds: float | None = None,
+    ):
+        """
+        Mark a job done/failed/cancelled. With retry_after_seconds the job is put
+        back in the queue instead and becomes runnable after the delay.
+        """
+        import time
+
+        now = time.time()
+        if retry_after_seconds is not None:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                (error, now + float(retry_after_seconds), now, int(job_id)),
+            )
+        else:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                (status, error, now, now, int(job_id)),
+            )
+        self.conn.commit()
+
+    def request_job_cancel(self, job_id: int) -> bool:
+        """Cancel a queued job immediately, or flag a running one. Returns False if already finished."""
+        import time
+
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ?, updated_at = ? WHERE id = ? AND status = 'queued'",
+            (now, now, int(job_id)),
+        )
+        if cursor.rowcount == 0:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now, int(job_id)),
+            )
+        self.conn.commit()
+        return cursor.rowcount == 1
+
+    def requeue_stale_jobs(self, stale_after_seconds: float) -> int:
+        """
+        Put running jobs whose worker stopped reporting back into the queue;
+        ones that have used up their attempts are marked failed instead.
+        """
+        import time
+
+        now = time.time()
+        cutoff = now - float(stale_after_seconds)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, error = COALESCE(error, 'worker stopped responding'), finished_at = ?, updated_at = ? "
+                "WHERE attempts >= max_attempts AND (status = 'queued' OR (status = 'running' AND updated_at < ?))",
+                (now, now, cutoff),
+            )
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                (now, cutoff),
+            )
+        return cursor.rowcount
+
+    # -------------------- Pre-generated run pool --------------------
+    def add_to_run_pool(self, preset_key: str, run_id: str):
+        import time
+
+        self.conn.execute(
+            "INSERT INTO run_pool (run_id, preset_key, created_at) VALUES (?, ?, ?)",
+            (run_id, preset_key, time.time()),
+        )
+        self.conn.commit()
+
+    def pop_run_pool(self, preset_key: str) -> Optional[str]:
+        """Atomically take one ready-made run id for the preset, or None if empty."""
+        cursor = self.conn.execute(
+            "DELETE FROM run_pool WHERE run_id = (SELECT run_id FROM run_pool WHERE preset_key = ? ORDER BY created_at LIMIT 1) RETURNING run_id",
+            (preset_key,),
+        )
+        row = cursor.fetchone()
+        self.conn.commit()
+        return row[0] if row else None
+
+    def run_pool_sizes(self) -> dict[str, int]:
+        cursor = self.conn.execute(
+            "SELECT preset_key, COUNT(*) FROM run_pool GROUP BY preset_key"
+        )
+        return {row[0]: int(row[1]) for row in cursor.fetchall()}
@@ -0,0 +1,212 @@
+"""
+Static asset pipeline for /styles, /scripts and /assets.
+
+Every file is copied to static_build/<endpoint>/ under a content-hashed name
+(main.js -> main.3f2a9c01b7de.js), with gzip and, when the `brotli` module is
+installed, brotli variants next to compressible ones. Templates link to the
+hashed names through `asset_url`, so those URLs can be cached forever.
+
+Run `python -m geo_server.static_assets` to build ahead of a deploy; the app
+also (re)builds at startup, which only writes files whose content changed.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+
+from flask import Response, send_file, send_from_directory
+
+from geo_server.http_caching import IMMUTABLE_CACHE_CONTROL, preferred_encoding
+
+try:
+    import brotli  # optional; without it only gzip variants are written
+except ImportError:
+    brotli = None
+
+BUILD_DIR_NAME = "static_build"
+MANIFEST_NAME = "manifest.json"
+HASH_LEN = 12
+MIN_COMPRESS_SIZE = 512
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "image/x-icon",
+    "image/vnd.microsoft.icon",
+)
+# Server preference order when the client accepts several
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def hashed_name(rel_path: str, digest: str) -> str:
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest}{ext}"
+
+
+def _is_compressible(mimetype: str) -> bool:
+    return any(mimetype.startswith(t) for t in COMPRESSIBLE_TYPES)
+
+
+def _compressors():
+    out = {}
+    if brotli is not None:
+        out["br"] = lambda data: brotli.compress(data, quality=11)
+    out["gzip"] = lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    return out
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_file(endpoint: str, root: str, rel_path: str, build_dir: str) -> dict:
+    """Write the hashed copy and compressed variants of one file; return its manifest entry."""
+    src = os.path.join(root, rel_path)
+    with open(src, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LEN]
+    out_rel = hashed_name(rel_path, digest)
+    out_path = os.path.join(build_dir, endpoint, out_rel)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    if not os.path.exists(out_path):
+        _write_atomic(out_path, data)
+    mimetype = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+    encodings = []
+    if _is_compressible(mimetype) and len(data) >= MIN_COMPRESS_SIZE:
+        for coding, compress in _compressors().items():
+            variant = out_path + ENCODING_SUFFIXES[coding]
+            if not os.path.exists(variant):
+                packed = compress(data)
+                # Not worth a Vary header and an extra file for tiny gains
+                if len(packed) >= len(data) * 0.9:
+                    continue
+                _write_atomic(variant, packed)
+            encodings.append(coding)
+    return {
+        "path": out_rel,
+        "hash": digest,
+        "mimetype": mimetype,
+        "encodings": encodings,
+        "mtime": os.path.getmtime(src),
+    }
+
+
+def build_assets(roots: dict[str, str], build_dir: str) -> dict:
+    """Build every file under `roots` (endpoint -> directory) and write the manifest."""
+    files = {}
+    for endpoint, root in roots.items():
+        for dirpath, _, names in os.walk(root):
+            for name in sorted(names):
+                rel_path = os.path.relpath(os.path.join(dirpath, name), root)
+                rel_path = rel_path.replace(os.sep, "/")
+                files[f"{endpoint}/{rel_path}"] = build_file(
+                    endpoint, root, rel_path, build_dir
+                )
+    manifest = {"files": files}
+    os.makedirs(build_dir, exist_ok=True)
+    _write_atomic(
+        os.path.join(build_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"),
+    )
+    return manifest
+
+
+class AssetManifest:
+    """
+    Maps logical asset paths to fingerprinted ones and serves the built files.
+    With `auto_reload` (development), an edited source file is rebuilt the next
+    time its URL is generated instead of requiring a restart.
+    """
+
+    def __init__(self, roots: dict[str, str], build_dir: str, auto_reload: bool = False):
+        self.roots = roots
+        self.build_dir = build_dir
+        self.auto_reload = auto_reload
+        self._lock = threading.Lock()
+        self.files: dict[str, dict] = {}
+        self._by_hashed: dict[str, str] = {}
+
+    def build(self):
+        self._set_files(build_assets(self.roots, self.build_dir)["files"])
+        return self
+
+    def _set_files(self, files: dict):
+        with self._lock:
+            self.files = files
+            self._by_hashed = {
+                f"{key.split('/', 1)[0]}/{entry['path']}": key
+                for key, entry in files.items()
+            }
+
+    def _entry(self, endpoint: str, filename: str):
+        key = f"{endpoint}/{filename}"
+        entry = self.files.get(key)
+        if entry is None or not self.auto_reload:
+            return entry
+        root = self.roots[endpoint]
+        try:
+            if os.path.getmtime(os.path.join(root, filename)) != entry["mtime"]:
+                entry = build_file(endpoint, root, filename, self.build_dir)
+                with self._lock:
+                    self.files[key] = entry
+                    self._by_hashed[f"{endpoint}/{entry['path']}"] = key
+        except OSError:
+            pass
+        return entry
+
+    def hashed_filename(self, endpoint: str, filename: str) -> str:
+        entry = self._entry(endpoint, filename)
+        return entry["path"] if entry is not None else filename
+
+    def serve(self, endpoint: str, filename: str) -> Response:
+        key = self._by_hashed.get(f"{endpoint}/{filename}")
+        if key is None:
+            # Plain (or outdated fingerprinted) name: the source file, revalidated as before
+            return send_from_directory(self.roots[endpoint], filename)
+        entry = self.files[key]
+        coding = preferred_encoding(entry["encodings"])
+        path = os.path.join(self.build_dir, endpoint, entry["path"])
+        etag = entry["hash"]
+        if coding is not None:
+            path += ENCODING_SUFFIXES[coding]
+            etag = f"{etag}-{coding}"
+        resp = send_file(
+            path,
+            mimetype=entry["mimetype"],
+            etag=etag,
+            conditional=True,
+            max_age=31536000,
+        )
+        resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        if entry["encodings"]:
+            resp.headers["Vary"] = "Accept-Encoding"
+        if coding is not None:
+            resp.headers["Content-Encoding"] = coding
+        return resp
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets")
+    parser.add_argument(
+        "--base-dir",
+        default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    args = parser.parse_args()
+    roots = {
+        name: os.path.join(args.base_dir, name) for name in ("styles", "scripts", "assets")
+    }
+    build_dir = os.path.join(args.base_dir, BUILD_DIR_NAME)
+    manifest = build_assets(roots, build_dir)
+    print(f"Built {len(manifest['files'])} assets into {build_dir} (brotli: {brotli is not None})")
+
+
+if __name__ == "__main__":
+    main()
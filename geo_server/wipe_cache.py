@@ -1,19 +1,14 @@
-import os
 import sys
 
-try:
-    import redis
-except Exception:
-    redis = None
+from geo_server import redis_pool
 
 
 def main():
-    if redis is None:
+    if redis_pool.redis is None:
         print("redis module not available; nothing to wipe.")
         return 0
-    password = os.getenv("REDIS_PASSWORD")
     try:
-        r = redis.Redis(host="localhost", port=6379, db=0, password=password)
+        r = redis_pool.direct_client()
         # Scan-and-delete keys for percentile cache
         pattern = "geochessr:percentiles:*"
         cursor = 0
@@ -26,10 +26,11 @@ let currentRunId = null;
 let currentRunIndex = 0;
 let currentRunLen = 0;
 let currentRunSubmissions = []; // Track all submissions for the current run
-let currentPgnObjectUrl = null; // Blob URL for PGN download (feedback phase)
 let useLichessEmbed = false; // user toggle for lichess board in feedback
 let currentRunTimeTakenSeconds = null; // Elapsed time reported by server when run finished
 let IS_SINGLE = false; // single-puzzle mode flag (global for cross-function access)
+let runBundle = null; // Prefetched masked payloads for every puzzle in the run
+let pendingAdvance = null; // In-flight /api/next?lite=1 call advancing the session index
 
 // Sound effects
 let sfxCorrect = null;
@@ -40,6 +41,12 @@ let sfxAllCorrect = null;
 // Share-link helper for first puzzle prompt (non-daily)
 let shareCopyHandler = null;
 
+// Fingerprinted URL of a file under /assets when the page provides one
+function assetUrl(path) {
+  const urls = window.ASSET_URLS || {};
+  return urls[path] || `/assets/${path}`;
+}
+
 function playSfx(kind) {
   try {
     let audio = null;
@@ -116,12 +123,38 @@ function createBoardSquares(rows, cols) {
   }
 }
 
-function pieceToAssetPath(ch) {
+function pieceName(ch) {
   const isWhite = ch === ch.toUpperCase();
-  const color = isWhite ? 'w' : 'b';
-  const pieceLetter = ch.toUpperCase();
+  return `${isWhite ? 'w' : 'b'}${ch.toUpperCase()}`;
+}
+
+function pieceToAssetPath(ch) {
   // Served by Flask at /assets/cburnett/<file>
-  return `/assets/cburnett/${color}${pieceLetter}.svg`;
+  return assetUrl(`cburnett/${pieceName(ch)}.svg`);
+}
+
+const SVG_NS = 'http://www.w3.org/2000/svg';
+
+// Piece element: a <use> of the cached sprite sheet, or an <img> per piece without one
+function createPieceEl(ch, className, label) {
+  const spriteUrl = window.PIECE_SPRITE_URL;
+  if (!spriteUrl) {
+    const img = document.createElement('img');
+    if (className) img.className = className;
+    img.alt = label;
+    img.src = pieceToAssetPath(ch);
+    return img;
+  }
+  const svg = document.createElementNS(SVG_NS, 'svg');
+  svg.classList.add('piece');
+  if (className) svg.classList.add(className);
+  svg.setAttribute('viewBox', '0 0 45 45');
+  svg.setAttribute('role', 'img');
+  svg.setAttribute('aria-label', label);
+  const use = document.createElementNS(SVG_NS, 'use');
+  use.setAttribute('href', `${spriteUrl}#piece-${pieceName(ch)}`);
+  svg.appendChild(use);
+  return svg;
 }
 
 function renderCells(rows, cols, cells) {
@@ -133,10 +166,7 @@ function renderCells(rows, cols, cells) {
       square.classList.remove('highlight');
       const ch = cells[i];
       if (ch) {
-        const img = document.createElement('img');
-        img.alt = `Piece ${ch}`;
-        img.src = pieceToAssetPath(ch);
-        square.appendChild(img);
+        square.appendChild(createPieceEl(ch, null, `Piece ${ch}`));
       }
     }
   }
@@ -220,12 +250,13 @@ document.addEventListener('DOMContentLoaded', function() {
   currentRunLen = Number(window.RUN_LEN || 0);
   IS_SINGLE = !!window.IS_SINGLE_PUZZLE;
   currentRunTimeTakenSeconds = null;
+  if (currentRunId && !IS_SINGLE) prefetchRunBundle(currentRunId);
   // Initialize sounds after first user gesture will be required by browsers; creating upfront is fine
   try {
-    sfxCorrect = new Audio('/assets/sound/correct.mp3');
-    sfxIncorrect = new Audio('/assets/sound/incorrect.mp3');
-    sfxRunFinished = new Audio('/assets/sound/run_finished.mp3');
-    sfxAllCorrect = new Audio('/assets/sound/all_correct.mp3');
+    sfxCorrect = new Audio(assetUrl('sound/correct.mp3'));
+    sfxIncorrect = new Audio(assetUrl('sound/incorrect.mp3'));
+    sfxRunFinished = new Audio(assetUrl('sound/run_finished.mp3'));
+    sfxAllCorrect = new Audio(assetUrl('sound/all_correct.mp3'));
     [sfxCorrect, sfxIncorrect, sfxRunFinished, sfxAllCorrect].forEach(a => { if (a) a.preload = 'auto'; });
   } catch (_) {}
   // Toggle Daily Run title in meta card
@@ -764,7 +795,7 @@ function initBoard8() {
 
 function clearBoard8Overlay() {
   if (overlayFrozen) return; // keep frozen overlay
-  const imgs = board8El.querySelectorAll('img.b8-overlay');
+  const imgs = board8El.querySelectorAll('.b8-overlay');
   imgs.forEach(img => img.remove());
   if (feedbackLineEl) {
     feedbackLineEl.remove();
@@ -798,10 +829,7 @@ function showBoard8OverlayAtPosition(topLeftRow, topLeftCol) {
       const square = document.getElementById(`b8-${targetRow}-${targetCol}`);
       if (!square) continue;
       // Render overlay image exactly inside the square
-      const img = document.createElement('img');
-      img.className = 'b8-overlay';
-      img.alt = `Overlay ${ch}`;
-      img.src = pieceToAssetPath(ch);
+      const img = createPieceEl(ch, 'b8-overlay', `Overlay ${ch}`);
       img.style.width = '74%';
       img.style.height = '74%';
       img.style.objectFit = 'contain';
@@ -835,10 +863,7 @@ function renderOverlayPiecesAt(topLeftRow, topLeftCol, fenString, opts) {
       if (targetRow < 0 || targetRow > 7 || targetCol < 0 || targetCol > 7) continue;
       const square = document.getElementById(`b8-${targetRow}-${targetCol}`);
       if (!square) continue;
-      const img = document.createElement('img');
-      img.className = 'b8-overlay';
-      img.alt = `Overlay ${ch}`;
-      img.src = pieceToAssetPath(ch);
+      const img = createPieceEl(ch, 'b8-overlay', `Overlay ${ch}`);
       // Absolutely position to avoid layout expansion when stacking two overlays
       const rect = square.getBoundingClientRect();
       // Use percentages to match existing visual size (~74%) and center
@@ -882,10 +907,7 @@ function renderCorrectWindowAt(topLeftRow, topLeftCol, fullFen, windowRows, wind
       if (!ch) continue;
       const square = document.getElementById(`b8-${absRow}-${absCol}`);
       if (!square) continue;
-      const img = document.createElement('img');
-      img.className = 'b8-overlay';
-      img.alt = `Overlay ${ch}`;
-      img.src = pieceToAssetPath(ch);
+      const img = createPieceEl(ch, 'b8-overlay', `Overlay ${ch}`);
       img.style.position = 'absolute';
       img.style.left = '50%';
       img.style.top = '50%';
@@ -950,10 +972,7 @@ function updateOverlayAtClientXY(clientX, clientY) {
       const square = document.getElementById(`b8-${targetRow}-${targetCol}`);
       if (!square) continue;
       // Render overlay image exactly inside the square
-      const img = document.createElement('img');
-      img.className = 'b8-overlay';
-      img.alt = `Overlay ${ch}`;
-      img.src = pieceToAssetPath(ch);
+      const img = createPieceEl(ch, 'b8-overlay', `Overlay ${ch}`);
       img.style.width = '74%';
       img.style.height = '74%';
       img.style.objectFit = 'contain';
@@ -1072,6 +1091,7 @@ async function submitBoard8Selection() {
   const payload = { id, x: lastOverlayTopLeft.col, y: lastOverlayTopLeft.row };
   if (IS_SINGLE) payload.singlePuzzle = true;
   try {
+    await awaitPendingAdvance();
     const res = await fetch('/api/check_position', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -1117,7 +1137,7 @@ async function submitBoard8Selection() {
     // After feedback card, render ghost submission pieces and correct window pieces on right board
     try {
       // Clear any existing overlays/line before layering anew
-      const imgs = board8El.querySelectorAll('img.b8-overlay');
+      const imgs = board8El.querySelectorAll('.b8-overlay');
       imgs.forEach(img => img.remove());
     if (feedbackBoxesEl) { feedbackBoxesEl.remove(); feedbackBoxesEl = null; }
       // Submission (ghosted)
@@ -1183,13 +1203,11 @@ async function submitBoard8Selection() {
     const pgnLink = document.getElementById('metaPgnLink');
     if (metaRowUrl) metaRowUrl.style.display = allowed.has('url') ? '' : 'none';
     if (metaRowPgn) {
-      if (allowed.has('pgn') && data && typeof data.pgn === 'string' && data.pgn.length > 0) {
-        try { if (currentPgnObjectUrl) URL.revokeObjectURL(currentPgnObjectUrl); } catch(_) {}
-        const blob = new Blob([data.pgn], { type: 'application/x-chess-pgn' });
-        currentPgnObjectUrl = URL.createObjectURL(blob);
+      if (allowed.has('pgn') && data && typeof data.pgnUrl === 'string' && data.pgnUrl.length > 0) {
+        // The PGN is only fetched (and then browser-cached) when the link is used
         if (pgnLink) {
           pgnLink.textContent = 'Download';
-          pgnLink.href = currentPgnObjectUrl;
+          pgnLink.href = data.pgnUrl;
           pgnLink.download = 'game.pgn';
         }
         metaRowPgn.style.display = '';
@@ -1330,14 +1348,10 @@ function showResultMessage(resp) {
     if (metaRowUrl) metaRowUrl.style.display = allowed.has('url') ? '' : 'none';
     // PGN: construct a downloadable link if provided
     if (metaRowPgn) {
-      if (allowed.has('pgn') && resp && typeof resp.pgn === 'string' && resp.pgn.length > 0) {
-        // Revoke previous object URL to avoid leaks
-        try { if (currentPgnObjectUrl) URL.revokeObjectURL(currentPgnObjectUrl); } catch(_) {}
-        const blob = new Blob([resp.pgn], { type: 'application/x-chess-pgn' });
-        currentPgnObjectUrl = URL.createObjectURL(blob);
+      if (allowed.has('pgn') && resp && typeof resp.pgnUrl === 'string' && resp.pgnUrl.length > 0) {
         if (pgnLink) {
           pgnLink.textContent = 'Download';
-          pgnLink.href = currentPgnObjectUrl;
+          pgnLink.href = resp.pgnUrl;
           pgnLink.download = 'game.pgn';
         }
         metaRowPgn.style.display = '';
@@ -1557,6 +1571,7 @@ async function replayPriorSubmission(x, y, correct) {
   if (!id) return;
   const payload = { id, x, y };
   try {
+    await awaitPendingAdvance();
     const res = await fetch('/api/check_position', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
@@ -1579,7 +1594,7 @@ async function replayPriorSubmission(x, y, correct) {
     // Render ghost submission pieces and correct window pieces
     try {
       // Clear overlays
-      const imgs = board8El.querySelectorAll('img.b8-overlay');
+      const imgs = board8El.querySelectorAll('.b8-overlay');
       imgs.forEach(img => img.remove());
     if (feedbackBoxesEl) { feedbackBoxesEl.remove(); feedbackBoxesEl = null; }
       // Submission (ghost)
@@ -1644,11 +1659,41 @@ async function replayPriorSubmission(x, y, correct) {
   }
 }
 
+async function prefetchRunBundle(runId) {
+  try {
+    const res = await fetch(`/api/run/${encodeURIComponent(runId)}/bundle`);
+    if (!res.ok) return;
+    const data = await res.json();
+    if (data && data.ok === true && data.run_id === currentRunId && Array.isArray(data.puzzles)) {
+      runBundle = data.puzzles;
+    }
+  } catch (_) {
+    // Fall back to per-puzzle /api/next calls
+  }
+}
+
+// Submissions must wait until the server-side index has caught up
+async function awaitPendingAdvance() {
+  if (!pendingAdvance) return;
+  try { await pendingAdvance; } catch (_) {}
+  pendingAdvance = null;
+}
+
 async function handleNextClick() {
   try {
     if (!currentRunId) return;
-    const res = await fetch(`/api/next/${encodeURIComponent(currentRunId)}?index=${encodeURIComponent(currentRunIndex)}`);
-    const data = await res.json();
+    await awaitPendingAdvance();
+    const nextUrl = `/api/next/${encodeURIComponent(currentRunId)}?index=${encodeURIComponent(currentRunIndex)}`;
+    const bundled = runBundle ? runBundle[currentRunIndex + 1] : null;
+    let data;
+    if (bundled) {
+      // Render straight from the bundle; the server still advances the index
+      data = Object.assign({ ok: true }, bundled);
+      pendingAdvance = fetch(`${nextUrl}&lite=1`);
+    } else {
+      const res = await fetch(nextUrl);
+      data = await res.json();
+    }
     if (!data || data.ok !== true) return;
     // Reset dynamic state to initial
     overlayFrozen = false;
@@ -1702,7 +1747,8 @@ async function handleNextClick() {
     const metaRowPgn = document.getElementById('metaRowPgn');
     if (metaRowUrl) metaRowUrl.style.display = 'none';
     if (metaRowPgn) metaRowPgn.style.display = 'none';
-    if (currentPgnObjectUrl) { try { URL.revokeObjectURL(currentPgnObjectUrl); } catch(_) {} currentPgnObjectUrl = null; }
+    const pgnLink = document.getElementById('metaPgnLink');
+    if (pgnLink) pgnLink.removeAttribute('href');
   } catch(_) {}
 
     // Hide feedback card and run summary
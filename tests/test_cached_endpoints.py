@@ -0,0 +1,155 @@
+import gzip
+
+import pytest
+
+from app import create_app
+from geo_server import sqlite_wrapper
+from geo_server.http_caching import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL
+from geo_server.model import ChessGame, GeoChess, Run
+from geo_server.shared_cache import LocalSharedCache
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+PGN = '[Event "Test"]\n[Result "1-0"]\n\n1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0\n'
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.db")
+    monkeypatch.setenv("GEO_CHESS_DB", path)
+    monkeypatch.setenv("NO_DAILY_RUNNER", "true")
+    monkeypatch.setattr(sqlite_wrapper, "get_shared_cache", LocalSharedCache)
+    wrapper = SQLiteWrapper(path)
+    try:
+        for n in range(2):
+            game_id = f"game{n}"
+            wrapper.insert_chess_game(
+                ChessGame(
+                    result=1.0, whiteElo=1500, blackElo=1400, timeControl="60+0",
+                    gameId=game_id, source="lichess", pgn=PGN,
+                )
+            )
+            wrapper.insert_geo_chess(
+                GeoChess(
+                    fen="8/8/8/8/8/8/8/8", subfen="8/8", posx=n, posy=1, dimx=2, dimy=2,
+                    move_num=10 + n, last_move="e2e4", white_to_move=True,
+                    chess_game=ChessGame(
+                        result=1.0, whiteElo=1500, blackElo=1400, timeControl="60+0", gameId=game_id
+                    ),
+                )
+            )
+        wrapper.insert_run(
+            Run(identifier="RUN1", puzzle_ids=[1, 2], is_daily=False, black_info_rate=0.0, metadata_fields=[])
+        )
+    finally:
+        wrapper.conn.close()
+    yield path
+    SQLiteWrapper.RUN_CACHE.invalidate_where(lambda *_: True)
+    SQLiteWrapper.GEO_CACHE.invalidate_where(lambda *_: True)
+    SQLiteWrapper.CERT_CACHE.invalidate_where(lambda *_: True)
+
+
+@pytest.fixture
+def client(db_path):
+    app = create_app()
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def _revalidates(client, url, headers=None):
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    again = client.get(url, headers={**(headers or {}), "If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+    return first
+
+
+def test_run_bundle_is_immutable_and_revalidates(client):
+    res = _revalidates(client, "/api/run/RUN1/bundle")
+    assert res.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    bundle = res.get_json()
+    assert bundle["run_id"] == "RUN1" and bundle["len"] == 2
+    assert [p["geochess_id"] for p in bundle["puzzles"]] == [1, 2]
+    # No answer positions in the bundle
+    assert "posx" not in res.get_data(as_text=True)
+    assert client.get("/api/run/NOPE/bundle").status_code == 404
+
+
+def test_game_pgn_serves_gzip_variant_and_revalidates(client):
+    plain = _revalidates(client, "/api/game/game0/pgn")
+    assert plain.get_data(as_text=True) == PGN
+    assert plain.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert plain.headers["Content-Type"].startswith("application/x-chess-pgn")
+    assert "attachment" in plain.headers["Content-Disposition"]
+    assert "Content-Encoding" not in plain.headers
+
+    zipped = _revalidates(client, "/api/game/game0/pgn", {"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+    assert gzip.decompress(zipped.data).decode("utf-8") == PGN
+    assert client.get("/api/game/missing/pgn").status_code == 404
+
+
+def test_certificate_is_immutable_and_page_follows_run_stats(client, db_path):
+    wrapper = SQLiteWrapper(db_path)
+    try:
+        wrapper.insert_certificate("CERT1", "RUN1", [1, 2], [True, False], 75)
+        # Both the packed blobs and the per-puzzle rows are written
+        assert wrapper.conn.execute(
+            "SELECT count(*) FROM certificate_puzzles WHERE certificate_id = 'CERT1'"
+        ).fetchone()[0] == 2
+    finally:
+        wrapper.conn.close()
+
+    res = _revalidates(client, "/api/certificate/CERT1")
+    assert res.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    cert = res.get_json()
+    assert cert["puzzle_ids"] == [1, 2] and cert["successes"] == [True, False]
+    assert cert["time_taken_seconds"] == 75
+    assert client.get("/api/certificate/NOPE").status_code == 404
+
+    page = _revalidates(client, "/certificate/CERT1")
+    assert page.headers["Cache-Control"] == REVALIDATE_CACHE_CONTROL
+    wrapper = SQLiteWrapper(db_path)
+    try:
+        wrapper.update_run_completion_stats("RUN1", 75, 1, 2)
+    finally:
+        wrapper.conn.close()
+    # New run stats make the page stale, the certificate data is not
+    stale = client.get("/certificate/CERT1", headers={"If-None-Match": page.headers["ETag"]})
+    assert stale.status_code == 200
+    fresh = client.get("/api/certificate/CERT1", headers={"If-None-Match": res.headers["ETag"]})
+    assert fresh.status_code == 304
+
+
+def test_fingerprinted_asset_url_resolves(client):
+    app = client.application
+    with app.test_request_context():
+        url = app.jinja_env.globals["asset_url"]("styles", "main.css")
+    assert url != "/styles/main.css"
+
+    res = _revalidates(client, url)
+    assert res.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert res.headers["Content-Type"].startswith("text/css")
+    zipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(zipped.data) == res.data
+    # The plain name still serves the source file, without the immutable policy
+    plain = client.get("/styles/main.css")
+    assert plain.status_code == 200 and plain.data == res.data
+    assert plain.headers.get("Cache-Control") != IMMUTABLE_CACHE_CONTROL
+
+
+def test_piece_sprite_url_resolves_and_revalidates(client):
+    app = client.application
+    with app.test_request_context():
+        url = app.jinja_env.globals["piece_sprite_url"]()
+    assert url.startswith("/sprites/pieces.svg?v=")
+
+    res = _revalidates(client, url)
+    assert res.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+    assert res.headers["Content-Type"].startswith("image/svg+xml")
+    assert b"<symbol" in res.data
+    zipped = _revalidates(client, url, {"Accept-Encoding": "gzip"})
+    assert gzip.decompress(zipped.data) == res.data
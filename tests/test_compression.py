@@ -0,0 +1,42 @@
+import gzip
+
+from flask import Flask, Response, jsonify
+
+from geo_server.compression import init_compression
+
+
+def _app():
+    app = Flask(__name__)
+    init_compression(app, min_size=100)
+
+    @app.route("/big")
+    def big():
+        resp = jsonify({"pgn": "1. e4 e5 2. Nf3 Nc6 " * 50})
+        resp.headers["ETag"] = '"abc"'
+        return resp
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/stream")
+    def stream():
+        return Response((c for c in ["a" * 1000]), mimetype="text/plain")
+
+    return app
+
+
+def test_compresses_large_json_for_gzip_clients():
+    client = _app().test_client()
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip;q=0.5, identity"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["ETag"] == '"abc-gzip"'
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert b"Nf3" in gzip.decompress(resp.data)
+
+
+def test_skips_small_streamed_and_refused_responses():
+    client = _app().test_client()
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/big", headers={"Accept-Encoding": "gzip;q=0"}).headers
@@ -0,0 +1,52 @@
+import sys
+import types
+
+from geo_server import counters as counters_module
+from geo_server.counters import BatchedCounters
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.values = {}
+        self.flushes = 0
+
+    def incr_many(self, deltas):
+        self.flushes += 1
+        for name, amount in deltas.items():
+            self.values[name] = self.values.get(name, 0) + amount
+
+    def get_many(self, names):
+        return {n: self.values.get(n, 0) for n in names}
+
+
+def test_flushes_every_n_increments():
+    store = _MemoryStore()
+    counters = BatchedCounters(store, flush_every=3, flush_interval=3600)
+    counters.incr("a")
+    counters.incr("b", 2)
+    assert store.flushes == 0
+    # Unflushed increments still show up in reads
+    assert counters.get(["a", "b"]) == {"a": 1, "b": 2}
+    counters.incr("a")
+    assert store.flushes == 1
+    assert store.values == {"a": 2, "b": 2} and counters.pending() == {}
+
+
+def test_shutdown_flushes_pending_through_atexit_and_uwsgi(monkeypatch):
+    hooks = []
+    monkeypatch.setattr(counters_module.atexit, "register", hooks.append)
+    calls = []
+    fake_uwsgi = types.SimpleNamespace(atexit=lambda: calls.append("previous"))
+    monkeypatch.setitem(sys.modules, "uwsgi", fake_uwsgi)
+
+    store = _MemoryStore()
+    counters = BatchedCounters(store, flush_every=100, flush_interval=3600)
+    counters.incr("a")
+    assert hooks == [counters.flush]
+    fake_uwsgi.atexit()
+    assert store.values == {"a": 1}
+    # The previously installed uWSGI hook still runs
+    assert calls == ["previous"]
+    counters.incr("a")
+    hooks[0]()
+    assert store.values == {"a": 2}
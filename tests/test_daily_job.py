@@ -0,0 +1,117 @@
+import pytest
+
+from geo_server import daily_job
+from geo_server.model import Run
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+
+def _no_build(*args, **kwargs):
+    raise AssertionError("no new daily run should be built")
+
+
+def test_first_deploy_keeps_existing_daily_run(tmp_path, monkeypatch):
+    path = str(tmp_path / "daily.db")
+    wrapper = SQLiteWrapper(path)
+    wrapper.insert_run(
+        Run(identifier="LIVE", puzzle_ids=[1, 2], is_daily=True, black_info_rate=0.5, metadata_fields=[])
+    )
+    wrapper.conn.close()
+    monkeypatch.setattr(daily_job, "DAILY_LOOKAHEAD_DAYS", 0)
+    monkeypatch.setattr(daily_job, "create_daily_run", _no_build)
+
+    assert daily_job.run_daily_job_if_due(path, "owner", grab_new_tournaments=False)
+
+    wrapper = SQLiteWrapper(path)
+    try:
+        day = daily_job.today_str()
+        assert wrapper.get_scheduled_daily_runs(day) == {day: "LIVE"}
+        assert wrapper.get_daily_pointer() == ("LIVE", day)
+    finally:
+        wrapper.conn.close()
+
+
+def test_failure_backs_off_before_retrying(tmp_path, monkeypatch):
+    path = str(tmp_path / "daily.db")
+    calls = []
+
+    def failing_build(*args, **kwargs):
+        calls.append(1)
+        raise RuntimeError("no puzzles")
+
+    monkeypatch.setattr(daily_job, "create_daily_run", failing_build)
+    with pytest.raises(RuntimeError):
+        daily_job.run_daily_job_if_due(path, "a", grab_new_tournaments=False)
+    # Inside the backoff window no worker takes the lease or rebuilds
+    assert not daily_job.run_daily_job_if_due(path, "b", grab_new_tournaments=False)
+    assert len(calls) == 1
+
+    wrapper = SQLiteWrapper(path)
+    try:
+        status = wrapper.get_job_status(daily_job.DAILY_JOB_NAME)
+        assert status["failures"] == 1
+        assert status["next_attempt_at"] > status["updated_at"] - 1
+        # Once the window has passed the next failure doubles the delay
+        wrapper.update_job_status(daily_job.DAILY_JOB_NAME, next_attempt_at=0)
+    finally:
+        wrapper.conn.close()
+    with pytest.raises(RuntimeError):
+        daily_job.run_daily_job_if_due(path, "b", grab_new_tournaments=False)
+    wrapper = SQLiteWrapper(path)
+    try:
+        assert wrapper.get_job_status(daily_job.DAILY_JOB_NAME)["failures"] == 2
+    finally:
+        wrapper.conn.close()
+    assert daily_job.retry_delay(2) == 2 * daily_job.retry_delay(1)
+
+
+def test_daily_settings_are_copied_and_empty_runs_refused(tmp_path):
+    from geo_server import manage_runs
+
+    wrapper = SQLiteWrapper(str(tmp_path / "empty.db"))
+    try:
+        settings = manage_runs._prepare_daily_run_settings(wrapper, "world_champion")
+        assert settings is not manage_runs.daily_run_settings
+        assert manage_runs.daily_run_settings.source == "lichess"
+        with pytest.raises(Exception, match="No puzzles"):
+            manage_runs.create_daily_run(wrapper, grab_new_tournaments=False, activate=False)
+        assert wrapper.conn.execute("SELECT count(*) FROM runs").fetchone()[0] == 0
+    finally:
+        wrapper.conn.close()
+
+
+class _LostHeartbeat(daily_job.LeaseHeartbeat):
+    def __enter__(self):
+        # As if the renewal thread had found the lease taken over
+        self.lost = True
+        return self
+
+
+def test_lost_lease_aborts_before_writing(tmp_path, monkeypatch):
+    path = str(tmp_path / "daily.db")
+    wrapper = SQLiteWrapper(path)
+    wrapper.insert_run(
+        Run(identifier="LIVE", puzzle_ids=[1, 2], is_daily=True, black_info_rate=0.5, metadata_fields=[])
+    )
+    wrapper.conn.close()
+    monkeypatch.setattr(daily_job, "LeaseHeartbeat", _LostHeartbeat)
+    monkeypatch.setattr(daily_job, "create_daily_run", _no_build)
+
+    assert not daily_job.run_daily_job_if_due(path, "owner", grab_new_tournaments=False)
+
+    wrapper = SQLiteWrapper(path)
+    try:
+        assert wrapper.get_scheduled_daily_runs(daily_job.today_str()) == {}
+        status = wrapper.get_job_status(daily_job.DAILY_JOB_NAME)
+        assert status["last_success_day"] is None and status["failures"] == 0
+    finally:
+        wrapper.conn.close()
+
+
+def test_unclaimed_ingest_job_is_not_waited_for(tmp_path):
+    from geo_server.job_queue import enqueue_job, wait_for_job
+
+    path = str(tmp_path / "jobs.db")
+    SQLiteWrapper(path).conn.close()
+    job_id = enqueue_job(path, "ingest_tournaments", {"n_tournaments": 3})
+    job = wait_for_job(path, job_id, 60, poll=0.01, claim_timeout_seconds=0.05)
+    assert job["status"] == "queued"
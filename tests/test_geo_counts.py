@@ -0,0 +1,37 @@
+from geo_server import sqlite_wrapper
+from geo_server.model import ChessGame, GeoChess
+from geo_server.shared_cache import LocalSharedCache
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+
+def test_guesses_leave_the_shared_puzzle_payload_in_place(tmp_path, monkeypatch):
+    shared = LocalSharedCache()
+    monkeypatch.setattr(sqlite_wrapper, "get_shared_cache", lambda: shared)
+    wrapper = SQLiteWrapper(str(tmp_path / "geo.db"))
+    try:
+        game = ChessGame(result=1.0, whiteElo=2000, blackElo=2000, timeControl="180+0", gameId="g1")
+        wrapper.insert_chess_game(game)
+        wrapper.insert_geo_chess(
+            GeoChess(
+                fen="8/8/8/8/8/8/8/8", subfen="8/8", posx=0, posy=0, dimx=2, dimy=2,
+                move_num=10, last_move="e2e4", chess_game=game, white_to_move=True,
+                successes=4, fails=1,
+            )
+        )
+        geo_id = wrapper.conn.execute("SELECT id FROM geo_chess").fetchone()[0]
+
+        assert wrapper.get_geo_chess(geo_id).successes == 4
+        payload = shared.get(f"geo:{geo_id}")
+        assert b"successes" not in payload and b"fails" not in payload
+
+        wrapper.increment_geo_chess_attempt(geo_id, True)
+        wrapper.increment_geo_chess_attempt(geo_id, False)
+        # The large entry survives; another worker reads fresh counts
+        assert shared.get(f"geo:{geo_id}") == payload
+        SQLiteWrapper.GEO_CACHE.invalidate(geo_id)
+        geo = wrapper.get_geo_chess(geo_id)
+        assert (geo.successes, geo.fails) == (5, 2)
+        assert wrapper.get_geo_chess_counts(geo_id) == (5, 2)
+    finally:
+        SQLiteWrapper.GEO_CACHE.invalidate(geo_id)
+        wrapper.conn.close()
@@ -0,0 +1,78 @@
+from flask import Flask, render_template_string
+
+from geo_server.http_caching import (
+    SESSION_STATE_MARKER,
+    conditional_page,
+    fill_session_state,
+    run_page_key,
+    run_stats,
+    version_etag,
+)
+from geo_server.model import Run
+
+
+def _app(calls):
+    app = Flask(__name__)
+
+    def render():
+        calls.append(1)
+        return "<html>page</html>"
+
+    @app.route("/page")
+    def page():
+        return conditional_page(version_etag("page", 1), render, last_modified=1_700_000_000)
+
+    return app
+
+
+def test_matching_etag_skips_render():
+    calls = []
+    client = _app(calls).test_client()
+    first = client.get("/page")
+    assert first.status_code == 200 and first.data == b"<html>page</html>"
+    assert first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    # Coded variants (after compression) validate the same representation
+    again = client.get("/page", headers={"If-None-Match": etag[:-1] + '-gzip"'})
+    assert again.status_code == 304 and again.data == b""
+    assert len(calls) == 1
+    assert client.get("/page", headers={"If-None-Match": 'W/"other"'}).status_code == 200
+
+
+def test_if_modified_since_only_without_if_none_match():
+    calls = []
+    client = _app(calls).test_client()
+    lm = client.get("/page").headers["Last-Modified"]
+    assert client.get("/page", headers={"If-Modified-Since": lm}).status_code == 304
+    assert (
+        client.get(
+            "/page", headers={"If-Modified-Since": lm, "If-None-Match": 'W/"other"'}
+        ).status_code
+        == 200
+    )
+    assert version_etag("page", 1) != version_etag("page", 2)
+
+
+def test_session_state_fills_the_marker_once():
+    app = Flask(__name__)
+    with app.app_context():
+        html = render_template_string(
+            "<script>{{ session_state }} window.X = 1;</script>", session_state=SESSION_STATE_MARKER
+        )
+    filled = fill_session_state(html, PRIOR_SUBMISSION=None, ALL_SUBMISSIONS=[{"x": "</script>"}])
+    assert "/*__SESSION_STATE__*/" not in filled
+    assert "window.PRIOR_SUBMISSION = null;" in filled
+    # JSON is escaped so user data cannot close the script tag
+    assert "</script>\"" not in filled and "\\u003c/script\\u003e" in filled
+
+
+def test_run_page_key_ignores_completion_stats():
+    run = Run(identifier="ABC", puzzle_ids=[1, 2, 3], is_daily=True, black_info_rate=0.2, metadata_fields=[])
+    before = run_page_key(run, 1, "v1")
+    run.completed_count, run.avg_time_seconds = 5, 42.0
+    assert run_page_key(run, 1, "v1") == before
+    assert run_stats(run)["completedCount"] == 5
+    assert run_page_key(run, 1, "v2") != before
+    run.puzzle_ids = [1, 2, 4]
+    assert run_page_key(run, 1, "v1") != before
@@ -0,0 +1,21 @@
+from geo_server.hyperloglog import HyperLogLog
+
+
+def test_hyperloglog_estimate_within_error():
+    hll = HyperLogLog()
+    for i in range(50_000):
+        hll.add(f"visitor-{i}")
+    # Standard error at precision 14 is ~0.8%; allow a generous margin
+    assert abs(hll.count() - 50_000) < 50_000 * 0.03
+
+
+def test_hyperloglog_ignores_duplicates_and_merges():
+    a = HyperLogLog()
+    b = HyperLogLog()
+    for i in range(1000):
+        a.add(str(i))
+        a.add(str(i))
+        b.add(str(i + 500))
+    assert abs(a.count() - 1000) < 30
+    a.merge(b)
+    assert abs(a.count() - 1500) < 45
@@ -0,0 +1,35 @@
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+
+def test_stale_jobs_fail_after_max_attempts(tmp_path):
+    wrapper = SQLiteWrapper(str(tmp_path / "jobs.db"))
+    try:
+        job_id = wrapper.enqueue_job("ingest_tournaments", {}, max_attempts=2)
+        for attempt in (1, 2):
+            job = wrapper.claim_job("w")
+            assert job["id"] == job_id and job["attempts"] == attempt
+            # The worker dies mid-job; the next sweep finds it stale
+            wrapper.conn.execute("UPDATE jobs SET updated_at = 0 WHERE id = ?", (job_id,))
+            wrapper.conn.commit()
+            requeued = wrapper.requeue_stale_jobs(60)
+            assert requeued == (1 if attempt < 2 else 0)
+        assert wrapper.get_job(job_id)["status"] == "failed"
+        assert wrapper.claim_job("w") is None
+    finally:
+        wrapper.conn.close()
+
+
+def test_once_processes_a_single_job(tmp_path, monkeypatch):
+    from geo_server import job_queue
+
+    path = str(tmp_path / "jobs.db")
+    wrapper = SQLiteWrapper(path)
+    try:
+        first = wrapper.enqueue_job("no_such_kind", {"n": 1})
+        second = wrapper.enqueue_job("no_such_kind", {"n": 2})
+        monkeypatch.setattr("sys.argv", ["job_queue", "--once", path])
+        assert job_queue.main() == 0
+        assert wrapper.get_job(first)["status"] == "failed"
+        assert wrapper.get_job(second)["status"] == "queued"
+    finally:
+        wrapper.conn.close()
@@ -0,0 +1,26 @@
+import json
+
+from flask import Flask, jsonify
+
+from geo_server.json_provider import FastJSONProvider, dumps_bytes
+
+
+def _app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+
+def test_jsonify_matches_stdlib_semantics():
+    app = _app()
+    payload = {"b": [1, 2.5, None, True], "a": {"é": "x"}, "big": 2**70}
+    with app.app_context():
+        resp = jsonify(payload)
+    assert resp.mimetype == "application/json"
+    assert json.loads(resp.get_data()) == json.loads(json.dumps(payload))
+
+
+def test_dumps_bytes_is_compact_and_stable():
+    body = dumps_bytes({"b": 1, "a": [1, 2]}, sort_keys=True)
+    assert body == b'{"a":[1,2],"b":1}'
+    assert json.loads(dumps_bytes({1: "x"})) == {"1": "x"}
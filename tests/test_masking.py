@@ -0,0 +1,40 @@
+import hashlib
+import struct
+
+from geo_server.masking import MASK_VALUE, MASKABLE_FIELDS, mask_game_meta
+
+META = {
+    "result": "1-0",
+    "whiteElo": 2500,
+    "blackElo": 2400,
+    "timeControl": "180+0",
+    "eco": "C20",
+    "opening_name": "King's Pawn Game",
+    "moveNum": 12,
+    "whitePlayer": "a",
+    "blackPlayer": "b",
+    "year": 2020,
+}
+
+
+def _reference(meta, run_id, index, rate):
+    # Per-field hashing as done before the bitmap was introduced
+    out = dict(meta)
+    for field in MASKABLE_FIELDS:
+        h = hashlib.sha256(f"{run_id}|{index}|{field}".encode("utf-8")).digest()
+        if struct.unpack("!I", h[:4])[0] / 2**32 < rate:
+            out[field] = MASK_VALUE
+    return out
+
+
+def test_mask_matches_per_field_hashing():
+    for rate in (0.25, 0.5, 0.9):
+        for index in range(10):
+            assert mask_game_meta(META, "ABCDEFGH", index, 10, rate) == _reference(
+                META, "ABCDEFGH", index, rate
+            )
+
+
+def test_zero_rate_leaves_meta_untouched():
+    assert mask_game_meta(META, "ABCDEFGH", 0, 10, 0) is META
+    assert mask_game_meta(None, "ABCDEFGH", 0, 10, 0.5) is None
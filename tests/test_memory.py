@@ -0,0 +1,30 @@
+import pytest
+
+from geo_server import memory
+
+
+def test_deep_sizeof_counts_nested_and_shared_objects_once():
+    payload = "x" * 10_000
+    small, truncated = memory.deep_sizeof({"a": 1})
+    assert not truncated
+    big, _ = memory.deep_sizeof({"a": payload, "b": [payload, payload]})
+    assert 10_000 < big - small < 20_000
+    _, truncated = memory.deep_sizeof(list(range(100)), limit=10)
+    assert truncated
+
+
+@pytest.fixture
+def grows():
+    grows = {}
+    memory.register_structure("test_grows", lambda: grows)
+    yield grows
+    memory.unregister_structure("test_grows")
+
+
+def test_snapshot_diff_reports_structure_growth(grows):
+    label = memory.take_snapshot("before")
+    assert label in memory.snapshot_labels()
+    grows.update({i: f"{i:0100d}" for i in range(50)})
+    diff = memory.diff_reports(memory.get_snapshot(label), memory.memory_report(top=0))
+    assert diff["structures"]["test_grows"]["len"] == 50
+    assert diff["structures"]["test_grows"]["bytes"] > 5000
@@ -0,0 +1,58 @@
+import sqlite3
+
+from geo_server import metrics
+
+
+def test_instrumented_connection_counts_statements_per_request():
+    conn = sqlite3.connect(":memory:", factory=metrics.InstrumentedConnection)
+    metrics.begin_request()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+    conn.cursor().execute("SELECT x FROM t").fetchall()
+    work = metrics._local.work
+    assert work["sqlite_queries"] == 3
+    assert work["sqlite_seconds"] > 0
+    metrics.end_request("test_endpoint", "GET", 200)
+    assert metrics._local.work is None
+
+
+def test_render_merges_worker_snapshots():
+    registry = metrics.MetricsRegistry()
+    work = {"sqlite_queries": 2, "sqlite_seconds": 0.001, "redis_calls": 1, "redis_seconds": 0.002}
+    registry.record_request("run_page", "GET", 200, 0.03, work)
+    snap = registry.snapshot()
+    text = metrics.render_prometheus([snap, snap])
+    labels = 'endpoint="run_page",method="GET",status="200"'
+    assert f"geochessr_http_request_duration_seconds_count{{{labels}}} 2" in text
+    assert f'geochessr_http_request_duration_seconds_bucket{{{labels},le="0.025"}} 0' in text
+    assert f'geochessr_http_request_duration_seconds_bucket{{{labels},le="0.05"}} 2' in text
+    assert 'geochessr_sqlite_queries_total{endpoint="run_page"} 4.0' in text
+    assert 'geochessr_redis_round_trips_total{endpoint="run_page"} 2.0' in text
+    assert "geochessr_metrics_workers 2" in text
+
+
+class _FakeUwsgi:
+    numproc = 2
+
+    def __init__(self):
+        self.caches = {}
+        self.worker = 1
+
+    def worker_id(self):
+        return self.worker
+
+    def cache_update(self, key, value, expires, cache_name):
+        assert expires == 0
+        self.caches.setdefault(cache_name, {})[key] = value
+
+    def cache_get(self, key, cache_name):
+        return self.caches.get(cache_name, {}).get(key)
+
+
+def test_snapshots_use_the_dedicated_cache_without_expiry(monkeypatch):
+    fake = _FakeUwsgi()
+    monkeypatch.setattr(metrics, "uwsgi", fake)
+    metrics.publish(force=True)
+    assert set(fake.caches) == {metrics.METRICS_CACHE_NAME}
+    fake.worker = 2
+    assert len(metrics.collect_snapshots()) == 2
@@ -0,0 +1,61 @@
+import cProfile
+import pstats
+import time
+
+from flask import Flask
+
+from geo_server.profiling import collapsed_stacks, init_profiling, merge_dir
+
+
+def _leaf():
+    time.sleep(0.002)
+
+
+def _outer():
+    _leaf()
+    _leaf()
+
+
+def test_collapsed_stacks_follow_the_call_graph():
+    profiler = cProfile.Profile()
+    profiler.runcall(_outer)
+    stacks = collapsed_stacks(pstats.Stats(profiler))
+    sleeping = [s for s in stacks if s.endswith("<built-in method time.sleep>")]
+    assert len(sleeping) == 1
+    assert "_outer (" in sleeping[0] and "_leaf (" in sleeping[0]
+    assert stacks[sleeping[0]] >= 4000
+
+
+def test_admin_header_profiles_request(tmp_path):
+    app = Flask(__name__)
+    init_profiling(app, str(tmp_path), lambda: True, sample_rate=0)
+
+    @app.route("/slow")
+    def slow():
+        _outer()
+        return "ok"
+
+    client = app.test_client()
+    assert "X-Profile-Dump" not in client.get("/slow").headers
+    dump = client.get("/slow", headers={"X-Profile": "1"}).headers["X-Profile-Dump"]
+    assert dump.startswith("slow/") and (tmp_path / dump).exists()
+    written = merge_dir(str(tmp_path))
+    assert str(tmp_path / "slow.collapsed") in written
+
+
+def test_only_newest_dumps_are_kept(tmp_path):
+    app = Flask(__name__)
+    init_profiling(app, str(tmp_path), lambda: True, sample_rate=0, keep=2)
+
+    @app.route("/fast")
+    def fast():
+        return "ok"
+
+    client = app.test_client()
+    dumps = [
+        client.get("/fast", headers={"X-Profile": "1"}).headers["X-Profile-Dump"]
+        for _ in range(3)
+    ]
+    assert sorted(p.name for p in (tmp_path / "fast").iterdir()) == sorted(
+        d.split("/")[1] for d in dumps[1:]
+    )
@@ -0,0 +1,36 @@
+import sqlite3
+
+from geo_server import metrics
+from geo_server.query_log import QueryLog, normalize_sql, param_shape
+
+
+def test_normalize_groups_by_filter_combination():
+    a = normalize_sql("SELECT id FROM geo_chess WHERE difficulty >= 3 AND id IN (?, ?, ?)")
+    b = normalize_sql("SELECT  id FROM geo_chess\n WHERE difficulty >= 7.5 AND id IN (?,?)")
+    assert a == b == "SELECT id FROM geo_chess WHERE difficulty >= ? AND id IN (?+)"
+    assert normalize_sql("SELECT * FROM t WHERE name = 'it''s'") == "SELECT * FROM t WHERE name = ?"
+    assert param_shape((1, 2, 3, "a", None)) == "(int*3, str, null)"
+    assert param_shape((1,), rows=4) == "(int) x 4 rows"
+
+
+def test_slow_statement_is_logged_with_plan(monkeypatch, capsys):
+    log = QueryLog(slow_seconds=0.0)
+    monkeypatch.setattr(metrics, "QUERY_LOG", log)
+    conn = sqlite3.connect(":memory:", factory=metrics.InstrumentedConnection)
+    conn.execute("CREATE TABLE t (x INTEGER PRIMARY KEY, y TEXT)")
+    conn.execute("SELECT y FROM t WHERE x = ?", (5,)).fetchall()
+    stats = {s["sql"]: s for s in log.stats()["statements"]}
+    entry = stats["SELECT y FROM t WHERE x = ?"]
+    assert entry["count"] == 1 and entry["slow"] == 1
+    assert entry["last_params"] == "(int)"
+    assert any("SEARCH t USING INTEGER PRIMARY KEY" in line for line in entry["plan"])
+    assert "Slow query" in capsys.readouterr().out
+
+
+def test_entries_is_a_snapshot():
+    log = QueryLog()
+    log.record("SELECT 1", 0.001, 0.001)
+    entries = log.entries()
+    assert list(entries) == ["SELECT ?"]
+    log.reset()
+    assert list(entries) == ["SELECT ?"] and log.entries() == {}
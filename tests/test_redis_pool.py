@@ -0,0 +1,75 @@
+import types
+
+import pytest
+import redis
+
+from geo_server import redis_pool
+from geo_server.counters import RedisCounterStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    fake_time = types.SimpleNamespace(monotonic=clock.monotonic, perf_counter=clock.perf_counter)
+    monkeypatch.setattr(redis_pool, "time", fake_time)
+    monkeypatch.setattr(redis_pool, "_breaker", redis_pool.CircuitBreaker(2, 30.0))
+    monkeypatch.setattr(redis_pool, "_pool", None)
+    return clock
+
+
+def _fail(rc):
+    raise redis.ConnectionError("down")
+
+
+def test_breaker_opens_after_failures_and_probes_when_half_open(clock):
+    calls = []
+
+    def ok(rc):
+        calls.append(rc)
+        return "pong"
+
+    for _ in range(2):
+        with pytest.raises(redis_pool.RedisUnavailable):
+            redis_pool.call(_fail)
+    assert redis_pool.breaker_open()
+    # While open, Redis is not touched at all
+    assert redis_pool.run(ok, default="skipped") == "skipped" and calls == []
+
+    # Half-open after the cool-down: one probe goes through, one failure re-opens
+    clock.now += 31
+    assert not redis_pool.breaker_open()
+    with pytest.raises(redis_pool.RedisUnavailable):
+        redis_pool.call(_fail)
+    assert redis_pool.breaker_open()
+
+    # A successful probe closes the breaker again
+    clock.now += 31
+    assert redis_pool.call(ok) == "pong"
+    assert not redis_pool.breaker_open() and len(calls) == 1
+
+
+def test_session_and_counter_clients_share_the_configured_pool(clock, monkeypatch):
+    monkeypatch.setenv("REDIS_SOCKET_TIMEOUT", "0.3")
+    monkeypatch.setenv("REDIS_CONNECT_TIMEOUT", "0.1")
+    monkeypatch.setenv("REDIS_MAX_CONNECTIONS", "7")
+    session_client = redis_pool.direct_client()
+    pool = session_client.connection_pool
+    assert pool.connection_kwargs["socket_timeout"] == 0.3
+    assert pool.connection_kwargs["socket_connect_timeout"] == 0.1
+    assert pool.max_connections == 7
+
+    used = []
+    monkeypatch.setattr(redis.client.Pipeline, "execute", lambda self: used.append(self) or [])
+    RedisCounterStore().incr_many({"puzzles_solved": 2})
+    assert used[0].connection_pool is pool
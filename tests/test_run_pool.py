@@ -0,0 +1,14 @@
+from geo_server.run_pool import refill_pool
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+
+def test_unfillable_presets_leave_no_runs_behind(tmp_path):
+    wrapper = SQLiteWrapper(str(tmp_path / "pool.db"))
+    try:
+        # No puzzles at all: no preset can be filled
+        assert refill_pool(wrapper, target_size=2) == 0
+        assert refill_pool(wrapper, target_size=2) == 0
+        assert wrapper.conn.execute("SELECT count(*) FROM runs").fetchone()[0] == 0
+        assert wrapper.run_pool_sizes() == {}
+    finally:
+        wrapper.conn.close()
@@ -0,0 +1,45 @@
+import sqlite3
+
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+
+def _legacy_db(path, leftover_new_table=False):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE runs (identifier TEXT PRIMARY KEY, is_daily INTEGER, black_info_rate REAL, metadata_fields TEXT, completed_count INTEGER DEFAULT 0, avg_time_seconds REAL, avg_correct_count REAL)"
+    )
+    conn.execute(
+        "CREATE TABLE run_puzzles (run_id TEXT, puzzle_id INTEGER, PRIMARY KEY (run_id, puzzle_id))"
+    )
+    conn.execute("INSERT INTO runs (identifier, is_daily, black_info_rate, metadata_fields) VALUES ('R1', 0, 0.5, 'result')")
+    conn.executemany(
+        "INSERT INTO run_puzzles (run_id, puzzle_id) VALUES ('R1', ?)", [(9,), (3,), (5,)]
+    )
+    if leftover_new_table:
+        # Left behind by an earlier, interrupted migration
+        conn.execute("CREATE TABLE run_puzzles_new (run_id TEXT, idx INTEGER, puzzle_id INTEGER)")
+    conn.commit()
+    conn.close()
+
+
+def test_migrates_legacy_run_puzzles_layout(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    _legacy_db(path, leftover_new_table=True)
+    wrapper = SQLiteWrapper(path)
+    try:
+        assert "idx" in wrapper._table_columns("run_puzzles")
+        tables = {r[0] for r in wrapper.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert "run_puzzles_new" not in tables
+        rows = wrapper.conn.execute(
+            "SELECT idx, puzzle_id FROM run_puzzles WHERE run_id = 'R1' ORDER BY idx"
+        ).fetchall()
+        # Legacy rows were read back in puzzle_id order
+        assert rows == [(0, 3), (1, 5), (2, 9)]
+        assert wrapper.get_run("R1").puzzle_ids == [3, 5, 9]
+    finally:
+        wrapper.conn.close()
+    # A second process finds the migration done
+    SQLiteWrapper._MIGRATED_DBS.clear()
+    again = SQLiteWrapper(path)
+    assert again.conn.execute("SELECT count(*) FROM run_puzzles").fetchone()[0] == 3
+    again.conn.close()
@@ -0,0 +1,62 @@
+import pytest
+
+from geo_server import sqlite_wrapper
+from geo_server.model import ChessGame, GeoChess, Run
+from geo_server.shared_cache import LocalSharedCache
+from geo_server.sqlite_wrapper import SQLiteWrapper
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    shared = LocalSharedCache()
+    monkeypatch.setattr(sqlite_wrapper, "get_shared_cache", lambda: shared)
+    return shared
+
+
+@pytest.fixture
+def wrapper(tmp_path, shared):
+    wrapper = SQLiteWrapper(str(tmp_path / "caches.db"))
+    yield wrapper
+    wrapper.conn.close()
+    SQLiteWrapper.RUN_CACHE.invalidate_where(lambda *_: True)
+    SQLiteWrapper.GEO_CACHE.invalidate_where(lambda *_: True)
+
+
+def test_run_completion_invalidates_cached_run(wrapper, shared):
+    wrapper.insert_run(
+        Run(identifier="RUN1", puzzle_ids=[1, 2], is_daily=False, black_info_rate=0.2, metadata_fields=[])
+    )
+    before = SQLiteWrapper.cache_stats()["runs"]
+    assert wrapper.get_run("RUN1").completed_count == 0
+    assert wrapper.get_run("RUN1").completed_count == 0
+    after = SQLiteWrapper.cache_stats()["runs"]
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert shared.get("run:RUN1") is not None
+
+    wrapper.update_run_completion_stats("RUN1", 90, 2, 2)
+    # Both tiers dropped the stale copy
+    assert SQLiteWrapper.RUN_CACHE.peek("RUN1") is None
+    assert shared.get("run:RUN1") is None
+    run = wrapper.get_run("RUN1")
+    assert run.completed_count == 1 and run.avg_time_seconds == 90.0
+
+
+def test_guess_updates_cached_puzzle_counts(wrapper, shared):
+    game = ChessGame(result=0.5, whiteElo=1500, blackElo=1500, timeControl="60+0", gameId="g2")
+    wrapper.insert_chess_game(game)
+    wrapper.insert_geo_chess(
+        GeoChess(
+            fen="8/8/8/8/8/8/8/8", subfen="8/8", posx=1, posy=1, dimx=2, dimy=2,
+            move_num=5, last_move="d2d4", chess_game=game, white_to_move=False,
+        )
+    )
+    geo_id = wrapper.conn.execute("SELECT id FROM geo_chess").fetchone()[0]
+    assert wrapper.get_geo_chess(geo_id).fails == 0
+    assert shared.get(f"geo_counts:{geo_id}") == b"0,0"
+
+    wrapper.increment_geo_chess_attempt(geo_id, False)
+    # This worker's copy is updated in place; other workers reload the counts
+    assert SQLiteWrapper.GEO_CACHE.peek(geo_id).fails == 1
+    assert shared.get(f"geo_counts:{geo_id}") is None
+    assert wrapper.get_geo_chess_counts(geo_id) == (0, 1)